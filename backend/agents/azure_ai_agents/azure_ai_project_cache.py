@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.identity.aio import DefaultAzureCredential
+from azure.ai.projects.aio import AIProjectClient
+from azure.ai.projects.models import Agent as AzureAIAgentModel
+from azure.monitor.opentelemetry import configure_azure_monitor
+
+from models.azure_ai_agent import AzureAIAgentRequest
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "azure_ai_agents.json")
+DEFAULT_REFRESH_SECONDS = 600
+
+
+class AzureAIProjectCache:
+    """
+    Process-wide cache of the Azure credential, the AIProjectClient and the agent definitions.
+
+    The credential and the client are created once and shared by every Azure AI agent.
+    Agent definitions are kept in memory and saved to a JSON file, so that a restarted
+    process or another worker reuses the same agent instead of loading or creating it again.
+    A background task refreshes the cached definitions and notifies the subscribed agents.
+    """
+
+    _credential: DefaultAzureCredential | None = None
+    _client: AIProjectClient | None = None
+    _definitions: dict[str, AzureAIAgentModel] = {}
+    _subscribers: dict[str, list[weakref.WeakMethod]] = {}
+    _lock: asyncio.Lock | None = None
+    _refresh_task: asyncio.Task | None = None
+
+    @classmethod
+    def get_client(cls) -> AIProjectClient:
+        """
+        Get the shared AIProjectClient, creating it and configuring telemetry on first use.
+        """
+        if cls._client is None:
+            cls._credential = DefaultAzureCredential()
+            cls._client = AIProjectClient.from_connection_string(
+                credential=cls._credential,
+                conn_str=os.environ.get("AZURE_AI_AGENT_PROJECT_CONNECTION_STRING")
+            )
+
+            application_insights_connection_string = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING") # project_client.telemetry.get_connection_string()
+            if application_insights_connection_string:
+                configure_azure_monitor(connection_string=application_insights_connection_string)
+                cls._client.telemetry.enable()
+
+        return cls._client
+
+    @classmethod
+    async def get_definition(
+        cls,
+        agent_creation_request: AzureAIAgentRequest,
+        create_or_load: Callable[..., Awaitable[AzureAIAgentModel]],
+    ) -> AzureAIAgentModel:
+        """
+        Get the agent definition for the request, loading or creating the agent only on a cache miss.
+
+        Args:
+            agent_creation_request: The request describing the agent.
+            create_or_load: Coroutine function used on a cache miss, called with the request and the client.
+
+        Returns:
+            The agent definition.
+        """
+        name = agent_creation_request.name
+        definition = cls._definitions.get(name)
+        if cls._matches(definition, agent_creation_request):
+            return definition
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:
+            definition = cls._definitions.get(name)
+            if not cls._matches(definition, agent_creation_request):
+                async with cls._file_lock():
+                    definition = cls._read_definitions().get(name)
+                    if not cls._matches(definition, agent_creation_request):
+                        definition = await create_or_load(
+                            agent_creation_request=agent_creation_request,
+                            client=cls.get_client(),
+                        )
+                        cls._write_definition(name, definition)
+                cls._definitions[name] = definition
+
+        cls._ensure_refresh_task()
+        return definition
+
+    @classmethod
+    def subscribe(cls, name: str, callback: Callable[[AzureAIAgentModel], None]) -> None:
+        """
+        Register a bound method to be called whenever the definition of the named agent is refreshed.
+        Only a weak reference is kept, so subscribing does not keep the agent alive.
+        """
+        cls._subscribers.setdefault(name, []).append(weakref.WeakMethod(callback))
+
+    @classmethod
+    async def refresh(cls) -> None:
+        """
+        Reload all cached definitions from the service and notify the subscribers of changes.
+        Definitions of agents deleted from the service are evicted, so that the next request loads or creates the agent again.
+        """
+        client = cls.get_client()
+        for name, definition in list(cls._definitions.items()):
+            try:
+                refreshed = await client.agents.get_agent(agent_id=definition.id)
+            except ResourceNotFoundError:
+                logger.warning("Agent %s (%s) no longer exists, evicting its cached definition", name, definition.id)
+                cls._definitions.pop(name, None)
+                async with cls._file_lock():
+                    cls._remove_definition(name, definition.id)
+                continue
+            except Exception:
+                logger.exception("Failed to refresh the definition of agent %s", name)
+                continue
+
+            if refreshed.as_dict() == definition.as_dict():
+                continue
+
+            cls._definitions[name] = refreshed
+            async with cls._file_lock():
+                cls._write_definition(name, refreshed)
+
+            subscribers = [ref for ref in cls._subscribers.get(name, []) if ref() is not None]
+            cls._subscribers[name] = subscribers
+            for ref in subscribers:
+                callback = ref()
+                if callback is None:
+                    continue
+                try:
+                    callback(refreshed)
+                except Exception:
+                    logger.exception("Subscriber of agent %s failed to apply the refreshed definition", name)
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Stop the background refresh and close the shared client and credential.
+        """
+        if cls._refresh_task is not None:
+            cls._refresh_task.cancel()
+            cls._refresh_task = None
+        if cls._client is not None:
+            await cls._client.close()
+            cls._client = None
+        if cls._credential is not None:
+            await cls._credential.close()
+            cls._credential = None
+
+    @staticmethod
+    def _matches(definition: AzureAIAgentModel | None, agent_creation_request: AzureAIAgentRequest) -> bool:
+        # An explicitly configured agent id always wins over a cached definition
+        if definition is None:
+            return False
+        return agent_creation_request.agent_id is None or agent_creation_request.agent_id == definition.id
+
+    @classmethod
+    def _ensure_refresh_task(cls) -> None:
+        if cls._refresh_task is None or cls._refresh_task.done():
+            cls._refresh_task = asyncio.create_task(cls._refresh_periodically())
+
+    @classmethod
+    async def _refresh_periodically(cls) -> None:
+        interval = float(os.getenv("AZURE_AI_AGENT_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.refresh()
+            except Exception:
+                # Keep refreshing, a failed round must not leave the definitions stale for the process lifetime
+                logger.exception("Failed to refresh the Azure AI agent definitions")
+
+    @staticmethod
+    def _cache_path() -> str:
+        return os.getenv("AZURE_AI_AGENT_CACHE_PATH", DEFAULT_CACHE_PATH)
+
+    @classmethod
+    @asynccontextmanager
+    async def _file_lock(cls):
+        """
+        Serialize access to the definitions file across worker processes.
+        """
+        if fcntl is None:
+            yield
+            return
+
+        path = cls._cache_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.lock", "w") as lock_file:
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def _read_entries(cls) -> dict[str, dict]:
+        try:
+            with open(cls._cache_path()) as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable agent definition cache at %s", cls._cache_path())
+            return {}
+
+    @classmethod
+    def _read_definitions(cls) -> dict[str, AzureAIAgentModel]:
+        return {name: AzureAIAgentModel(entry["definition"]) for name, entry in cls._read_entries().items()}
+
+    @classmethod
+    def _write_definition(cls, name: str, definition: AzureAIAgentModel) -> None:
+        path = cls._cache_path()
+        entries = cls._read_entries()
+        entries[name] = {"definition": definition.as_dict(), "saved_at": time.time()}
+
+        # Write to a temporary file first so that readers never see a partial file
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def _remove_definition(cls, name: str, agent_id: str) -> None:
+        entries = cls._read_entries()
+        # Another worker may already have saved a new definition under the name
+        if entries.get(name, {}).get("definition", {}).get("id") != agent_id:
+            return
+
+        del entries[name]
+        path = cls._cache_path()
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temp_path, path)
+
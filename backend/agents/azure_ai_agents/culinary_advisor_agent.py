@@ -1,12 +1,11 @@
 import os
-from azure.identity.aio import DefaultAzureCredential
 from azure.ai.projects.aio import AIProjectClient
 from azure.ai.projects.models import FileSearchTool, OpenAIFile, VectorStore
 from azure.ai.projects.aio import AIProjectClient
 from azure.ai.projects.models import FileSearchTool, OpenAIFile, VectorStore
 from semantic_kernel.agents.azure_ai.azure_ai_agent import AzureAIAgent
-from azure.monitor.opentelemetry import configure_azure_monitor
 
+from agents.azure_ai_agents.azure_ai_project_cache import AzureAIProjectCache
 from models.custom_agent import CustomAgent
 from models.azure_ai_agent import AzureAIAgentRequest
 import uuid
@@ -88,17 +87,8 @@ class CulinaryAdvisorAgent(AzureAIAgent, CustomAgent):
         """
         Perform asynchronous initialization for the CulinaryAdvisorAgent.
         """
-        # Create Azure credentials and client
-        creds = DefaultAzureCredential()
-        client = AIProjectClient.from_connection_string(
-            credential=creds,
-            conn_str=os.environ.get("AZURE_AI_AGENT_PROJECT_CONNECTION_STRING")
-        )
-
-        application_insights_connection_string = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING") # project_client.telemetry.get_connection_string()
-        if application_insights_connection_string:
-            configure_azure_monitor(connection_string=application_insights_connection_string)
-            client.telemetry.enable()
+        # Reuse the process-wide Azure credentials and client
+        client = AzureAIProjectCache.get_client()
 
         # Fetch Agent details from environment variables
         agent_creation_request = AzureAIAgentRequest(
@@ -120,17 +110,27 @@ class CulinaryAdvisorAgent(AzureAIAgent, CustomAgent):
                 If unsure about specific details for a city, acknowledge limitations and provide general guidance for the region while being clear about uncertainties."""
         )
        
-        # Fetch the agent definition
-        agent_definition = await CulinaryAdvisorAgent._create_or_load_agent(
+        # Fetch the agent definition, only loading or creating the agent on a cache miss
+        agent_definition = await AzureAIProjectCache.get_definition(
             agent_creation_request=agent_creation_request,
-            client=client,
+            create_or_load=CulinaryAdvisorAgent._create_or_load_agent,
         )
-        os.environ["CULINARY_AGENT_ID"] = agent_definition.id
         
         # Call the parent class constructor using super()
         super().__init__(client=client, definition=agent_definition)
 
         # Explicitly set the name attribute
         self.name = agent_creation_request.name
+
+        # Pick up definition changes made on the Azure AI agent service
+        AzureAIProjectCache.subscribe(self.name, self.on_definition_refreshed)
         return self
 
+    def on_definition_refreshed(self, agent_definition) -> None:
+        """
+        Apply a refreshed agent definition from the AzureAIProjectCache.
+        """
+        self.definition = agent_definition
+        if agent_definition.instructions:
+            self.instructions = agent_definition.instructions
+
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+dropped_activity_batches = meter.create_counter(
+    name=f"{METRIC_PREFIX}.directline.activity_spans.dropped",
+    description="Number of DirectLine activity batches not logged as spans because the queue was full",
+)
+
+DEFAULT_ATTRIBUTES = "id,type,name,timestamp,replyToId,valueType,text,from.id,from.role,from.name"
+
+
+class ActivitySpanLogger:
+    """
+    Logs the DirectLine activities of Copilot Studio turns as spans, off the request path.
+
+    The activities received together are logged as one span with an event per activity, a
+    child of the current span or a root span when there is none, and a sample_rate share of
+    the batches is kept. Nothing is logged when the current span was dropped by the sampler.
+    The request path only captures the current trace context and queues the activities, a
+    background task builds the spans. Only the attributes in the allow-list are set, "from.id"
+    names a nested attribute and "*" keeps every top-level and nested attribute. Values are cut
+    to max_attribute_size characters.
+    """
+
+    sample_rate = float(os.getenv("DIRECTLINE_ACTIVITY_SPAN_SAMPLE_RATE", 1.0))
+    attributes = [name.strip() for name in os.getenv("DIRECTLINE_ACTIVITY_SPAN_ATTRIBUTES", DEFAULT_ATTRIBUTES).split(",") if name.strip()]
+    max_attribute_size = int(os.getenv("DIRECTLINE_ACTIVITY_SPAN_MAX_ATTRIBUTE_SIZE", 256))
+    queue_size = int(os.getenv("DIRECTLINE_ACTIVITY_SPAN_QUEUE_SIZE", 1000))
+
+    _queue: asyncio.Queue | None = None
+    _task: asyncio.Task | None = None
+
+    @classmethod
+    def record(cls, activities: list[dict[str, Any]]) -> None:
+        """
+        Queue the activities to be logged as one span under the current span.
+        """
+        if not activities:
+            return
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid and not span_context.trace_flags.sampled:
+            # The children of a sampled out span would be dropped too
+            return
+        if cls.sample_rate <= 0 or random.random() >= cls.sample_rate:
+            return
+        entry = (otel_context.get_current(), time.time_ns(), activities)
+
+        if cls._task is None or cls._task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # Not called from a running event loop, the span is built inline instead
+                cls._log(*entry)
+                return
+            cls._queue = asyncio.Queue(maxsize=cls.queue_size)
+            cls._task = loop.create_task(cls._run())
+
+        try:
+            cls._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            dropped_activity_batches.add(1)
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Logs the queued activities and stops the background task.
+        """
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+        if cls._queue is not None:
+            while not cls._queue.empty():
+                cls._log(*cls._queue.get_nowait())
+            cls._queue = None
+
+    @classmethod
+    async def _run(cls) -> None:
+        queue = cls._queue
+        while True:
+            entry = await queue.get()
+            try:
+                cls._log(*entry)
+            except Exception:
+                logger.exception("Failed to log DirectLine activities as a span")
+
+    @classmethod
+    def _log(cls, parent_context: otel_context.Context, timestamp: int, activities: list[dict[str, Any]]) -> None:
+        span = trace.get_tracer(__name__).start_span(
+            "cps-activities",
+            context=parent_context,
+            start_time=timestamp,
+            attributes={"cps.activity_count": len(activities)},
+        )
+        for activity in activities:
+            span.add_event(f"cps-activity-{activity.get('id')}", attributes=cls._attributes(activity), timestamp=timestamp)
+        span.end(end_time=timestamp)
+
+    @classmethod
+    def _attributes(cls, activity: dict[str, Any]) -> dict[str, str]:
+        attributes = {}
+        if "*" in cls.attributes:
+            for key, value in activity.items():
+                if isinstance(value, dict):
+                    # Flatten nested dictionaries with dot notation
+                    for nested_key, nested_value in value.items():
+                        attributes[f"{key}.{nested_key}"] = cls._truncate(nested_value)
+                else:
+                    attributes[key] = cls._truncate(value)
+            return attributes
+
+        for name in cls.attributes:
+            value = activity
+            for key in name.split("."):
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                attributes[name] = cls._truncate(value)
+        return attributes
+
+    @classmethod
+    def _truncate(cls, value: Any) -> str:
+        value = value if isinstance(value, str) else str(value)
+        if len(value) > cls.max_attribute_size:
+            return value[:cls.max_attribute_size] + "..."
+        return value
@@ -1,8 +1,8 @@
 import asyncio
 import logging
+import os
 import sys
 from typing import Any, AsyncIterable, ClassVar
-from opentelemetry import trace
 
 if sys.version_info >= (3, 12):
     from typing import override  # pragma: no cover
@@ -14,6 +14,7 @@ from semantic_kernel.agents.agent import AgentResponseItem, AgentThread
 from semantic_kernel.agents.channels.agent_channel import AgentChannel
 from semantic_kernel.contents.chat_history import ChatHistory
 from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
 from semantic_kernel.contents.utils.author_role import AuthorRole
 from semantic_kernel.exceptions.agent_exceptions import AgentInvokeException
 from semantic_kernel.utils.telemetry.agent_diagnostics.decorators import (
@@ -21,13 +22,20 @@ from semantic_kernel.utils.telemetry.agent_diagnostics.decorators import (
     trace_agent_invocation,
 )
 
+from agents.copilot_studio.base.activity_span_logger import ActivitySpanLogger
 from agents.copilot_studio.base.copilot_agent_channel import CopilotStudioAgentChannel
 from agents.copilot_studio.base.copilot_agent_thread import CopilotAgentThread
 from agents.copilot_studio.base.copilot_message_content import CopilotMessageContent
-from agents.copilot_studio.base.directline_client import DirectLineClient
+from agents.copilot_studio.base.directline_client import DirectLineClient, DirectLineStream, TRANSPORT_WEBSOCKET, TRANSPORT_POLLING
+from agents.copilot_studio.base.turn_scheduler import TurnScheduler
+from agents.copilot_studio.base.directline_conversation_pool import DirectLineConversationPool
+from agents.copilot_studio.base.directline_poller import DirectLinePoller
 
 logger = logging.getLogger(__name__)
 
+# Seconds without any activity on the stream before falling back to polling
+STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv("DIRECTLINE_STREAM_IDLE_TIMEOUT_SECONDS", 30))
+
 
 class CopilotAgent(Agent):
     """
@@ -51,6 +59,8 @@ class CopilotAgent(Agent):
         """
         super().__init__(id=id, name=name, description=description)
         self.directline_client = directline_client
+        # Start conversations in advance, so that the first turn of a new thread does not wait for one
+        DirectLineConversationPool.get(directline_client)
 
     @trace_agent_get_response
     @override
@@ -109,7 +119,7 @@ class CopilotAgent(Agent):
           1. The token is fetched.
           2. A conversation is started if thread ID (conversation ID) does not exist.
           3. The activity payload is posted.
-          4. Activities are polled until an event "DynamicPlanFinished" is received.
+          4. Bot messages are yielded as they arrive, until an event "DynamicPlanFinished" is received.
 
         Args:
             messages: The history of messages in the conversation.
@@ -135,30 +145,26 @@ class CopilotAgent(Agent):
             expected_type=CopilotAgentThread,
         )
         assert thread.id is not None  # nosec
+        # A thread restored from the conversation store has no client yet
+        thread.bind_client(self.directline_client)
 
         normalized_message = ChatMessageContent(role=AuthorRole.USER, content=messages) if isinstance(messages, str) else messages
 
         payload = self._build_payload(normalized_message, message_data, thread.id)
-        response_data = await self._send_message(payload, thread)
-        if response_data is None or "activities" not in response_data:
-            raise AgentInvokeException(
-                f"Invalid response from DirectLine Bot.\n{response_data}"
-            )
 
-        logger.debug("DirectLine Bot response: %s", response_data)
+        # Yield each bot message as soon as it is received, instead of waiting for the end of the turn
+        async for activities in self._send_message(payload, thread):
+            for activity in activities:
+                if (
+                    activity.get("type") != "message"
+                    or activity.get("from", {}).get("id") == "user"
+                ):
+                    continue
 
-        # Process DirectLine activities and convert them to appropriate message content
-        for activity in response_data["activities"]:
-            if (
-                activity.get("type") != "message"
-                or activity.get("from", {}).get("id") == "user"
-            ):
-                continue
-            
-            # Create a CopilotMessageContent instance from the activity
-            message = CopilotMessageContent.from_bot_activity(activity, name=self.name)
-            
-            yield AgentResponseItem(message=message, thread=thread)
+                # Create a CopilotMessageContent instance from the activity
+                message = CopilotMessageContent.from_bot_activity(activity, name=self.name)
+
+                yield AgentResponseItem(message=message, thread=thread)
 
     def _build_payload(
         self,
@@ -190,45 +196,134 @@ class CopilotAgent(Agent):
         payload["conversationId"] = thread_id
         return payload
 
-    async def _send_message(self, payload: dict[str, Any], thread: CopilotAgentThread) -> dict[str, Any] | None:
+    async def _send_message(self, payload: dict[str, Any], thread: CopilotAgentThread) -> AsyncIterable[list[dict[str, Any]]]:
         """
-        Post the payload to the conversation and poll for responses.
+        Post the payload to the conversation and yield the activities as they arrive, on the activity
+        stream of the conversation or by polling if the stream is not available, until the turn is finished.
+        The stream is connected for the turn and closed when it ends.
         """
         if self.directline_client is None:
             raise AgentInvokeException("DirectLine client is not initialized.")
 
+        # Connect before posting, so that no activity is sent before we listen
+        stream = None
+        if self.directline_client.transport == TRANSPORT_WEBSOCKET:
+            try:
+                stream = await thread.get_stream()
+            except Exception as ex:
+                logger.warning("Could not connect to the DirectLine stream, falling back to polling: %s", ex)
+
         # Post the message payload
-        await self.directline_client.post_activity(thread.id, payload)
-
-        # Poll for new activities using watermark until DynamicPlanFinished event is found
-        finished = False
-        collected_data = None
-        while not finished:
-            data = await self.directline_client.get_activities(thread.id, thread.watermark)
-            await thread.update_watermark(data.get("watermark"))
-            activities = data.get("activities", [])
+        try:
+            posted = await self.directline_client.post_activity(thread.id, payload)
+        except Exception:
+            await thread.close_stream()
+            raise
+        scheduler = TurnScheduler()
+        # Bot activities of this turn reply to the posted activity
+        scheduler.reply_to_id = posted.get("id")
+
+        transport = TRANSPORT_POLLING
+        try:
+            finished = False
+            if stream is not None:
+                async for activities in self._receive_message(stream, thread, scheduler):
+                    yield activities
+                    if self._is_turn_finished(activities):
+                        finished = True
+                        break
+
+                # The stream went quiet after the bot answered, or closed or stayed idle before that
+                if finished or scheduler.messages_received:
+                    transport = TRANSPORT_WEBSOCKET
+                    return
+                await thread.close_stream()
+
+            async for activities in self._poll_message(thread, scheduler):
+                yield activities
+                if self._is_turn_finished(activities):
+                    break
+        finally:
+            # The stream is not kept between turns: activities sent after the turn, like a late
+            # DynamicPlanFinished, would be buffered and end the next turn, and an idle conversation
+            # would hold a connection of the shared pool
+            await thread.close_stream()
+            scheduler.record_turn(transport)
+
+    async def _receive_message(self, stream: DirectLineStream, thread: CopilotAgentThread, scheduler: TurnScheduler) -> AsyncIterable[list[dict[str, Any]]]:
+        """
+        Yield the activities received from the stream. Ends once the bot has answered and the stream stays
+        quiet for the settle time, or when the stream closes or stays idle, so that the caller can poll instead.
+        """
+        while True:
+            settle_remaining = scheduler.settle_remaining
+            idle_timeout = STREAM_IDLE_TIMEOUT_SECONDS if settle_remaining is None else settle_remaining
+            try:
+                data = await stream.receive(timeout=min(idle_timeout, scheduler.remaining))
+            except asyncio.TimeoutError:
+                self._check_deadline(scheduler)
+                if not scheduler.messages_received:
+                    logger.warning("No activity on the DirectLine stream for %s seconds, falling back to polling", STREAM_IDLE_TIMEOUT_SECONDS)
+                return
+            if data is None:
+                logger.warning("DirectLine stream closed")
+                return
+
+            if data.get("watermark"):
+                await thread.update_watermark(data.get("watermark"))
+            # Activities already received in this turn are skipped
+            activities = scheduler.record_activities(data.get("activities", []))
+            if not activities:
+                continue
             await self.log_activities_as_spans(activities)
-            
-            # Check for either DynamicPlanFinished event or message from bot
-            if any(
-                (
-                    activity.get("type") == "event"
-                    and activity.get("name") == "DynamicPlanFinished"
-                )
-                or
-                (
-                    activity.get("type") == "message"
-                    and activity.get("from", {}).get("role") == "bot"
-                )
-                for activity in activities
-            ):
-                collected_data = data
-                finished = True
-                break
-            
-            await asyncio.sleep(1)
+            yield activities
 
-        return collected_data
+    async def _poll_message(self, thread: CopilotAgentThread, scheduler: TurnScheduler) -> AsyncIterable[list[dict[str, Any]]]:
+        """
+        Yield the activities the shared poller delivers. Ends once the bot has answered and no activity
+        arrives for the settle time. The first poll is immediate, the scheduler backs off the later ones
+        until the turn deadline.
+        """
+        async with DirectLinePoller.get(self.directline_client).watch(thread.id, thread.watermark, scheduler) as watch:
+            while True:
+                settle_remaining = scheduler.settle_remaining
+                timeout = scheduler.remaining if settle_remaining is None else min(settle_remaining, scheduler.remaining)
+                try:
+                    data = await asyncio.wait_for(watch.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    self._check_deadline(scheduler)
+                    if scheduler.messages_received:
+                        return
+                    continue
+
+                await thread.update_watermark(watch.watermark)
+                # Activities already received in this turn, on the stream or a previous poll, are skipped
+                activities = scheduler.record_activities(data.get("activities", []))
+                if not activities:
+                    continue
+                await self.log_activities_as_spans(activities)
+                yield activities
+
+    @staticmethod
+    def _check_deadline(scheduler: TurnScheduler) -> None:
+        if scheduler.expired:
+            raise AgentInvokeException(
+                f"Copilot Studio agent did not finish its turn within {scheduler.deadline_seconds} seconds."
+            )
+
+    @staticmethod
+    def _is_turn_finished(activities: list[dict[str, Any]]) -> bool:
+        """
+        Check for the DynamicPlanFinished event, or the end of the conversation.
+        """
+        return any(
+            (
+                activity.get("type") == "event"
+                and activity.get("name") == "DynamicPlanFinished"
+            )
+            or activity.get("type") == "endOfConversation"
+            for activity in activities
+        )
 
     async def close(self) -> None:
         """
@@ -237,11 +332,46 @@ class CopilotAgent(Agent):
         if self.directline_client:
             await self.directline_client.close()
 
-    # TODO not implemented yet, maybe use websockets for this?
+    @property
+    def supports_streaming(self) -> bool:
+        """
+        Whether invoke_stream should be used by callers that stream. Every activity is a complete
+        message and invoke already yields them as they arrive, so callers use invoke.
+        """
+        return False
+
     @trace_agent_invocation
     @override
-    async def invoke_stream(self, *args, **kwargs):
-        return super().invoke_stream(*args, **kwargs)
+    async def invoke_stream(
+        self,
+        *,
+        messages: str | ChatMessageContent | list[str | ChatMessageContent],
+        thread: AgentThread | None = None,
+        message_data: dict[str, Any] | None = None,
+        **kwargs,
+    ) -> AsyncIterable[AgentResponseItem[StreamingChatMessageContent]]:
+        """Send the message to the DirectLine Bot and yield each bot message as a chunk as soon as
+        it is received, until an event "DynamicPlanFinished" is received.
+
+        Args:
+            messages: The history of messages in the conversation.
+            thread: The thread ID (conversation ID).
+            message_data: Optional dict that will be sent as the "value" field in the payload
+                for adaptive card responses.
+            kwargs: Additional keyword arguments.
+
+        Returns:
+            An async iterable of AgentResponseItem[StreamingChatMessageContent].
+        """
+        async for response in self.invoke(messages=messages, thread=thread, message_data=message_data, **kwargs):
+            chunk = StreamingChatMessageContent(
+                role=response.message.role,
+                choice_index=0,
+                items=response.message.items,
+                name=response.message.name,
+                metadata=response.message.metadata,
+            )
+            yield AgentResponseItem(message=chunk, thread=response.thread)
     
     async def create_channel(self, thread_id: str | None = None) -> AgentChannel:
         """Create a Copilot Agent channel.
@@ -267,21 +397,9 @@ class CopilotAgent(Agent):
 
     async def log_activities_as_spans(self, activities: list[dict]) -> None:
         """
-        Logs each activity in the provided list as an individual span.
+        Logs the provided activities as one span with an event per activity, or as a span
+        each outside of a recorded span. The spans are built in the background, see ActivitySpanLogger.
         Args:
-            activities (list[dict]): List of activity dictionaries to log as spans.
+            activities (list[dict]): List of activity dictionaries to log.
         """
-
-        tracer = trace.get_tracer(__name__)  # Use the existing tracer
-        for activity in activities:
-            # Start a new span for each activity
-            with tracer.start_as_current_span(f"cps-activity-{activity.get('id')}") as span:
-                # Add attributes to the span
-               for key, value in activity.items():
-                if isinstance(value, dict):
-                    # If the value is a nested dictionary, flatten it with dot notation
-                    for nested_key, nested_value in value.items():
-                        span.set_attribute(f"{key}.{nested_key}", str(nested_value))
-                else:
-                    # Set the attribute directly for non-dictionary values
-                    span.set_attribute(key, str(value))
+        ActivitySpanLogger.record(activities)
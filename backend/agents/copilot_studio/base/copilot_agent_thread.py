@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import sys
+from typing import Any
 
 if sys.version_info >= (3, 12):
     from typing import override  # pragma: no cover
@@ -9,25 +11,32 @@ else:
 from semantic_kernel.agents.agent import AgentThread
 from semantic_kernel.contents.chat_message_content import ChatMessageContent
 
-from agents.copilot_studio.base.directline_client import DirectLineClient
+from agents.copilot_studio.base.directline_client import DirectLineClient, DirectLineStream
+from agents.copilot_studio.base.directline_conversation_pool import DirectLineConversationPool
+from models.conversation_state import ConversationState
+from models.conversation_state_codec import ConversationStateCodec
 
 # Logger setup
 logger = logging.getLogger(__name__)
 
+# Streams being closed for threads released by a conversation store
+_closing_streams: set[asyncio.Task] = set()
+
 
 class CopilotAgentThread(AgentThread):
     """Copilot Agent Thread class."""
 
     def __init__(
         self,
-        directline_client: DirectLineClient,
+        directline_client: DirectLineClient | None,
         conversation_id: str | None = None,
         watermark: str | None = None,
     ) -> None:
         """Initialize the Copilot Agent Thread.
 
         Args:
-            directline_client: The DirectLine client for API communication.
+            directline_client: The DirectLine client for API communication. A thread restored from a
+                conversation store has none until the agent binds its client.
             conversation_id: The conversation ID (optional).
             watermark: The watermark for tracking conversation state (optional).
         """
@@ -35,11 +44,17 @@ class CopilotAgentThread(AgentThread):
         self._directline_client = directline_client
         self._id = conversation_id
         self.watermark = watermark
+        # A stream URL can only be connected to once, a new one is requested when reconnecting
+        self.stream_url: str | None = None
+        self._stream: DirectLineStream | None = None
 
     @override
     async def _create(self) -> str:
-        """Starts the thread and returns the underlying Copilot Studio Agent conversation ID."""
-        self._id = await self._directline_client.start_conversation()
+        """Starts the thread and returns the underlying Copilot Studio Agent conversation ID.
+        A conversation started in advance is claimed from the pool when one is available."""
+        conversation = await DirectLineConversationPool.get(self._directline_client).claim()
+        self._id = conversation.conversation_id
+        self.stream_url = conversation.stream_url
         return self._id
 
     @override
@@ -49,7 +64,7 @@ class CopilotAgentThread(AgentThread):
         This will only end the underlying DirectLine conversation but not delete it.
         """
         # DirectLine API does not provide a specific endpoint to delete conversations.
-        pass
+        await self.close_stream()
 
     @override
     async def _on_new_message(self, new_message: str | ChatMessageContent) -> None:
@@ -63,4 +78,68 @@ class CopilotAgentThread(AgentThread):
         Args:
             watermark: The new watermark.
         """
-        self.watermark = watermark
\ No newline at end of file
+        self.watermark = watermark
+
+    def bind_client(self, directline_client: DirectLineClient) -> None:
+        """Set the DirectLine client of a restored thread.
+
+        Args:
+            directline_client: The DirectLine client of the agent invoking the thread.
+        """
+        if self._directline_client is None:
+            self._directline_client = directline_client
+
+    async def get_stream(self) -> DirectLineStream:
+        """Get the activity stream of the conversation, connecting to it if it is not open.
+
+        Returns:
+            The open activity stream.
+        """
+        if self._stream is None or self._stream.closed:
+            stream_url = self.stream_url
+            self.stream_url = None
+            if stream_url is None:
+                conversation = await self._directline_client.reconnect(self._id, self.watermark)
+                stream_url = conversation.stream_url
+            self._stream = await self._directline_client.open_stream(stream_url)
+        return self._stream
+
+    async def close_stream(self) -> None:
+        """Close the activity stream of the conversation, if it is open."""
+        if self._stream is not None:
+            await self._stream.close()
+            self._stream = None
+
+    def release_stream(self) -> None:
+        """Close the activity stream in the background, for callers that can not await, like the
+        eviction hook of a conversation store. The stream is dropped if no event loop is running."""
+        stream, self._stream = self._stream, None
+        self.stream_url = None
+        if stream is None or stream.closed:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(stream.close())
+        except RuntimeError:
+            logger.warning("No running event loop to close the DirectLine stream of conversation %s", self._id)
+            return
+        _closing_streams.add(task)
+        task.add_done_callback(_closing_streams.discard)
+
+
+def release_copilot_streams(state: ConversationState, reason: str) -> None:
+    """on_evict hook of the in-memory conversation store, closing the streams of the released Copilot threads."""
+    for thread in state.threads.values():
+        if isinstance(thread, CopilotAgentThread):
+            thread.release_stream()
+
+
+def _encode_copilot_thread(thread: CopilotAgentThread) -> dict[str, Any]:
+    # The stream and its URL are only valid in this process, a restored thread reconnects
+    return {"id": thread.id, "watermark": thread.watermark}
+
+
+def _decode_copilot_thread(data: dict[str, Any]) -> CopilotAgentThread:
+    return CopilotAgentThread(directline_client=None, conversation_id=data.get("id"), watermark=data.get("watermark"))
+
+
+ConversationStateCodec.register(CopilotAgentThread, "copilot_studio", _encode_copilot_thread, _decode_copilot_thread)
@@ -1,10 +1,67 @@
+import json
 import logging
+import os
+from dataclasses import dataclass
 from typing import Optional, Dict, Any, Mapping
 
 import aiohttp
 
+from agents.copilot_studio.base.directline_session_pool import DirectLineSessionPool
+
 logger = logging.getLogger(__name__)
 
+TRANSPORT_WEBSOCKET = "websocket"
+TRANSPORT_POLLING = "polling"
+
+
+@dataclass
+class DirectLineConversation:
+    """A DirectLine conversation together with the WebSocket URL its activities are streamed on."""
+
+    conversation_id: str
+    stream_url: Optional[str] = None
+    token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class DirectLineStream:
+    """
+    The DirectLine WebSocket stream of a conversation.
+    The bot pushes activity sets over it as soon as they are sent.
+    """
+
+    def __init__(self, websocket: aiohttp.ClientWebSocketResponse) -> None:
+        self._websocket = websocket
+
+    @property
+    def closed(self) -> bool:
+        return self._websocket.closed
+
+    async def receive(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next activity set, skipping the empty keep-alive messages.
+
+        Args:
+            timeout: Seconds to wait before giving up.
+
+        Returns:
+            The activity set, or None if the stream was closed.
+
+        Raises:
+            asyncio.TimeoutError: If no activity set arrived within the timeout.
+        """
+        while True:
+            message = await self._websocket.receive(timeout=timeout)
+            if message.type == aiohttp.WSMsgType.TEXT:
+                if message.data.strip():
+                    return json.loads(message.data)
+            elif message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                return None
+
+    async def close(self) -> None:
+        if not self._websocket.closed:
+            await self._websocket.close()
+
 class DirectLineClient:
     """
     Manages DirectLine API interactions.
@@ -15,6 +72,7 @@ class DirectLineClient:
         self,
         directline_endpoint: str,
         copilot_agent_secret: str,
+        transport: Optional[str] = None,
     ) -> None:
         """
         Initialize the DirectLine Client.
@@ -22,37 +80,30 @@ class DirectLineClient:
         Args:
             directline_endpoint: The endpoint for the DirectLine API.
             copilot_agent_secret: The secret used to authenticate with DirectLine API.
+            transport: How activities are received, "websocket" (default) or "polling".
+                Defaults to the DIRECTLINE_TRANSPORT environment variable.
             
         """
         self.directline_endpoint = directline_endpoint
         self.copilot_agent_secret = copilot_agent_secret
-        self._session: Optional[aiohttp.ClientSession] = None
+        self.transport = transport or os.getenv("DIRECTLINE_TRANSPORT", TRANSPORT_WEBSOCKET)
 
     async def get_session(self) -> aiohttp.ClientSession:
         """
         Get an authenticated aiohttp ClientSession using the bot secret.
-        Creates a new session if one doesn't exist already.
+        The session is shared by all clients with the same endpoint and secret.
             
         Returns:
             An authenticated aiohttp ClientSession.
         """
-        # Create a session with the bot secret for authorization
-        if self._session is None or self._session.closed:
-            headers = {
-                "Authorization": f"Bearer {self.copilot_agent_secret}",
-                "Content-Type": "application/json",
-            }
-            self._session = aiohttp.ClientSession(headers=headers)
-            
-        return self._session
+        return DirectLineSessionPool.get_session(self.directline_endpoint, self.copilot_agent_secret)
 
     async def close(self) -> None:
         """
-        Close the aiohttp session.
+        Release the client. The shared session stays open for the other clients
+        and is closed with DirectLineSessionPool.close on shutdown.
         """
-        if self._session and not self._session.closed:
-            await self._session.close()
-            logger.debug("DirectLine session closed")
+        logger.debug("DirectLine client closed")
     
     async def post_activity(self, conversation_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -115,6 +166,20 @@ class DirectLineClient:
         Returns:
             The conversation ID.
             
+        Raises:
+            Exception: If starting the conversation fails.
+        """
+        conversation = await self.create_conversation()
+        return conversation.conversation_id
+
+    async def create_conversation(self) -> DirectLineConversation:
+        """
+        Start a new DirectLine conversation.
+        Uses the bot secret directly to start the conversation.
+        
+        Returns:
+            The conversation, with the URL of its activity stream.
+            
         Raises:
             Exception: If starting the conversation fails.
         """
@@ -134,4 +199,55 @@ class DirectLineClient:
                 
             logger.debug(f"Created conversation {conversation_id}")
             
-            return conversation_id
\ No newline at end of file
+            return DirectLineConversation(
+                conversation_id=conversation_id,
+                stream_url=data.get("streamUrl"),
+                token=data.get("token"),
+                expires_in=data.get("expires_in"),
+            )
+
+    async def reconnect(self, conversation_id: str, watermark: Optional[str] = None) -> DirectLineConversation:
+        """
+        Get a new stream URL for an existing conversation. Activities after the watermark are sent again on the new stream.
+        
+        Args:
+            conversation_id: The conversation ID.
+            watermark: The watermark of the last received activities.
+            
+        Returns:
+            The conversation, with the URL of its activity stream.
+            
+        Raises:
+            Exception: If reconnecting to the conversation fails.
+        """
+        session = await self.get_session()
+        conversation_url = f"{self.directline_endpoint}/conversations/{conversation_id}"
+        if watermark:
+            conversation_url = f"{conversation_url}?watermark={watermark}"
+
+        async with session.get(conversation_url) as resp:
+            if resp.status != 200:
+                raise Exception(f"Failed to reconnect to DirectLine conversation. Status: {resp.status}")
+
+            data = await resp.json()
+            return DirectLineConversation(
+                conversation_id=conversation_id,
+                stream_url=data.get("streamUrl"),
+                token=data.get("token"),
+                expires_in=data.get("expires_in"),
+            )
+
+    async def open_stream(self, stream_url: str) -> DirectLineStream:
+        """
+        Connect to the activity stream of a conversation.
+        
+        Args:
+            stream_url: The stream URL returned when the conversation was started or reconnected.
+            
+        Returns:
+            The activity stream.
+        """
+        session = await self.get_session()
+        websocket = await session.ws_connect(stream_url, heartbeat=30)
+        logger.debug("Connected to DirectLine stream")
+        return DirectLineStream(websocket)
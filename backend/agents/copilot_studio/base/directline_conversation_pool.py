@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import replace
+
+from agents.copilot_studio.base.directline_client import DirectLineClient, DirectLineConversation
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+conversation_pool_hits = meter.create_counter(
+    name=f"{METRIC_PREFIX}.directline.conversation_pool.hits",
+    description="Number of new Copilot Studio threads that claimed a pre-started DirectLine conversation",
+)
+conversation_pool_misses = meter.create_counter(
+    name=f"{METRIC_PREFIX}.directline.conversation_pool.misses",
+    description="Number of new Copilot Studio threads that had to start a DirectLine conversation inline",
+)
+
+# DirectLine only accepts a connection on a stream URL shortly after it was issued
+STREAM_URL_TTL_SECONDS = 50
+# Margin kept before the expiry of the conversation token
+EXPIRY_MARGIN_SECONDS = 60
+
+
+class DirectLineConversationPool:
+    """
+    Pool of already started DirectLine conversations, so that a new thread does not
+    pay the round trip of starting one on its first turn.
+
+    Each pool belongs to an endpoint and secret and a background task keeps it filled
+    with size conversations. Conversations older than max_age_seconds, or close to the
+    expiry of their token, are discarded. The stream URL of a conversation is dropped
+    once it is too old to connect to, the thread then requests a new one when it
+    connects.
+    """
+
+    _pools: dict[tuple[str, str], "DirectLineConversationPool"] = {}
+
+    def __init__(self, directline_client: DirectLineClient, size: int | None = None, max_age_seconds: float | None = None):
+        self.directline_client = directline_client
+        self.size = size if size is not None else int(os.getenv("DIRECTLINE_CONVERSATION_POOL_SIZE", 2))
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else float(os.getenv("DIRECTLINE_CONVERSATION_POOL_MAX_AGE_SECONDS", 300))
+        self._conversations: deque[tuple[float, DirectLineConversation]] = deque()
+        self._refill_task: asyncio.Task | None = None
+        self._claimed = asyncio.Event()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get(cls, directline_client: DirectLineClient) -> "DirectLineConversationPool":
+        """
+        Get the pool for the endpoint and secret of the client, creating it and starting to fill it on first use.
+        """
+        key = (directline_client.directline_endpoint, directline_client.copilot_agent_secret)
+        pool = cls._pools.get(key)
+        if pool is None:
+            pool = cls(directline_client)
+            cls._pools[key] = pool
+        pool.refill()
+        return pool
+
+    async def claim(self) -> DirectLineConversation:
+        """
+        Take a started conversation from the pool, or start one if the pool is empty.
+        """
+        conversation = self._take()
+        # Wake the refill task up, so that it replaces the claimed conversation now
+        self._claimed.set()
+        self.refill()
+        if conversation is not None:
+            self.hits += 1
+            conversation_pool_hits.add(1)
+            return conversation
+
+        self.misses += 1
+        conversation_pool_misses.add(1)
+        return await self.directline_client.create_conversation()
+
+    def refill(self) -> None:
+        """
+        Start refilling the pool in the background, if it is not already being refilled.
+        """
+        if self.size <= 0:
+            return
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        try:
+            self._refill_task = asyncio.get_running_loop().create_task(self._refill())
+        except RuntimeError:
+            # Not called from a running event loop, the pool is filled on the first claim instead
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "endpoint": self.directline_client.directline_endpoint,
+            "size": self.size,
+            "available": len(self._conversations),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Stops refilling all pools and discards their conversations.
+        """
+        pools = list(cls._pools.values())
+        cls._pools.clear()
+        for pool in pools:
+            if pool._refill_task is not None:
+                pool._refill_task.cancel()
+            pool._conversations.clear()
+
+    def _take(self) -> DirectLineConversation | None:
+        while self._conversations:
+            created_at, conversation = self._conversations.popleft()
+            age = time.monotonic() - created_at
+            if age >= self._max_age(conversation):
+                continue
+            if age >= STREAM_URL_TTL_SECONDS:
+                conversation = replace(conversation, stream_url=None)
+            return conversation
+        return None
+
+    def _max_age(self, conversation: DirectLineConversation) -> float:
+        if conversation.expires_in is None:
+            return self.max_age_seconds
+        return min(self.max_age_seconds, conversation.expires_in - EXPIRY_MARGIN_SECONDS)
+
+    async def _refill(self) -> None:
+        # Keep the pool full, replacing the conversations as they expire
+        while True:
+            now = time.monotonic()
+            self._conversations = deque(
+                (created_at, conversation) for created_at, conversation in self._conversations
+                if now - created_at < self._max_age(conversation)
+            )
+            while len(self._conversations) < self.size:
+                try:
+                    conversation = await self.directline_client.create_conversation()
+                except Exception:
+                    logger.exception("Failed to start a DirectLine conversation for the pool")
+                    return
+                self._conversations.append((time.monotonic(), conversation))
+
+            created_at, conversation = self._conversations[0]
+            self._claimed.clear()
+            try:
+                await asyncio.wait_for(self._claimed.wait(), timeout=max(created_at + self._max_age(conversation) - time.monotonic(), 1.0))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from agents.copilot_studio.base.directline_client import DirectLineClient
+from agents.copilot_studio.base.turn_scheduler import TurnScheduler
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+poller_requests = meter.create_counter(
+    name=f"{METRIC_PREFIX}.directline.poller.requests",
+    description="Number of get_activities calls made by the shared DirectLine poller",
+)
+
+# Shortest delay between two polls of the same conversation
+MIN_POLL_DELAY_SECONDS = 0.05
+
+
+class ConversationWatch:
+    """
+    A conversation that is waiting for activities, polled by the DirectLinePoller.
+    Activity sets are delivered on a queue in the order they were received.
+    """
+
+    def __init__(self, conversation_id: str, watermark: str | None, scheduler: TurnScheduler):
+        self.conversation_id = conversation_id
+        self.watermark = watermark
+        self.scheduler = scheduler
+        self.next_poll_at = time.monotonic()
+        self.polling = False
+        self._deliveries: asyncio.Queue = asyncio.Queue()
+
+    async def get(self) -> dict[str, Any]:
+        """
+        Wait for the next set of activities.
+
+        Raises:
+            Exception: If polling the conversation failed.
+        """
+        data = await self._deliveries.get()
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+    def deliver(self, data: dict[str, Any] | Exception) -> None:
+        self._deliveries.put_nowait(data)
+
+
+class DirectLinePoller:
+    """
+    One background poller for all the conversations of an endpoint and secret that are waiting for activities.
+
+    Each watched conversation is polled when its own scheduler says so, the one that is
+    due first goes first. All polls share a budget of requests_per_second and at most
+    max_concurrency requests are in flight, so the request rate to DirectLine does not
+    grow with the number of concurrent invocations.
+    """
+
+    _pollers: dict[tuple[str, str], "DirectLinePoller"] = {}
+
+    def __init__(self, directline_client: DirectLineClient, requests_per_second: float | None = None, max_concurrency: int | None = None):
+        self.directline_client = directline_client
+        self.requests_per_second = requests_per_second if requests_per_second is not None else float(os.getenv("DIRECTLINE_POLLER_REQUESTS_PER_SECOND", 20))
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(os.getenv("DIRECTLINE_POLLER_MAX_CONCURRENCY", 8))
+        self._watches: set[ConversationWatch] = set()
+        self._changed = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(self.max_concurrency)
+        self._tokens = self.requests_per_second
+        self._tokens_updated_at = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self.requests = 0
+
+    @classmethod
+    def get(cls, directline_client: DirectLineClient) -> "DirectLinePoller":
+        """
+        Get the poller for the endpoint and secret of the client, creating it on first use.
+        """
+        key = (directline_client.directline_endpoint, directline_client.copilot_agent_secret)
+        poller = cls._pollers.get(key)
+        if poller is None:
+            poller = cls(directline_client)
+            cls._pollers[key] = poller
+        return poller
+
+    @asynccontextmanager
+    async def watch(self, conversation_id: str, watermark: str | None, scheduler: TurnScheduler) -> AsyncIterator[ConversationWatch]:
+        """
+        Poll the conversation for activities after the watermark until the context exits.
+        The first poll is immediate, later ones are spaced by the scheduler.
+        """
+        watch = ConversationWatch(conversation_id, watermark, scheduler)
+        self._watches.add(watch)
+        self._changed.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            yield watch
+        finally:
+            self._watches.discard(watch)
+
+    def stats(self) -> dict:
+        return {
+            "endpoint": self.directline_client.directline_endpoint,
+            "watched_conversations": len(self._watches),
+            "requests": self.requests,
+        }
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Stops all pollers.
+        """
+        pollers = list(cls._pollers.values())
+        cls._pollers.clear()
+        for poller in pollers:
+            if poller._task is not None:
+                poller._task.cancel()
+
+    async def _run(self) -> None:
+        polls: set[asyncio.Task] = set()
+        try:
+            while self._watches:
+                waiting = [watch for watch in self._watches if not watch.polling]
+                due = min(waiting, key=lambda watch: watch.next_poll_at, default=None)
+                delay = due.next_poll_at - time.monotonic() if due is not None else None
+
+                if delay is None or delay > 0:
+                    # Sleep until the next poll is due, or a conversation is added or polled
+                    self._changed.clear()
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._take_token()
+                await self._in_flight.acquire()
+                due.polling = True
+                poll = asyncio.create_task(self._poll(due))
+                polls.add(poll)
+                poll.add_done_callback(polls.discard)
+        finally:
+            for poll in polls:
+                poll.cancel()
+
+    async def _take_token(self) -> None:
+        # Token bucket holding up to one second of requests
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._tokens_updated_at) * self.requests_per_second, self.requests_per_second)
+            self._tokens_updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.requests_per_second)
+
+    async def _poll(self, watch: ConversationWatch) -> None:
+        try:
+            self.requests += 1
+            poller_requests.add(1)
+            watch.scheduler.record_poll()
+            data = await self.directline_client.get_activities(watch.conversation_id, watch.watermark)
+        except Exception as ex:
+            watch.deliver(ex)
+            return
+        finally:
+            self._in_flight.release()
+            watch.polling = False
+            watch.next_poll_at = time.monotonic() + max(watch.scheduler.next_delay(), MIN_POLL_DELAY_SECONDS)
+            self._changed.set()
+
+        if data.get("watermark"):
+            watch.watermark = data.get("watermark")
+        if data.get("activities"):
+            watch.deliver(data)
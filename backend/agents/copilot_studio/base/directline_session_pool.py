@@ -0,0 +1,90 @@
+import logging
+import os
+from typing import Iterable
+
+import aiohttp
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class DirectLineSessionPool:
+    """
+    Process-wide aiohttp sessions for the DirectLine API, one per endpoint and secret.
+
+    Every DirectLineClient with the same endpoint and secret shares the session and
+    its connection pool, so that connections and TLS sessions are reused across agent
+    instances and turns. The connector keeps idle connections alive, limits the
+    connections per host and caches DNS lookups.
+    """
+
+    _sessions: dict[tuple[str, str], aiohttp.ClientSession] = {}
+
+    @classmethod
+    def get_session(cls, directline_endpoint: str, copilot_agent_secret: str) -> aiohttp.ClientSession:
+        """
+        Get the shared session for the endpoint and secret, creating it on first use.
+        """
+        key = (directline_endpoint, copilot_agent_secret)
+        session = cls._sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=int(os.getenv("DIRECTLINE_POOL_LIMIT", 100)),
+                limit_per_host=int(os.getenv("DIRECTLINE_POOL_LIMIT_PER_HOST", 32)),
+                keepalive_timeout=float(os.getenv("DIRECTLINE_POOL_KEEPALIVE_SECONDS", 60)),
+                ttl_dns_cache=int(os.getenv("DIRECTLINE_POOL_DNS_CACHE_SECONDS", 300)),
+            )
+            headers = {
+                "Authorization": f"Bearer {copilot_agent_secret}",
+                "Content-Type": "application/json",
+            }
+            session = aiohttp.ClientSession(connector=connector, headers=headers)
+            cls._sessions[key] = session
+            logger.debug("Created DirectLine session for %s", directline_endpoint)
+        return session
+
+    @classmethod
+    def stats(cls) -> list[dict]:
+        """
+        Returns the connection usage of each shared session.
+        """
+        stats = []
+        for (directline_endpoint, _), session in cls._sessions.items():
+            connector = session.connector
+            if session.closed or connector is None:
+                continue
+            stats.append({
+                "endpoint": directline_endpoint,
+                "in_use": len(connector._acquired),
+                "idle": sum(len(connections) for connections in connector._conns.values()),
+                "limit": connector.limit,
+                "limit_per_host": connector.limit_per_host,
+            })
+        return stats
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Closes all shared sessions.
+        """
+        sessions = list(cls._sessions.values())
+        cls._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        logger.debug("DirectLine sessions closed")
+
+
+def observe_connections(options: CallbackOptions) -> Iterable[Observation]:
+    for session_stats in DirectLineSessionPool.stats():
+        yield Observation(session_stats["in_use"], {"endpoint": session_stats["endpoint"], "state": "in_use"})
+        yield Observation(session_stats["idle"], {"endpoint": session_stats["endpoint"], "state": "idle"})
+
+
+meter.create_observable_gauge(
+    name=f"{METRIC_PREFIX}.directline.connections",
+    callbacks=[observe_connections],
+    description="Number of DirectLine connections of the shared sessions, by state",
+)
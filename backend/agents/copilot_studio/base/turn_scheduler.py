@@ -0,0 +1,133 @@
+import logging
+import os
+import random
+import time
+from typing import Any, Optional
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+polls_per_turn = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.directline.polls_per_turn",
+    description="Number of get_activities calls made for one Copilot Studio turn",
+)
+time_to_first_activity = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.directline.time_to_first_activity",
+    unit="ms",
+    description="Time from posting a message to receiving the first activity of the bot",
+)
+turn_duration = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.directline.turn_duration",
+    unit="ms",
+    description="Time from posting a message to the end of the Copilot Studio turn",
+)
+
+
+class TurnScheduler:
+    """
+    Schedules the polls of one Copilot Studio turn and enforces its deadline.
+
+    The first poll happens right after the message is posted, later polls back off
+    exponentially with jitter up to max_delay. No poll is scheduled past the deadline.
+    Once the bot has sent a message, the turn settles when no new activity arrives for
+    settle_seconds, for bots that do not signal the end of their turn. Activities that
+    reply to another message than the one posted in this turn are dropped.
+    Poll counts and the time to the first bot activity are recorded when the turn ends.
+    """
+
+    def __init__(
+        self,
+        initial_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        multiplier: Optional[float] = None,
+        jitter: Optional[float] = None,
+        deadline_seconds: Optional[float] = None,
+        settle_seconds: Optional[float] = None,
+    ):
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv("DIRECTLINE_POLL_INITIAL_SECONDS", 0.25))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("DIRECTLINE_POLL_MAX_SECONDS", 2.0))
+        self.multiplier = multiplier if multiplier is not None else float(os.getenv("DIRECTLINE_POLL_MULTIPLIER", 2.0))
+        self.jitter = jitter if jitter is not None else float(os.getenv("DIRECTLINE_POLL_JITTER", 0.2))
+        self.deadline_seconds = deadline_seconds if deadline_seconds is not None else float(os.getenv("DIRECTLINE_TURN_DEADLINE_SECONDS", 120))
+        self.settle_seconds = settle_seconds if settle_seconds is not None else float(os.getenv("DIRECTLINE_TURN_SETTLE_SECONDS", 2.0))
+
+        self.started_at = time.monotonic()
+        self.polls = 0
+        self.first_activity_at: Optional[float] = None
+        self.messages_received = 0
+        self.last_activity_at: Optional[float] = None
+        self._delay = self.initial_delay
+        self._seen_activity_ids: set[str] = set()
+        # Id of the activity posted in this turn, once known
+        self.reply_to_id: Optional[str] = None
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left until the deadline."""
+        return max(self.deadline_seconds - (time.monotonic() - self.started_at), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0.0
+
+    @property
+    def settle_remaining(self) -> Optional[float]:
+        """Seconds left until the turn settles, or None if the bot has not sent a message yet."""
+        if not self.messages_received:
+            return None
+        return max(self.settle_seconds - (time.monotonic() - self.last_activity_at), 0.0)
+
+    def next_delay(self) -> float:
+        """
+        Get the delay before the next poll and back off for the one after.
+        The delay never goes past the deadline.
+        """
+        delay = self._delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._delay = min(self._delay * self.multiplier, self.max_delay)
+        return min(delay, self.remaining)
+
+    def record_poll(self) -> None:
+        self.polls += 1
+
+    def record_activities(self, activities: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Record the activities that were not already received in this turn and return them.
+        Activities of an earlier turn, sent after it ended, are dropped.
+        Tracks the first activity not sent by the user and counts the bot messages.
+        """
+        activities = [
+            activity for activity in activities
+            if (activity.get("id") is None or activity.get("id") not in self._seen_activity_ids)
+            and not self._replies_to_another_turn(activity)
+        ]
+        self._seen_activity_ids.update(activity.get("id") for activity in activities if activity.get("id") is not None)
+
+        bot_activities = [activity for activity in activities if activity.get("from", {}).get("id") != "user"]
+        if bot_activities:
+            self.last_activity_at = time.monotonic()
+            if self.first_activity_at is None:
+                self.first_activity_at = self.last_activity_at
+        self.messages_received += sum(1 for activity in bot_activities if activity.get("type") == "message")
+        return activities
+
+    def _replies_to_another_turn(self, activity: dict[str, Any]) -> bool:
+        reply_to_id = activity.get("replyToId")
+        return self.reply_to_id is not None and reply_to_id is not None and reply_to_id != self.reply_to_id
+
+    def record_turn(self, transport: str) -> None:
+        """Record the poll count, the time to the first activity and the duration of the turn."""
+        attributes = {"transport": transport}
+        ended_at = time.monotonic()
+        polls_per_turn.record(self.polls, attributes)
+        turn_duration.record((ended_at - self.started_at) * 1000, attributes)
+        if self.first_activity_at is not None:
+            time_to_first_activity.record((self.first_activity_at - self.started_at) * 1000, attributes)
+
+        logger.debug(
+            "Copilot Studio turn over %s took %.2fs with %s polls, first activity after %s",
+            transport,
+            ended_at - self.started_at,
+            self.polls,
+            f"{self.first_activity_at - self.started_at:.2f}s" if self.first_activity_at is not None else "none",
+        )
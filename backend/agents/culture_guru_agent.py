@@ -1,8 +1,14 @@
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel import Kernel
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.functions import KernelArguments
 
 from models.custom_agent import CustomAgent
+from utils.history_reducer import TokenBudgetHistoryReducer
+
+# Keeps the prompt of long conversations within CULTURE_GURU_HISTORY_TOKEN_BUDGET tokens
+history_reducer = TokenBudgetHistoryReducer.from_env("CULTURE_GURU")
 
 
 class CultureGuruAgent(ChatCompletionAgent, CustomAgent):
@@ -40,4 +46,8 @@ class CultureGuruAgent(ChatCompletionAgent, CustomAgent):
 
     @property
     def is_async_initialization(self) -> bool:
-        return False
\ No newline at end of file
+        return False
+
+    async def _prepare_agent_chat_history(self, history: ChatHistory, kernel: Kernel, arguments: KernelArguments) -> ChatHistory:
+        agent_chat_history = await super()._prepare_agent_chat_history(history, kernel, arguments)
+        return await history_reducer.reduce(agent_chat_history, kernel, self.name)
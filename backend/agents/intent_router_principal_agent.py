@@ -1,4 +1,5 @@
 import json
+import os
 from typing import List
 import uuid
 import re
@@ -9,21 +10,60 @@ from semantic_kernel.agents import ChatCompletionAgent
 from models.agent_request import Message
 from models.custom_agent import CustomAgent
 from opentelemetry import trace
-from typing import AsyncIterable, List
+from typing import Any, AsyncIterable, Dict, List
 from semantic_kernel import Kernel
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 from semantic_kernel.agents import ChatCompletionAgent
 from models.available_agents import AvailableAgents
 from models.custom_agent import CustomAgent
 from semantic_kernel.contents.chat_message_content import ChatMessageContent
-from models.conversation_state import ConversationStateStore, ConversationState
+from models.conversation_state import AsyncConversationStateStore, ConversationState
 from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.agents import ChatHistoryAgentThread
+from utils.routing_cache import RoutingCache
+from utils.intent_classifier import DEFAULT_EXAMPLES_PATH, IntentClassifier, IntentPrediction
+from utils.agent_invoker import invoke_agent
+from utils.routing_parser import parse_routing_decision, parse_partial_routing_decision
+from utils.speculative_dispatch import SpeculativeDispatch, SpeculationNotSupported, fork_chat_history_thread
+from semantic_kernel.contents.utils.author_role import AuthorRole
+from models.routing_decision import RoutingDecision
+from semantic_kernel.connectors.ai.open_ai import AzureChatPromptExecutionSettings
+from semantic_kernel.functions import KernelArguments
+from semantic_kernel.contents.chat_history import ChatHistory
+from telemetry.metrics import meter, METRIC_PREFIX
+from utils.history_reducer import TokenBudgetHistoryReducer
+from utils.router_context import RouterContextBuilder
+
+format_retries = meter.create_counter(
+    name=f"{METRIC_PREFIX}.intent_router.format_retries",
+    description="Number of times the intent router was invoked again because its output was not a routing decision",
+)
+
+# Start the picked agent while the rest of the routing decision is still streaming
+SPECULATIVE_DISPATCH = os.getenv("INTENT_ROUTER_SPECULATIVE_DISPATCH", "true").lower() == "true"
+SPECULATION_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_SPECULATION_MIN_CONFIDENCE", 0.8))
+
+# Routing decisions are shared by all router instances in the process
+routing_cache = RoutingCache()
+
+# Local classifier for clear-cut messages, trained on the agent descriptions and labeled examples,
+# the bundled ones unless INTENT_CLASSIFIER_EXAMPLES_PATH is set (to an empty value to use none)
+intent_classifier = IntentClassifier()
+if os.getenv("INTENT_CLASSIFIER_EXAMPLES_PATH", DEFAULT_EXAMPLES_PATH):
+    intent_classifier.load_examples(os.getenv("INTENT_CLASSIFIER_EXAMPLES_PATH", DEFAULT_EXAMPLES_PATH))
+
+# Keeps the prompt of long conversations within INTENT_ROUTER_HISTORY_TOKEN_BUDGET tokens
+history_reducer = TokenBudgetHistoryReducer.from_env("INTENT_ROUTER")
+
+# The router thread keeps a compact digest per turn instead of the raw messages
+router_context = RouterContextBuilder()
 
 class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
 
-    conversation_store: ConversationStateStore = None
+    conversation_store: AsyncConversationStateStore = None
     state: ConversationState = None
     agent_list: List[str] = list[str]
+    routing_decision: Dict[str, Any] | None = None
 
     @staticmethod
     def what_can_i_do() -> str:
@@ -33,7 +73,7 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
     def is_async_initialization(self) -> bool:
         return False
 
-    def __init__(self, name: str, description: str, agent_list: List[str], conversation_store: ConversationStateStore, conversation_id: str):
+    def __init__(self, name: str, description: str, agent_list: List[str], conversation_store: AsyncConversationStateStore, conversation_state: ConversationState):
 
         # Initialize the kernel
         kernel = Kernel()
@@ -47,9 +87,17 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
             if AvailableAgents.agents[agent]:
                 capabilities = f"{capabilities} {chr(97 + index)}. {AvailableAgents.agents[agent]["description"]} Agent id for these capabilities is: {agent} \n"
         
+        # Ask for schema constrained JSON, so that the output matches the routing decision shape
+        arguments = None
+        if os.getenv("INTENT_ROUTER_STRUCTURED_OUTPUT", "true").lower() == "true":
+            arguments = KernelArguments(settings=AzureChatPromptExecutionSettings(
+                response_format=RoutingDecision.response_format(agent_list)
+            ))
+
         # Initialize the ChatCompletionAgent with the kernel and service
         super().__init__(
             kernel=kernel,
+            arguments=arguments,
             name=name,
             description=description,
             instructions=f"""
@@ -117,13 +165,18 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
             """
         )
 
+        self.agent_list = agent_list
         self.conversation_store = conversation_store
-        self.state = self.conversation_store.init_state(id=conversation_id)
+        self.state = conversation_state
         # Initialize destination city tracking
         if not hasattr(self.state, 'destination_city'):
             self.state.destination_city = None
 
-    async def execute(self, message: Message) -> AsyncIterable[AgentResponseItem[ChatMessageContent]]:
+    async def execute(self, message: Message, stream: bool = False) -> AsyncIterable[AgentResponseItem[ChatMessageContent]]:
+        """
+        Route the message to the best agent and yield its responses.
+        When stream is True, the agent's response chunks are yielded as they arrive, followed by the complete response.
+        """
         with trace.get_tracer(__name__).start_as_current_span(
             name="setup_intents_principal_agent",
         ):
@@ -133,6 +186,7 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
                     content=message.content, 
                     metadata={"id": request_message_id}
                 )
+            turn_start = router_context.turn_start(self.state.get_thread(id=self.name))
 
             # Check if the message is an adaptive card response
             # If so, set the message_data to kwarga.
@@ -148,17 +202,49 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
                     kwargs["message_data"] = {}
                 kwargs["message_data"]["destination_city"] = self.state.destination_city
 
+            # Repeated phrasings are routed from the cache without calling the LLM.
+            # Adaptive card responses depend on the previous turn, so they are never cached.
+            routing_key = None
+            agent_info = None
+            if kwargs.get("message_data", {}).get("adaptive_card_response") is None:
+                routing_key = routing_cache.make_key(message.content, self.agent_list, self.state.destination_city)
+                agent_info = routing_cache.get(routing_key)
+
+            # Clear-cut messages are routed by the local classifier, anything ambiguous goes to the LLM.
+            # A local decision can not extract a city or ask for one, so it is only taken once the
+            # destination city is known and the message does not name another place.
+            prediction: IntentPrediction | None = None
+            if agent_info is None and routing_key is not None:
+                prediction = self.classify_intent(message.content)
+                if prediction.is_confident and self.state.destination_city and not intent_classifier.names_place(
+                    message.content, self.state.destination_city
+                ):
+                    agent_info = {
+                        "agent_id": prediction.agent_id,
+                        "confidence_score": round(prediction.score, 3),
+                        "destination_city": self.state.destination_city,
+                    }
+            is_local_decision = agent_info is not None
+
             responses : List[AgentResponseItem] = []
             # Keep calling the principal agent until it returns a response with "agent_id"
             # This fix is added to handle the case where the principal agent tries to respond himself.
             # Principal agent on rare cases returns a response which is not in the expected format.
-            # With the loop, it will make sure that the principal agent will return a response in the expected format in the next run.            
+            # Structured output and the tolerant parser make this rare, with the loop it will make sure
+            # that the principal agent will return a response in the expected format in the next run.
             MAX_RETRIES = 5
             retry_count = 0
-            while retry_count < MAX_RETRIES:
-                async for response in self.invoke(messages=chat_message, thread=self.state.get_thread(id=self.name), **kwargs):
+            speculation: SpeculativeDispatch | None = None
+            while agent_info is None and retry_count < MAX_RETRIES:
+                if retry_count == 0 and SPECULATIVE_DISPATCH:
+                    response, speculation = await self.invoke_router_streaming(chat_message, kwargs, stream)
                     if response:
                         responses.append(response)
+                else:
+                    # On a retry the corrective message is already in the thread, so the user message is not sent again
+                    async for response in self.invoke(messages=chat_message if retry_count == 0 else None, thread=self.state.get_thread(id=self.name), **kwargs):
+                        if response:
+                            responses.append(response)
 
                 if not responses:
                     raise HTTPException(
@@ -168,15 +254,13 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
 
                 # Use the last response as the final one
                 intent_agent_final_response = responses[-1]
-                self.save_conversation_state(intent_agent_final_response, self.name)
+                await self.save_conversation_state(intent_agent_final_response, self.name)
 
-                # Check if the content contains "agent_id" before parsing
-                # print("Intent agent final response content:", intent_agent_final_response.content.content)
-                if "agent_id" in intent_agent_final_response.content.content:
-                    agent_info = json.loads(intent_agent_final_response.content.content)
-                    
+                # Parse the routing decision, repairing fenced or partially formatted JSON locally
+                agent_info = parse_routing_decision(intent_agent_final_response.content.content, self.agent_list)
+                if agent_info is not None:
                     # Extract and store the destination city if provided
-                    if "destination_city" in agent_info and agent_info["destination_city"]:
+                    if agent_info["destination_city"]:
                         self.state.destination_city = agent_info["destination_city"]
                         
                     break
@@ -197,56 +281,177 @@ class IntentRouterPrincipalAgent(ChatCompletionAgent, CustomAgent):
                         )
                     )
                     self.state.update_thread(id=self.name, thread=pa_thread)
+                    format_retries.add(1)
                 # If "agent_id" is not found, continue the loop to invoke again
                 retry_count += 1
+
+            if agent_info is None:
+                if speculation is not None:
+                    speculation.cancel()
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Intent router agent did not return a routing decision after {MAX_RETRIES} attempts."
+                )
                 
+            await self.record_routing_decision(chat_message, agent_info, turn_start)
+            if is_local_decision:
+                if agent_info.get("destination_city"):
+                    self.state.destination_city = agent_info["destination_city"]
+            elif routing_key is not None:
+                routing_cache.put(routing_key, agent_info)
+                intent_classifier.record_llm_decision(prediction, agent_info.get("agent_id"))
+
             agent_name = agent_info.get("agent_id")
+            self.routing_decision = agent_info
+
+            # Keep the speculative invocation only if the final decision would have started the same one
+            if speculation is not None and not speculation.matches(agent_info.get("agent_id"), self.state.destination_city):
+                speculation.cancel()
+                speculation = None
 
             # check if principal agent returned an agent name
             if agent_name is None:
                 agent_response = agent_info.get("your_response")
                 # if no agent name is returned, return the rephrased query as the response
                 intent_agent_final_response.content.content = agent_response
+                await self.conversation_store.save_state(state=self.state)
                 yield intent_agent_final_response
             else:
-                agent_instance = await AvailableAgents.get_agent(agent_name)
-                
-                # Add destination city to kwargs if available
-                if hasattr(self.state, 'destination_city') and self.state.destination_city:
-                    if "message_data" not in kwargs:
-                        kwargs["message_data"] = {}
-                    kwargs["message_data"]["destination_city"] = self.state.destination_city
-                    
-                    # Also include the city in the message content if not already present
-                    if self.state.destination_city and self.state.destination_city.lower() not in chat_message.content.lower():
-                        enhanced_message = ChatMessageContent(
-                            role=chat_message.role,
-                            content=f"{chat_message.content} (For the destination city: {self.state.destination_city})",
-                            metadata=chat_message.metadata
-                        )
-                        chat_message = enhanced_message
-                
                 responses = []
-                async for response in agent_instance.invoke(messages=chat_message, thread=self.state.get_thread(id=agent_name), **kwargs):
-                    if response:
-                        responses.append(response)
-                        yield response
-                        
+                try:
+                    if speculation is not None:
+                        async for response in speculation.results():
+                            responses.append(response)
+                            yield response
+                        speculation.confirm()
+                except SpeculationNotSupported:
+                    speculation = None
+                finally:
+                    # Stop a speculative invocation whose responses will not be consumed
+                    if speculation is not None and not speculation.done:
+                        speculation.cancel()
+
+                if speculation is None:
+                    agent_message, agent_kwargs = self.build_agent_request(chat_message, kwargs)
+                    async with AvailableAgents.lease_agent(agent_name) as agent_instance:
+                        async for response in invoke_agent(agent_instance, agent_message, self.state.get_thread(id=agent_name), stream=stream, **agent_kwargs):
+                            responses.append(response)
+                            yield response
+
                 if responses:
+                    # The agent answer is kept in the agent thread only, the router thread has the digest of the turn
                     agent_final_response = responses[-1]
+                    await self.save_conversation_state(agent_final_response, agent_name)
 
-                    # update the principal agent thread with the agent response, so that next time it is available in the conversation state
-                    pa_thread = self.state.get_thread(id=self.name)
-                    if pa_thread:
-                        await pa_thread.on_new_message(agent_final_response.content)
-                        self.state.update_thread(id=self.name, thread=pa_thread)
-                    self.save_conversation_state(agent_final_response, agent_name)
 
+    def build_agent_request(self, chat_message: ChatMessageContent, kwargs: dict) -> tuple[ChatMessageContent, dict]:
+        """
+        Build the message and keyword arguments for the picked agent, adding the destination city if it is known.
+        """
+        agent_kwargs = dict(kwargs)
+        destination_city = getattr(self.state, 'destination_city', None)
+        if destination_city:
+            agent_kwargs["message_data"] = {**(kwargs.get("message_data") or {}), "destination_city": destination_city}
+
+            # Also include the city in the message content if not already present
+            if destination_city.lower() not in chat_message.content.lower():
+                chat_message = ChatMessageContent(
+                    role=chat_message.role,
+                    content=f"{chat_message.content} (For the destination city: {destination_city})",
+                    metadata=chat_message.metadata
+                )
+        return chat_message, agent_kwargs
+
+    async def invoke_router_streaming(
+        self, chat_message: ChatMessageContent, kwargs: dict, stream: bool = False
+    ) -> tuple[AgentResponseItem[ChatMessageContent] | None, SpeculativeDispatch | None]:
+        """
+        Stream the routing decision and speculatively start the picked agent as soon as agent_id and a
+        confident confidence_score have been streamed, overlapping the rest of the router output with the
+        agent call.
+
+        Returns:
+            The complete router response and the speculative dispatch, if one was started.
+        """
+        speculation: SpeculativeDispatch | None = None
+        content = ""
+        last_response = None
+        try:
+            async for response in self.invoke_stream(messages=chat_message, thread=self.state.get_thread(id=self.name), **kwargs):
+                last_response = response
+                content += response.content.content or ""
+                if speculation is not None:
+                    continue
 
-    def save_conversation_state(self, final_response, agent_name):
+                early_decision = parse_partial_routing_decision(content)
+                if (
+                    early_decision is not None
+                    and early_decision["agent_id"] in self.agent_list
+                    and early_decision["confidence_score"] >= SPECULATION_MIN_CONFIDENCE
+                ):
+                    agent_message, agent_kwargs = self.build_agent_request(chat_message, kwargs)
+                    speculation = SpeculativeDispatch(
+                        agent_id=early_decision["agent_id"],
+                        destination_city=self.state.destination_city,
+                        responses=self.speculative_invoke(early_decision["agent_id"], agent_message, agent_kwargs, stream),
+                    )
+        except BaseException:
+            if speculation is not None:
+                speculation.cancel()
+            raise
+
+        if last_response is None:
+            return None, speculation
+
+        message = ChatMessageContent(
+            role=AuthorRole.ASSISTANT,
+            content=content,
+            name=self.name,
+            metadata=last_response.content.metadata,
+        )
+        return AgentResponseItem(message=message, thread=last_response.thread), speculation
+
+    async def speculative_invoke(
+        self, agent_name: str, agent_message: ChatMessageContent, agent_kwargs: dict, stream: bool = False
+    ) -> AsyncIterable[AgentResponseItem[ChatMessageContent]]:
+        """
+        Invoke the agent on a copy of its thread, so that a cancelled invocation leaves no trace.
+        Agents with remote threads (Copilot Studio, Azure AI) can not take back a sent message and are not invoked.
+        """
+        async with AvailableAgents.lease_agent(agent_name) as agent_instance:
+            if not isinstance(agent_instance, ChatCompletionAgent):
+                raise SpeculationNotSupported()
+            thread = fork_chat_history_thread(self.state.get_thread(id=agent_name))
+            async for response in invoke_agent(agent_instance, agent_message, thread, stream=stream, **agent_kwargs):
+                yield response
+
+    def classify_intent(self, content: str) -> IntentPrediction:
+        """
+        Classify the message with the local intent classifier, restricted to the agents involved.
+        """
+        for agent in self.agent_list:
+            if agent in AvailableAgents.agents:
+                intent_classifier.add_description(agent, AvailableAgents.agents[agent]["description"])
+        return intent_classifier.classify(content, self.agent_list)
+
+    async def record_routing_decision(self, chat_message: ChatMessageContent, agent_info: dict, turn_start: int) -> None:
+        """
+        Record the turn in the principal agent thread as a compact digest of the routing decision,
+        replacing the router output and retry prompts added since turn_start. Decisions made without
+        the LLM (from the routing cache or the local intent classifier) are recorded the same way,
+        so that the router history looks the same as for an LLM decision.
+        """
+        pa_thread = router_context.record_turn(self.state.get_thread(id=self.name), turn_start, chat_message, agent_info, self.name)
+        self.state.update_thread(id=self.name, thread=pa_thread)
+
+    async def save_conversation_state(self, final_response, agent_name):
         thread = final_response.thread
         self.state.update_thread(id=agent_name, thread=thread)
-        self.conversation_store.save_state(state=self.state)
+        await self.conversation_store.save_state(state=self.state)
+
+    async def _prepare_agent_chat_history(self, history: ChatHistory, kernel: Kernel, arguments: KernelArguments) -> ChatHistory:
+        agent_chat_history = await super()._prepare_agent_chat_history(history, kernel, arguments)
+        return await history_reducer.reduce(agent_chat_history, kernel, self.name)
         
     def extract_city_name(self, text):
         """Helper method to extract city names from text using pattern matching"""
@@ -1,18 +1,24 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from contextlib import aclosing
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from typing import AsyncIterable
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from pydantic import ValidationError
+from opentelemetry import trace
 from fastapi.middleware.cors import CORSMiddleware
 
 from models.available_agents import AvailableAgents
-from models.agent_response import AgentResponse
-from models.agent_request import AgentRequest
+from models.agent_response import AgentResponse, BatchAgentResponse
+from models.agent_request import AgentRequest, BatchAgentRequest
+from models.agent_stream_event import AgentStreamEvent
+from models.enumerations import StreamEventType
 from orchestrator.request_dispatcher import RequestDispatcher
-from models.conversation_state import ConversationStateStore
+from models.conversation_state import AsyncConversationStateStore
 
 
 class AgentAPI:
-    def __init__(self, conversation_store: ConversationStateStore, app: FastAPI = None):
+    def __init__(self, conversation_store: AsyncConversationStateStore, app: FastAPI = None):
         """
         Initialize the AgentAPI with the provided agents and optional FastAPI app.
         
@@ -70,7 +76,110 @@ class AgentAPI:
                 The agent's response to the prompt
             """
             return await self.request_dispatcher.dispatch_request(request)
+
+        @self.app.post("/plan/invoke/stream", 
+                      summary="Invoke Agent with Streaming",
+                      description="Invokes an agent with the provided prompt and streams its response as server-sent events. "
+                                  "Token deltas are sent as 'delta' events and the final 'final' event carries the same payload as /plan/invoke.",
+                      response_description="Stream of server-sent events",
+                      response_class=StreamingResponse,
+                      tags=["Agents"])
+        async def invoke_strategy_stream(request: AgentRequest) -> StreamingResponse:
+            """
+            Invoke an agent with the provided prompt and stream its response.
+            
+            Args:
+                request: The agent request containing the prompt and agent details
+                
+            Returns:
+                A stream of server-sent events
+            """
+            events = self.request_dispatcher.dispatch_request_stream(request)
+            return StreamingResponse(
+                (event.to_sse() async for event in self.catch_stream_errors(events)),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
         
+        @self.app.post("/plan/invoke/batch", 
+                      summary="Invoke Agents in Batch",
+                      description="Invokes agents with a list of requests, a limited number at a time. Each request gets its own "
+                                  "success or error result. The results are returned in order, or streamed as newline delimited JSON "
+                                  "as they complete when stream is set.",
+                      response_description="Results of the requests",
+                      response_model=BatchAgentResponse,
+                      tags=["Agents"])
+        async def invoke_strategy_batch(batch: BatchAgentRequest):
+            """
+            Invoke agents with a batch of requests.
+            
+            Args:
+                batch: The agent requests and the concurrency limit
+                
+            Returns:
+                The results of the requests
+            """
+            results = self.request_dispatcher.dispatch_batch(batch.requests, batch.max_concurrency)
+            if batch.stream:
+                return StreamingResponse(
+                    (result.model_dump_json() + "\n" async for result in results),
+                    media_type="application/x-ndjson",
+                )
+
+            ordered_results = [result async for result in results]
+            ordered_results.sort(key=lambda result: result.index)
+            return BatchAgentResponse(results=ordered_results)
+
+        @self.app.websocket("/plan/ws")
+        async def invoke_strategy_websocket(websocket: WebSocket):
+            """
+            Carry a whole conversation over one connection. Each AgentRequest frame sent by the client
+            is answered with the same events as /plan/invoke/stream, sent as JSON frames.
+            Requests are handled one at a time, in the order they are received.
+            """
+            await websocket.accept()
+            try:
+                while True:
+                    frame = await websocket.receive_text()
+                    try:
+                        request = AgentRequest.model_validate_json(frame)
+                        events = self.request_dispatcher.dispatch_request_stream(request)
+                    except ValidationError as exc:
+                        await self.send_event(websocket, AgentStreamEvent(event=StreamEventType.ERROR, error=f"Validation error: {exc}", status_code=422))
+                        continue
+                    except StarletteHTTPException as exc:
+                        await self.send_event(websocket, AgentStreamEvent(event=StreamEventType.ERROR, error=f"HTTP error occurred: {exc.detail}", status_code=exc.status_code))
+                        continue
+
+                    # One span per turn, as the HTTP tracing middleware does for /plan/invoke
+                    with trace.get_tracer(__name__).start_as_current_span(name=f"turn-{request.message.id}-{request.conversation_id}") as span:
+                        span.set_attribute("conversation_id", request.conversation_id)
+                        span.set_attribute("user_message", request.message.content)
+                        async with aclosing(self.catch_stream_errors(events)) as turn_events:
+                            async for event in turn_events:
+                                await self.send_event(websocket, event)
+            except WebSocketDisconnect:
+                pass
+
+    @staticmethod
+    async def send_event(websocket: WebSocket, event: AgentStreamEvent) -> None:
+        await websocket.send_text(event.model_dump_json(exclude_none=True))
+
+    @staticmethod
+    async def catch_stream_errors(events: AsyncIterable[AgentStreamEvent]) -> AsyncIterable[AgentStreamEvent]:
+        """
+        Pass the events through, ending the stream with an error event if the request fails. Once a stream
+        has started errors can no longer change the response status, so they are sent as an event instead.
+        """
+        async with aclosing(events):
+            try:
+                async for event in events:
+                    yield event
+            except StarletteHTTPException as exc:
+                yield AgentStreamEvent(event=StreamEventType.ERROR, error=f"HTTP error occurred: {exc.detail}", status_code=exc.status_code)
+            except Exception as exc:
+                yield AgentStreamEvent(event=StreamEventType.ERROR, error=f"An unexpected error occurred: {exc}", status_code=500)
+
     def setup_error_handlers(self):
         """
         Define generic error handlers for the FastAPI application.
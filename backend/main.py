@@ -1,12 +1,21 @@
+import os
 from fastapi import FastAPI
 from agents.culture_guru_agent import CultureGuruAgent
 from agents.copilot_studio.explorer_guide_agent import ExplorerGuideAgent
 from agents.azure_ai_agents.culinary_advisor_agent import CulinaryAdvisorAgent
+from agents.azure_ai_agents.azure_ai_project_cache import AzureAIProjectCache
+from agents.copilot_studio.base.activity_span_logger import ActivitySpanLogger
+from agents.copilot_studio.base.copilot_agent_thread import release_copilot_streams
+from agents.copilot_studio.base.directline_session_pool import DirectLineSessionPool
+from agents.copilot_studio.base.directline_conversation_pool import DirectLineConversationPool
+from agents.copilot_studio.base.directline_poller import DirectLinePoller
 from api.agent_api import AgentAPI
 from telemetry import telemetry
 from telemetry.tracing_middleware import setup_tracing
 from models.available_agents import AvailableAgents
-from models.conversation_state import InMemoryConversationStateStore
+from models.conversation_state import AsyncConversationStateStoreAdapter, InMemoryConversationStateStore
+from models.sqlite_conversation_state_store import SQLiteConversationStateStore
+from models.redis_conversation_state_store import RedisConversationStateStore
 from dotenv import load_dotenv
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
@@ -21,16 +30,33 @@ app = FastAPI(
 load_dotenv(override=True)
 telemetry.setup()
 
-conversation_store = InMemoryConversationStateStore()
+# Conversation states are kept in memory unless a persistent store is configured
+conversation_store_type = os.getenv("CONVERSATION_STORE", "memory")
+if conversation_store_type == "sqlite":
+    conversation_store = AsyncConversationStateStoreAdapter(SQLiteConversationStateStore())
+elif conversation_store_type == "redis":
+    conversation_store = AsyncConversationStateStoreAdapter(RedisConversationStateStore())
+else:
+    # Evicted and deleted conversations close the DirectLine streams they still hold
+    conversation_store = AsyncConversationStateStoreAdapter(InMemoryConversationStateStore(on_evict=release_copilot_streams))
 
-AvailableAgents.add_agent("culture_guru", lambda: CultureGuruAgent(), CultureGuruAgent.what_can_i_do(), "SK")
-AvailableAgents.add_agent("explorer_guide", lambda: ExplorerGuideAgent(), ExplorerGuideAgent.what_can_i_do(), "MCS")
-AvailableAgents.add_agent("culinary_advisor", lambda: CulinaryAdvisorAgent().initialize_agent(), CulinaryAdvisorAgent.what_can_i_do(), "AZ")
+AvailableAgents.add_agent("culture_guru", lambda: CultureGuruAgent(), CultureGuruAgent.what_can_i_do(), "SK", agent_class=CultureGuruAgent)
+AvailableAgents.add_agent("explorer_guide", lambda: ExplorerGuideAgent(), ExplorerGuideAgent.what_can_i_do(), "MCS", agent_class=ExplorerGuideAgent)
+AvailableAgents.add_agent("culinary_advisor", lambda: CulinaryAdvisorAgent().initialize_agent(), CulinaryAdvisorAgent.what_can_i_do(), "AZ", agent_class=CulinaryAdvisorAgent)
 
 agent_api = AgentAPI(conversation_store=conversation_store, app=app)
 
 app = agent_api.app
 
+# Release the resources held by pooled agent instances
+app.add_event_handler("shutdown", AvailableAgents.close)
+app.add_event_handler("shutdown", AzureAIProjectCache.close)
+app.add_event_handler("shutdown", DirectLineConversationPool.close)
+app.add_event_handler("shutdown", DirectLinePoller.close)
+app.add_event_handler("shutdown", ActivitySpanLogger.close)
+app.add_event_handler("shutdown", DirectLineSessionPool.close)
+app.add_event_handler("shutdown", conversation_store.close)
+
 setup_tracing(app)
 
 FastAPIInstrumentor.instrument_app(app, exclude_spans=["receive", "send"])
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-from models.enumerations import StrategyName
+from models.enumerations import StrategyName, FanOutMode
 
 class Strategy(BaseModel):
     """Configuration for the agent strategy to be used."""
@@ -11,6 +11,15 @@ class Strategy(BaseModel):
     agents_involved: List[str] = Field(
         description="List of agent names that will participate in this strategy"
     )
+    mode: Optional[FanOutMode] = Field(
+        None,
+        description="How the fan-out strategy combines the agent responses, defaults to merge"
+    )
+    agent_timeout_seconds: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Time limit for each agent in the fan-out strategy"
+    )
 
 
 class Message(BaseModel):
@@ -50,6 +59,14 @@ class AgentRequest(BaseModel):
         None,
         description="Strategy configuration for agent orchestration"
     )
+    include_history: bool = Field(
+        False,
+        description="Return the messages of the agent thread with the response"
+    )
+    history_cursor: Optional[str] = Field(
+        None,
+        description="Only return the history messages after the message with this id, usually the history_cursor of the previous response"
+    )
     
     model_config = {
         "json_schema_extra": {
@@ -66,4 +83,23 @@ class AgentRequest(BaseModel):
                 }
             }
         }
-    }
\ No newline at end of file
+    }
+
+
+class BatchAgentRequest(BaseModel):
+    """
+    Request object for invoking agents with several requests at once.
+    """
+
+    requests: List[AgentRequest] = Field(
+        description="The agent requests to invoke"
+    )
+    max_concurrency: Optional[int] = Field(
+        None,
+        gt=0,
+        description="Maximum number of requests invoked at the same time, capped by the server limit"
+    )
+    stream: bool = Field(
+        False,
+        description="Stream the results as newline delimited JSON as they complete, instead of returning them in order"
+    )
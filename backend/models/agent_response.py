@@ -40,6 +40,14 @@ class AgentResponse(BaseModel):
     message: Message = Field(
         description="The message content of the agent's response"
     )
+    history: Optional[List[Message]] = Field(
+        None,
+        description="Messages of the agent thread, after the history_cursor of the request, if include_history was set"
+    )
+    history_cursor: Optional[str] = Field(
+        None,
+        description="Id of the last message of the agent thread, to send as history_cursor with the next request"
+    )
     
     model_config = {
         "json_schema_extra": {
@@ -54,3 +62,34 @@ class AgentResponse(BaseModel):
             }
         }
     }
+
+
+class BatchItemResult(BaseModel):
+    """
+    Result of one request of a batch invocation.
+    """
+
+    index: int = Field(
+        description="Position of the request in the batch"
+    )
+    status_code: int = Field(
+        description="HTTP status code the request would have had on its own"
+    )
+    response: Optional[AgentResponse] = Field(
+        None,
+        description="The agent response, if the request succeeded"
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Description of the error, if the request failed"
+    )
+
+
+class BatchAgentResponse(BaseModel):
+    """
+    Response object of a batch invocation.
+    """
+
+    results: List[BatchItemResult] = Field(
+        description="The results of the requests, in the order of the batch"
+    )
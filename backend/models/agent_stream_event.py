@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from models.enumerations import StreamEventType
+from models.agent_response import AgentResponse, Message
+
+
+class AgentStreamEvent(BaseModel):
+    """
+    Event of a streamed agent invocation, sent to the client as a server-sent event.
+    """
+
+    event: StreamEventType = Field(
+        description="Type of the event"
+    )
+    agent_id: Optional[str] = Field(
+        None,
+        description="Identifier of the agent the event belongs to"
+    )
+    delta: Optional[str] = Field(
+        None,
+        description="Text chunk streamed by the agent, for delta events"
+    )
+    message: Optional[Message] = Field(
+        None,
+        description="Complete message of the agent, for message events"
+    )
+    response: Optional[AgentResponse] = Field(
+        None,
+        description="Final agent response, the same payload as returned by /plan/invoke"
+    )
+    confidence_score: Optional[float] = Field(
+        None,
+        description="Confidence of the intent router in the picked agent, for routing events"
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Description of the error, for error events"
+    )
+    status_code: Optional[int] = Field(
+        None,
+        description="HTTP status code of the error, for error events"
+    )
+
+    def to_sse(self) -> str:
+        """
+        Format the event as a server-sent event.
+        """
+        return f"event: {self.event.value}\ndata: {self.model_dump_json(exclude_none=True)}\n\n"
@@ -1,6 +1,152 @@
 import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from semantic_kernel.agents import Agent
 
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+pool_hits = meter.create_counter(
+    name=f"{METRIC_PREFIX}.agent_pool.hits",
+    description="Number of agent leases served by an already constructed agent instance",
+)
+pool_misses = meter.create_counter(
+    name=f"{METRIC_PREFIX}.agent_pool.misses",
+    description="Number of agent leases that required constructing a new agent instance",
+)
+construction_time = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.agent_pool.construction_time",
+    unit="ms",
+    description="Time spent running an agent factory",
+)
+
+
+class AgentPool:
+    """
+    Keeps constructed agent instances so that they can be leased per request.
+
+    Without a max_size the pool builds a single instance and shares it between all
+    requests. This is safe for agents that keep their per-conversation state in the
+    thread passed to invoke. With a max_size, each instance is leased to one request
+    at a time and at most max_size instances are ever built.
+    """
+
+    def __init__(self, name: str, factory: callable, max_size: int | None = None):
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.name = name
+        self.factory = factory
+        self.max_size = max_size
+
+        self._shared: Agent | None = None
+        self._idle: list[Agent] = []
+        # Instances currently leased, by id since agents are not always hashable
+        self._leased: dict[int, Agent] = {}
+        self._size = 0
+        self._lock = asyncio.Lock()
+        self._available = asyncio.Semaphore(max_size) if max_size is not None else None
+
+        self.hits = 0
+        self.misses = 0
+        self.construction_time_ms = 0.0
+
+    @property
+    def is_shared(self) -> bool:
+        return self.max_size is None
+
+    async def acquire(self) -> Agent:
+        """
+        Lease an agent instance, constructing it on first use.
+        """
+        if self.is_shared:
+            if self._shared is None:
+                async with self._lock:
+                    if self._shared is None:
+                        self._shared = await self._construct()
+                        return self._shared
+            self._record_hit()
+            return self._shared
+
+        await self._available.acquire()
+        if self._idle:
+            self._record_hit()
+            agent = self._idle.pop()
+        else:
+            try:
+                agent = await self._construct()
+            except BaseException:
+                self._available.release()
+                raise
+            self._size += 1
+        self._leased[id(agent)] = agent
+        return agent
+
+    def release(self, agent: Agent) -> None:
+        """
+        Return a leased agent instance to the pool.
+        """
+        if self.is_shared:
+            return
+        # Instances leased before the pool was closed are already closed and are not reused
+        if self._leased.pop(id(agent), None) is not None:
+            self._idle.append(agent)
+        self._available.release()
+
+    async def close(self) -> None:
+        """
+        Close all pooled agent instances that hold resources, including the ones still leased.
+        """
+        agents = [self._shared] if self._shared is not None else [*self._idle, *self._leased.values()]
+        self._shared = None
+        self._idle.clear()
+        self._leased.clear()
+        self._size = 0
+        for agent in agents:
+            close = getattr(agent, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("Failed to close pooled agent %s", self.name)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_size": self.max_size,
+            "size": 1 if self._shared is not None else self._size,
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "hits": self.hits,
+            "misses": self.misses,
+            "construction_time_ms": round(self.construction_time_ms, 3),
+        }
+
+    async def _construct(self) -> Agent:
+        self.misses += 1
+        pool_misses.add(1, {"agent": self.name})
+
+        start = time.perf_counter()
+        agent = self.factory()
+        if asyncio.iscoroutine(agent):
+            agent = await agent
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.construction_time_ms += elapsed_ms
+        construction_time.record(elapsed_ms, {"agent": self.name})
+        logger.debug("Constructed agent %s in %.1f ms", self.name, elapsed_ms)
+        return agent
+
+    def _record_hit(self) -> None:
+        self.hits += 1
+        pool_hits.add(1, {"agent": self.name})
+
 
 class AvailableAgents:
     """
@@ -10,29 +156,87 @@ class AvailableAgents:
     agents: dict[str, object] = {}
 
     @classmethod
-    def add_agent(cls, name: str, factory: callable, description: str, label:str) -> None:
+    def add_agent(
+        cls, name: str, factory: callable, description: str, label:str, pool_size: int | None = None, agent_class: type | None = None
+    ) -> None:
         """
         Adds an agent to the global list of available agents.
+
+        Agents are constructed once and shared between requests, unless a pool_size is given
+        for agents that are not safe to use concurrently. The agent_class is the class of the
+        agents built by the factory, the factory itself when it is a class.
         """
         cls.agents[name]={
             "name": name,
             "description": description,
             "label": label,
-            "factory": factory
+            "factory": factory,
+            "class": agent_class or (factory if isinstance(factory, type) else None),
+            "pool": AgentPool(name=name, factory=factory, max_size=pool_size),
         }
-        
+
+    @classmethod
+    def get_agent_class(cls, name: str) -> type | None:
+        """
+        Returns the class of the agents registered under the name, without constructing or leasing one.
+        None if it is unknown.
+        """
+        agent = cls.agents.get(name)
+        return agent["class"] if agent else None
+
     @classmethod
     async def get_agent(cls, name: str) -> Agent | None:
         """
-        Retrieves an agent by its name.
+        Retrieves an agent by its name, served from its pool.
+        An agent with a bounded pool is leased until it is given back with release_agent,
+        prefer lease_agent which does it when the context exits.
         """
         agent = cls.agents.get(name)
         if agent:
-            agent_factory = agent["factory"]()
-            if asyncio.iscoroutine(agent_factory):
-                return await agent_factory
-            else:
-                return agent_factory
-        else:                
+            pool: AgentPool = agent["pool"]
+            return await pool.acquire()
+        else:
             return None
-    
\ No newline at end of file
+
+    @classmethod
+    def release_agent(cls, name: str, agent_instance: Agent) -> None:
+        """
+        Gives back an agent instance retrieved with get_agent to its pool.
+        """
+        agent = cls.agents.get(name)
+        if agent:
+            agent["pool"].release(agent_instance)
+
+    @classmethod
+    @asynccontextmanager
+    async def lease_agent(cls, name: str) -> AsyncIterator[Agent | None]:
+        """
+        Leases a pooled agent by its name for the duration of the context.
+        Yields None if no agent is registered under the name.
+        """
+        agent = cls.agents.get(name)
+        if not agent:
+            yield None
+            return
+
+        pool: AgentPool = agent["pool"]
+        agent_instance = await pool.acquire()
+        try:
+            yield agent_instance
+        finally:
+            pool.release(agent_instance)
+
+    @classmethod
+    def stats(cls) -> list[dict]:
+        """
+        Returns the pool statistics of all available agents.
+        """
+        return [agent["pool"].stats() for agent in cls.agents.values()]
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Closes all pooled agent instances.
+        """
+        for agent in cls.agents.values():
+            await agent["pool"].close()
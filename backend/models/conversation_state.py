@@ -1,9 +1,30 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from collections import OrderedDict
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from opentelemetry.metrics import CallbackOptions, Observation
 from semantic_kernel.agents.agent import  AgentThread
 from semantic_kernel.agents import  ChatHistoryAgentThread
 from semantic_kernel.contents.chat_history import ChatHistory
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+evicted_conversations = meter.create_counter(
+    name=f"{METRIC_PREFIX}.conversation_store.evictions",
+    description="Number of conversation states evicted from memory, by reason",
+)
+
+# Rough sizes of the Python objects behind a state, a thread and a message, on top of their text
+STATE_OVERHEAD_BYTES = 1024
+THREAD_OVERHEAD_BYTES = 1024
+MESSAGE_OVERHEAD_BYTES = 512
+ITEM_OVERHEAD_BYTES = 256
 
 class ConversationState:
     """A class to manage the state of a conversation.
@@ -11,10 +32,13 @@ class ConversationState:
     
     id: str
     threads: Dict[str, AgentThread]
+    # Number of saves of the state when it was read, checked by the store on the next save
+    version: int
 
-    def __init__(self, id: str, threads: Optional[Dict[str, AgentThread]] = None):
+    def __init__(self, id: str, threads: Optional[Dict[str, AgentThread]] = None, version: int = 0):
         self.id = id
         self.threads = threads if threads is not None else {}
+        self.version = version
 
 
     def get_thread(self, id: str) -> Optional[AgentThread]:
@@ -24,9 +48,15 @@ class ConversationState:
     def update_thread(self, id: str, thread:AgentThread) -> None:
         self.threads[id] = thread
     
+class ConversationStateConflict(Exception):
+    """Raised when a conversation state is saved after another save of the same conversation since it was read."""
+
 class ConversationStateStore(ABC):
     """Abstract base class for managing conversation state storage."""
 
+    # Whether the methods wait on disk or network I/O, the async adapter then runs them in a worker thread
+    blocking: bool = True
+
     @abstractmethod
     def init_state(self, id: str) -> ConversationState:
         """Initialize the conversation state."""
@@ -47,11 +77,111 @@ class ConversationStateStore(ABC):
         """Delete the conversation state by conversation ID."""
         pass
 
+    def close(self) -> None:
+        """Release the resources of the store, writing any pending change."""
+        pass
+
+    @staticmethod
+    def _claim_version(state: ConversationState, stored_version: int) -> None:
+        """Move the state to its next version, or raise a ConversationStateConflict if the stored
+        state is no longer the version the state was read at."""
+        if stored_version != state.version:
+            raise ConversationStateConflict(
+                f"Conversation {state.id} was saved by another turn, stored version {stored_version}, read version {state.version}."
+            )
+        state.version += 1
+
+class AsyncConversationStateStore(ABC):
+    """Abstract base class for managing conversation state storage from async code, without blocking the event loop."""
+
+    @abstractmethod
+    async def init_state(self, id: str) -> ConversationState:
+        """Initialize the conversation state."""
+        pass
+
+    @abstractmethod
+    async def save_state(self, state: ConversationState) -> None:
+        """Save or update the conversation state."""
+        pass
+
+    @abstractmethod
+    async def get_state(self, id: str) -> ConversationState | None:
+        """Retrieve the conversation state by conversation ID."""
+        pass
+
+    @abstractmethod
+    async def delete_state(self, id: str) -> None:
+        """Delete the conversation state by conversation ID."""
+        pass
+
+    async def close(self) -> None:
+        """Release the resources of the store, writing any pending change."""
+        pass
+
+class AsyncConversationStateStoreAdapter(AsyncConversationStateStore):
+    """Exposes a ConversationStateStore through the async interface.
+    The methods of a blocking store run in a worker thread, those of a non-blocking store run inline."""
+
+    def __init__(self, store: ConversationStateStore):
+        self.store = store
+
+    async def init_state(self, id: str) -> ConversationState:
+        return await self._call(self.store.init_state, id=id)
+
+    async def save_state(self, state: ConversationState) -> None:
+        await self._call(self.store.save_state, state=state)
+
+    async def get_state(self, id: str) -> ConversationState | None:
+        return await self._call(self.store.get_state, id=id)
+
+    async def delete_state(self, id: str) -> None:
+        await self._call(self.store.delete_state, id=id)
+
+    async def close(self) -> None:
+        await self._call(self.store.close)
+
+    async def _call(self, method: Callable[..., Any], **kwargs) -> Any:
+        if self.store.blocking:
+            return await asyncio.to_thread(method, **kwargs)
+        return method(**kwargs)
+
+def estimate_state_size(state: ConversationState) -> int:
+    """Estimate the memory held by a conversation state, from the text of its chat histories."""
+    size = STATE_OVERHEAD_BYTES
+    for thread in state.threads.values():
+        size += THREAD_OVERHEAD_BYTES
+        if isinstance(thread, ChatHistoryAgentThread):
+            for message in thread._chat_history.messages:
+                size += MESSAGE_OVERHEAD_BYTES + ITEM_OVERHEAD_BYTES * len(message.items) + len(message.content or "")
+    return size
+
 class InMemoryConversationStateStore(ConversationStateStore):
-    """In-memory implementation of the ConversationStateStore."""
+    """In-memory implementation of the ConversationStateStore.
+
+    The memory used is bounded by a number of conversations and an estimate of their size in bytes,
+    the least recently used conversations are evicted first. Conversations not used for
+    idle_ttl_seconds expire. The on_evict hook is called with each evicted or deleted state and
+    the reason, "expired", "capacity" or "deleted". A limit of 0 disables it."""
 
-    def __init__(self):
-        self._store: dict[str, ConversationState] = {}
+    blocking = False
+
+    _instances: "weakref.WeakSet[InMemoryConversationStateStore]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_ttl_seconds: Optional[float] = None,
+        on_evict: Optional[Callable[[ConversationState, str], None]] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("CONVERSATION_STORE_MAX_ENTRIES", 10000))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("CONVERSATION_STORE_MAX_BYTES", 256 * 1024 * 1024))
+        self.idle_ttl_seconds = idle_ttl_seconds if idle_ttl_seconds is not None else float(os.getenv("CONVERSATION_STORE_IDLE_TTL_SECONDS", 3600))
+        self.on_evict = on_evict
+        # Least recently used first, with the last access time and the estimated size of each state
+        self._store: OrderedDict[str, Tuple[ConversationState, float, int]] = OrderedDict()
+        self.estimated_bytes = 0
+        InMemoryConversationStateStore._instances.add(self)
 
     def init_state(self, id: str) -> ConversationState:
         """get or create the conversation state."""
@@ -65,15 +195,84 @@ class InMemoryConversationStateStore(ConversationStateStore):
         return state
     
     def save_state(self, state: ConversationState) -> None:
-        """Save or update the conversation state in memory."""
-        self._store[state.id] = state
+        """Save or update the conversation state in memory, evicting the least recently used states when over budget."""
+        self._expire()
+        previous = self._store.get(state.id)
+        self._claim_version(state, previous[0].version if previous is not None else state.version)
+        size = estimate_state_size(state)
+        if previous is not None:
+            del self._store[state.id]
+            self.estimated_bytes -= previous[2]
+        self._store[state.id] = (state, time.monotonic(), size)
+        self.estimated_bytes += size
+        self._evict_over_budget()
 
     def get_state(self, id: str) -> ConversationState | None:
         """Retrieve the conversation state from memory."""
-        return self._store.get(id)
+        self._expire()
+        entry = self._store.get(id)
+        if entry is None:
+            return None
+        state, _, size = entry
+        self._store[id] = (state, time.monotonic(), size)
+        self._store.move_to_end(id)
+        return state
 
     def delete_state(self, id: str) -> None:
         """Delete the conversation state from memory."""
-        self._store.pop(id, None)
+        entry = self._store.pop(id, None)
+        if entry is not None:
+            self.estimated_bytes -= entry[2]
+            self._release(entry[0], "deleted")
+
+    def _expire(self) -> None:
+        if self.idle_ttl_seconds <= 0:
+            return
+        expired_before = time.monotonic() - self.idle_ttl_seconds
+        while self._store:
+            id, (_, accessed_at, _) = next(iter(self._store.items()))
+            if accessed_at > expired_before:
+                break
+            self._evict(id, "expired")
+
+    def _evict_over_budget(self) -> None:
+        # The most recently used state is kept, even if it is larger than the budget on its own
+        while len(self._store) > 1 and (
+            (self.max_entries > 0 and len(self._store) > self.max_entries)
+            or (self.max_bytes > 0 and self.estimated_bytes > self.max_bytes)
+        ):
+            self._evict(next(iter(self._store)), "capacity")
+
+    def _evict(self, id: str, reason: str) -> None:
+        state, _, size = self._store.pop(id)
+        self.estimated_bytes -= size
+        evicted_conversations.add(1, {"reason": reason})
+        self._release(state, reason)
+
+    def _release(self, state: ConversationState, reason: str) -> None:
+        if self.on_evict is not None:
+            try:
+                self.on_evict(state, reason)
+            except Exception:
+                logger.exception("Eviction hook failed for conversation %s", state.id)
+
+
+def observe_conversations(options: CallbackOptions) -> Iterable[Observation]:
+    yield Observation(sum(len(store._store) for store in list(InMemoryConversationStateStore._instances)))
+
+
+def observe_estimated_bytes(options: CallbackOptions) -> Iterable[Observation]:
+    yield Observation(sum(store.estimated_bytes for store in list(InMemoryConversationStateStore._instances)))
+
 
-          
\ No newline at end of file
+meter.create_observable_gauge(
+    name=f"{METRIC_PREFIX}.conversation_store.conversations",
+    callbacks=[observe_conversations],
+    description="Number of conversation states kept in memory",
+)
+meter.create_observable_gauge(
+    name=f"{METRIC_PREFIX}.conversation_store.estimated_bytes",
+    callbacks=[observe_estimated_bytes],
+    unit="By",
+    description="Estimated memory held by the conversation states kept in memory",
+)
@@ -0,0 +1,118 @@
+import logging
+from typing import Any, Callable, Dict, Tuple
+
+from semantic_kernel.agents import AzureAIAgentThread, ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentThread
+from semantic_kernel.contents.chat_history import ChatHistory
+
+from models.conversation_state import ConversationState
+
+logger = logging.getLogger(__name__)
+
+ThreadEncoder = Callable[[AgentThread], Dict[str, Any]]
+ThreadDecoder = Callable[[Dict[str, Any]], AgentThread]
+
+
+class ConversationStateCodec:
+    """
+    Converts conversation states to JSON compatible dicts and back, so that they can be persisted.
+
+    Each thread type has a codec, registered under a kind that is stored with the thread.
+    The Semantic Kernel chat history and Azure AI threads are registered here, the agents
+    register the codecs of their own thread types. Attributes added to the state, like destination_city, are stored as they are
+    and must be JSON compatible. Threads without a codec are not persisted.
+    """
+
+    _codecs: Dict[type, Tuple[str, ThreadEncoder]] = {}
+    _decoders: Dict[str, ThreadDecoder] = {}
+
+    @classmethod
+    def register(cls, thread_type: type, kind: str, encode: ThreadEncoder, decode: ThreadDecoder) -> None:
+        """
+        Register the codec of a thread type.
+
+        Args:
+            thread_type: The thread class, subclasses use the same codec unless they have their own.
+            kind: The name stored with the encoded thread, to find the decoder.
+            encode: Returns the fields of the thread as a JSON compatible dict.
+            decode: Creates the thread from the fields returned by encode.
+        """
+        cls._codecs[thread_type] = (kind, encode)
+        cls._decoders[kind] = decode
+
+    @classmethod
+    def encode(cls, state: ConversationState) -> Dict[str, Any]:
+        threads = {}
+        for name, thread in state.threads.items():
+            encoded = cls.encode_thread(thread)
+            if encoded is not None:
+                threads[name] = encoded
+
+        attributes = {key: value for key, value in vars(state).items() if key not in ("id", "threads", "version")}
+        return {"id": state.id, "version": state.version, "threads": threads, "attributes": attributes}
+
+    @classmethod
+    def decode(cls, data: Dict[str, Any]) -> ConversationState:
+        threads = {}
+        for name, encoded in data.get("threads", {}).items():
+            thread = cls.decode_thread(encoded)
+            if thread is not None:
+                threads[name] = thread
+
+        state = ConversationState(id=data["id"], threads=threads, version=data.get("version", 0))
+        for key, value in data.get("attributes", {}).items():
+            setattr(state, key, value)
+        return state
+
+    @classmethod
+    def encode_thread(cls, thread: AgentThread | None) -> Dict[str, Any] | None:
+        if thread is None:
+            return None
+        for thread_type in type(thread).__mro__:
+            codec = cls._codecs.get(thread_type)
+            if codec is not None:
+                kind, encode = codec
+                return {"kind": kind, **encode(thread)}
+
+        logger.warning("No codec registered for thread type %s, the thread is not persisted", type(thread).__name__)
+        return None
+
+    @classmethod
+    def decode_thread(cls, data: Dict[str, Any]) -> AgentThread | None:
+        decode = cls._decoders.get(data.get("kind"))
+        if decode is None:
+            logger.warning("No codec registered for thread kind %s, the thread is dropped", data.get("kind"))
+            return None
+        return decode(data)
+
+
+def _encode_chat_history_thread(thread: ChatHistoryAgentThread) -> Dict[str, Any]:
+    return {
+        "id": thread.id,
+        "chat_history": thread._chat_history.model_dump(mode="json", exclude_none=True),
+    }
+
+
+def _decode_chat_history_thread(data: Dict[str, Any]) -> ChatHistoryAgentThread:
+    return ChatHistoryAgentThread(
+        chat_history=ChatHistory.model_validate(data["chat_history"]),
+        thread_id=data.get("id"),
+    )
+
+
+ConversationStateCodec.register(ChatHistoryAgentThread, "chat_history", _encode_chat_history_thread, _decode_chat_history_thread)
+
+
+def _encode_azure_ai_thread(thread: AzureAIAgentThread) -> Dict[str, Any]:
+    # The messages are kept by the Azure AI Agent service, only the thread id is stored
+    return {"id": thread.id}
+
+
+def _decode_azure_ai_thread(data: Dict[str, Any]) -> AzureAIAgentThread:
+    # Imported here since the Azure AI agents depend on the models
+    from agents.azure_ai_agents.azure_ai_project_cache import AzureAIProjectCache
+
+    return AzureAIAgentThread(client=AzureAIProjectCache.get_client(), thread_id=data.get("id"))
+
+
+ConversationStateCodec.register(AzureAIAgentThread, "azure_ai", _encode_azure_ai_thread, _decode_azure_ai_thread)
@@ -5,4 +5,23 @@ class StrategyName(Enum):
     Enumeration of available agent orchestration strategies.
     """
     SINGLE_CHAT = "single_chat"  # Single agent chat strategy
-    INTENT_ROUTER = "intent_router"  # Route to different agents based on intent
\ No newline at end of file
+    INTENT_ROUTER = "intent_router"  # Route to different agents based on intent
+    FAN_OUT = "fan_out"  # Invoke all agents concurrently
+
+class FanOutMode(Enum):
+    """
+    Enumeration of the ways the fan-out strategy combines the agent responses.
+    """
+    FIRST = "first"  # The first good answer wins, the other agents are cancelled; chat history agents only
+    MERGE = "merge"  # The answers of all agents are merged into one response
+
+
+class StreamEventType(Enum):
+    """
+    Enumeration of the server-sent events of a streamed agent invocation.
+    """
+    ROUTING = "routing"  # The agent picked by the intent router
+    DELTA = "delta"  # A chunk of text streamed by an agent
+    MESSAGE = "message"  # A complete message of an agent
+    FINAL = "final"  # The final agent response
+    ERROR = "error"  # The invocation failed
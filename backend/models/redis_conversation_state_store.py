@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import weakref
+import zlib
+from typing import Any, Dict, Optional
+
+from models.conversation_state import ConversationState, ConversationStateConflict, ConversationStateStore
+from models.conversation_state_codec import ConversationStateCodec
+from telemetry.metrics import meter, METRIC_PREFIX
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+state_bytes_written = meter.create_counter(
+    name=f"{METRIC_PREFIX}.conversation_store.bytes_written",
+    unit="By",
+    description="Number of bytes of conversation state written to Redis",
+)
+
+ATTRIBUTES_FIELD = "attributes"
+VERSION_FIELD = "version"
+THREAD_FIELD_PREFIX = "thread:"
+# Serialized fields start with a marker telling whether they are compressed
+PLAIN_MARKER = b"j"
+COMPRESSED_MARKER = b"z"
+
+
+class RedisConversationStateStore(ConversationStateStore):
+    """
+    ConversationStateStore kept in a Redis-protocol server, so that any worker can serve any turn.
+
+    Each conversation is a hash with a field for its attributes and a field per thread,
+    serialized as compact JSON and compressed above compress_threshold bytes. A save only
+    writes the fields that changed since the state was read or last saved, and refreshes the
+    expiry of the key, in one transaction. Reads also refresh the expiry in the same pipeline, so that a
+    conversation expires ttl_seconds after its last turn. A ttl_seconds of 0 keeps the keys.
+
+    Saves are optimistic: the key is watched while its version is checked against the version
+    the state was read at, a save made by another worker in between raises a ConversationStateConflict.
+    """
+
+    def __init__(
+        self,
+        client: Optional["redis.Redis"] = None,
+        url: Optional[str] = None,
+        key_prefix: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        compress_threshold: Optional[int] = None,
+    ):
+        if client is None:
+            if redis is None:
+                raise ValueError("The redis package must be installed to use the Redis conversation store.")
+            client = redis.Redis.from_url(url or os.getenv("CONVERSATION_STORE_REDIS_URL", "redis://localhost:6379/0"))
+
+        self.client = client
+        self.key_prefix = key_prefix or os.getenv("CONVERSATION_STORE_REDIS_PREFIX", "conversation")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("CONVERSATION_STORE_TTL_SECONDS", 86400))
+        self.compress_threshold = compress_threshold if compress_threshold is not None else int(os.getenv("CONVERSATION_STORE_COMPRESS_BYTES", 1024))
+        # Serialized fields last read or written for each state, to only write the changed ones
+        self._written: weakref.WeakKeyDictionary[ConversationState, Dict[str, bytes]] = weakref.WeakKeyDictionary()
+
+    def init_state(self, id: str) -> ConversationState:
+        """get or create the conversation state."""
+        state = self.get_state(id=id)
+        if not state:
+            state = ConversationState(
+                id=id,
+                threads={}
+            )
+            try:
+                self.save_state(state=state)
+            except ConversationStateConflict:
+                # Another worker created the conversation first
+                return self.get_state(id=id)
+        return state
+
+    def save_state(self, state: ConversationState) -> None:
+        """Write the changed fields of the conversation state."""
+        key = self._key(state.id)
+        with self.client.pipeline(transaction=True) as pipeline:
+            try:
+                pipeline.watch(key)
+                stored_version = pipeline.hget(key, VERSION_FIELD)
+                self._claim_version(state, int(stored_version) if stored_version else 0)
+
+                fields = self._serialize(state)
+                written = self._written.get(state, {})
+                changed = {name: value for name, value in fields.items() if written.get(name) != value}
+                removed = [name for name in written if name not in fields]
+
+                pipeline.multi()
+                pipeline.hset(key, mapping=changed)
+                if removed:
+                    pipeline.hdel(key, *removed)
+                if self.ttl_seconds > 0:
+                    pipeline.expire(key, self.ttl_seconds)
+                pipeline.execute()
+            except redis.WatchError:
+                state.version -= 1
+                raise ConversationStateConflict(f"Conversation {state.id} was saved by another worker while it was being saved.")
+
+        self._written[state] = fields
+        state_bytes_written.add(sum(len(value) for value in changed.values()))
+
+    def get_state(self, id: str) -> ConversationState | None:
+        """Retrieve the conversation state from Redis."""
+        key = self._key(id)
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.hgetall(key)
+        if self.ttl_seconds > 0:
+            pipeline.expire(key, self.ttl_seconds)
+        fields = pipeline.execute()[0]
+        if not fields:
+            return None
+
+        fields = {name.decode() if isinstance(name, bytes) else name: value for name, value in fields.items()}
+        state = ConversationStateCodec.decode({
+            "id": id,
+            "version": int(fields[VERSION_FIELD]) if VERSION_FIELD in fields else 0,
+            "attributes": self._loads(fields[ATTRIBUTES_FIELD]) if ATTRIBUTES_FIELD in fields else {},
+            "threads": {
+                name[len(THREAD_FIELD_PREFIX):]: self._loads(value)
+                for name, value in fields.items()
+                if name.startswith(THREAD_FIELD_PREFIX)
+            },
+        })
+        self._written[state] = fields
+        return state
+
+    def delete_state(self, id: str) -> None:
+        """Delete the conversation state from Redis."""
+        self.client.delete(self._key(id))
+
+    def close(self) -> None:
+        """Close the connections to Redis."""
+        self.client.close()
+
+    def _key(self, id: str) -> str:
+        return f"{self.key_prefix}:{id}"
+
+    def _serialize(self, state: ConversationState) -> Dict[str, bytes]:
+        encoded = ConversationStateCodec.encode(state)
+        fields = {
+            VERSION_FIELD: str(encoded["version"]).encode(),
+            ATTRIBUTES_FIELD: self._dumps(encoded["attributes"]),
+        }
+        for name, thread in encoded["threads"].items():
+            fields[f"{THREAD_FIELD_PREFIX}{name}"] = self._dumps(thread)
+        return fields
+
+    def _dumps(self, value: Any) -> bytes:
+        data = json.dumps(value, separators=(",", ":")).encode()
+        if len(data) > self.compress_threshold:
+            return COMPRESSED_MARKER + zlib.compress(data)
+        return PLAIN_MARKER + data
+
+    @staticmethod
+    def _loads(data: bytes) -> Any:
+        if data[:1] == COMPRESSED_MARKER:
+            return json.loads(zlib.decompress(data[1:]))
+        return json.loads(data[1:])
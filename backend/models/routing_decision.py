@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class RoutingDecision(BaseModel):
+    """Routing decision returned by the intent router principal agent."""
+
+    agent_id: Optional[str] = Field(
+        None,
+        description="Identifier of the agent that should handle the query, or null if none should"
+    )
+    confidence_score: float = Field(
+        0.0,
+        description="Confidence in the classification, between 0 and 1"
+    )
+    your_response: str = Field(
+        "",
+        description="Rephrased query for the agent, or the reply to the user when no agent is picked"
+    )
+    destination_city: Optional[str] = Field(
+        None,
+        description="Destination city mentioned in the conversation, if any"
+    )
+
+    @staticmethod
+    def response_format(agent_ids: List[str]) -> Dict[str, Any]:
+        """
+        Build a strict JSON schema response format that constrains agent_id to the given agents.
+        """
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "RoutingDecision",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "agent_id": {"anyOf": [{"type": "string", "enum": list(agent_ids)}, {"type": "null"}]},
+                        "confidence_score": {"type": "number"},
+                        "your_response": {"type": "string"},
+                        "destination_city": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+                    },
+                    "required": ["agent_id", "confidence_score", "your_response", "destination_city"],
+                    "additionalProperties": False,
+                },
+            },
+        }
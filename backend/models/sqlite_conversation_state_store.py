@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from models.conversation_state import ConversationState, ConversationStateConflict, ConversationStateStore
+from models.conversation_state_codec import ConversationStateCodec
+from telemetry.metrics import meter, METRIC_PREFIX
+
+logger = logging.getLogger(__name__)
+
+state_writes = meter.create_counter(
+    name=f"{METRIC_PREFIX}.conversation_store.writes",
+    description="Number of conversation states written to the persistent store",
+)
+write_batch_size = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.conversation_store.write_batch_size",
+    description="Number of conversation states written in one transaction",
+)
+
+DEFAULT_DATABASE_PATH = os.path.join(".cache", "conversations.db")
+
+
+class SQLiteConversationStateStore(ConversationStateStore):
+    """
+    ConversationStateStore persisted in a local SQLite database in WAL mode.
+
+    States are encoded with the ConversationStateCodec when they are saved and written by a
+    background thread, which waits up to flush_interval_seconds after a save, or until batch_size
+    states are waiting, and writes them all in one transaction. A save returns once its state
+    is written. The states in use are kept in memory, up to cache_size of them. A cached
+    state is reloaded when another worker has written a newer version of it.
+
+    A save is rejected with a ConversationStateConflict when the stored version is no longer
+    the one the state was read at, including when another worker wrote it while the save was
+    waiting for its write. A write never replaces a newer version.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        flush_interval_seconds: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.path = path or os.getenv("CONVERSATION_STORE_SQLITE_PATH", DEFAULT_DATABASE_PATH)
+        self.flush_interval_seconds = flush_interval_seconds if flush_interval_seconds is not None else float(os.getenv("CONVERSATION_STORE_FLUSH_SECONDS", 0.005))
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv("CONVERSATION_STORE_BATCH_SIZE", 100))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("CONVERSATION_STORE_CACHE_SIZE", 1000))
+
+        self._states: OrderedDict[str, ConversationState] = OrderedDict()
+        # Encoded states waiting to be written, None for a deletion, with the sequence number of the change and the version
+        self._pending: Dict[str, Tuple[Optional[str], int, int]] = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Saves waiting for their write, by conversation, and the outcome of the finished ones by sequence number
+        self._waiting: Dict[str, List[int]] = {}
+        self._outcomes: Dict[int, Optional[Exception]] = {}
+        self._written = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._full = threading.Event()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Reads use their own connection, so that they do not wait for the writer thread
+        self._write_connection = self._connect()
+        self._read_connection = self._connect()
+        self._writer = threading.Thread(target=self._write_behind, name="sqlite-conversation-store", daemon=True)
+        self._writer.start()
+
+    def init_state(self, id: str) -> ConversationState:
+        """get or create the conversation state."""
+        state = self.get_state(id=id)
+        if not state:
+            state = ConversationState(
+                id=id,
+                threads={}
+            )
+            try:
+                self.save_state(state=state)
+            except ConversationStateConflict:
+                # Another worker created the conversation first
+                return self.get_state(id=id)
+        return state
+
+    def save_state(self, state: ConversationState) -> None:
+        """Keep the conversation state in memory and wait for it to be written with the other pending saves."""
+        stored_version = self._read_version(state.id)
+        with self._lock:
+            if state.id in self._pending:
+                encoded, _, version = self._pending[state.id]
+                stored_version = version if encoded is not None else 0
+            self._claim_version(state, stored_version)
+            encoded = json.dumps(ConversationStateCodec.encode(state))
+            self._sequence += 1
+            sequence = self._sequence
+            self._pending[state.id] = (encoded, sequence, state.version)
+            self._waiting.setdefault(state.id, []).append(sequence)
+            # Cached once pending, so that the state being saved is not evicted
+            self._cache(state)
+            pending = len(self._pending)
+        self._wake.set()
+        if pending >= self.batch_size:
+            self._full.set()
+        if self._closed:
+            # The writer has stopped
+            self._flush()
+
+        with self._lock:
+            while sequence not in self._outcomes:
+                self._written.wait()
+            error = self._outcomes.pop(sequence)
+        if error is not None:
+            state.version -= 1
+            raise error
+
+    def get_state(self, id: str) -> ConversationState | None:
+        """Retrieve the conversation state from memory, or from the database if it is not cached or outdated."""
+        with self._lock:
+            if id in self._pending:
+                encoded, _, _ = self._pending[id]
+                return self._states.get(id) if encoded is not None else None
+            cached = self._states.get(id)
+
+        with self._read_lock:
+            row = self._read_connection.execute(
+                "SELECT version, state FROM conversations WHERE id = ?", (id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        version, encoded = row
+        if cached is not None and cached.version == version:
+            with self._lock:
+                self._states.move_to_end(id)
+            return cached
+
+        state = ConversationStateCodec.decode(json.loads(encoded))
+        with self._lock:
+            # A save made while the row was read wins over the row
+            if id in self._pending:
+                return self._states.get(id)
+            self._cache(state)
+        return state
+
+    def delete_state(self, id: str) -> None:
+        """Delete the conversation state from memory and queue its deletion."""
+        with self._lock:
+            self._states.pop(id, None)
+            self._sequence += 1
+            self._pending[id] = (None, self._sequence, 0)
+        self._wake.set()
+
+    def close(self) -> None:
+        """Write the pending changes and close the database."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self._flush()
+        self._write_connection.close()
+        self._read_connection.close()
+
+    def _read_version(self, id: str) -> int:
+        with self._read_lock:
+            row = self._read_connection.execute(
+                "SELECT version FROM conversations WHERE id = ?", (id,)
+            ).fetchone()
+        return row[0] if row is not None else 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        return connection
+
+    def _cache(self, state: ConversationState) -> None:
+        self._states[state.id] = state
+        self._states.move_to_end(state.id)
+        if len(self._states) <= self.cache_size:
+            return
+        # States waiting to be written are never evicted
+        for id in list(self._states):
+            if len(self._states) <= self.cache_size:
+                break
+            if id not in self._pending:
+                del self._states[id]
+
+    def _write_behind(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+            # Let more saves join the transaction
+            self._full.wait(timeout=self.flush_interval_seconds)
+            self._full.clear()
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                pending = dict(self._pending)
+            if not pending:
+                return
+            try:
+                conflicts = self._write(pending)
+            except Exception as ex:
+                logger.exception("Failed to write conversation states to %s", self.path)
+                self._finish(pending, {id: ex for id in pending})
+                return
+            self._finish(pending, {
+                id: ConversationStateConflict(f"Conversation {id} was saved by another worker while it was being saved.")
+                for id in conflicts
+            })
+
+        for id in conflicts:
+            logger.warning("Conversation %s was saved by another worker, its write was dropped", id)
+        state_writes.add(len(pending) - len(conflicts))
+        write_batch_size.record(len(pending))
+
+    def _finish(self, pending: Dict[str, Tuple[Optional[str], int, int]], errors: Dict[str, Exception]) -> None:
+        with self._lock:
+            for id, (_, sequence, _) in pending.items():
+                # Changes saved while writing stay pending for the next write
+                if self._pending.get(id, (None, None, None))[1] == sequence:
+                    del self._pending[id]
+                # The saves of the conversation up to the written one share its outcome
+                waiting = self._waiting.get(id, [])
+                for waiting_sequence in [waiting_sequence for waiting_sequence in waiting if waiting_sequence <= sequence]:
+                    waiting.remove(waiting_sequence)
+                    self._outcomes[waiting_sequence] = errors.get(id)
+                if not waiting:
+                    self._waiting.pop(id, None)
+            # The cached states that were not written are reloaded on the next read
+            for id in errors:
+                self._states.pop(id, None)
+            self._written.notify_all()
+
+    def _write(self, pending: Dict[str, Tuple[Optional[str], int, int]]) -> List[str]:
+        """Write the pending changes in one transaction, returning the conversations that lost against a newer version."""
+        now = time.time()
+        conflicts = []
+        with self._write_connection:
+            self._write_connection.execute("BEGIN IMMEDIATE")
+            for id, (encoded, _, version) in pending.items():
+                if encoded is None:
+                    self._write_connection.execute("DELETE FROM conversations WHERE id = ?", (id,))
+                    continue
+                written = self._write_connection.execute(
+                    """
+                    INSERT INTO conversations (id, version, state, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET version = excluded.version, state = excluded.state, updated_at = excluded.updated_at
+                    WHERE excluded.version > conversations.version
+                    RETURNING version
+                    """,
+                    (id, version, encoded, now),
+                ).fetchone()
+                if written is None:
+                    conflicts.append(id)
+        return conflicts
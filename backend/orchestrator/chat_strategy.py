@@ -1,11 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import AsyncIterable, Dict, Any
 
 from models.agent_request import AgentRequest
 from models.agent_response import AgentResponse
+from models.agent_stream_event import AgentStreamEvent
+from models.enumerations import StreamEventType
 
 # Abstract base class for chat strategies
 class ChatStrategy(ABC):
     @abstractmethod
     async def handle_request(self, agent_request: AgentRequest) -> AgentResponse:
-        pass
\ No newline at end of file
+        pass
+
+    async def handle_request_stream(self, agent_request: AgentRequest) -> AsyncIterable[AgentStreamEvent]:
+        """
+        Handle the request as a stream of events. Strategies that can not stream
+        send the response of handle_request as the final event.
+        """
+        response = await self.handle_request(agent_request)
+        yield AgentStreamEvent(event=StreamEventType.FINAL, agent_id=response.message.agent_id, response=response)
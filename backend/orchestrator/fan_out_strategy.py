@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Set, Tuple
+
+from fastapi import HTTPException
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.agents.agent import AgentResponseItem
+from orchestrator.chat_strategy import ChatStrategy
+from models.agent_request import AgentRequest
+from models.agent_response import AgentResponse, Message
+from models.available_agents import AvailableAgents
+from models.conversation_state import ConversationState, AsyncConversationStateStore
+from models.enumerations import FanOutMode
+from telemetry.metrics import meter, METRIC_PREFIX
+from utils.response_parser import parse_agent_response
+from utils.speculative_dispatch import SpeculationNotSupported, fork_chat_history_thread
+
+logger = logging.getLogger(__name__)
+
+agent_outcomes = meter.create_counter(
+    name=f"{METRIC_PREFIX}.fan_out.agent_outcomes",
+    description="Number of agent invocations of the fan-out strategy, by outcome",
+)
+
+DEFAULT_MODE = FanOutMode(os.getenv("FAN_OUT_MODE", FanOutMode.MERGE.value))
+DEFAULT_AGENT_TIMEOUT_SECONDS = float(os.getenv("FAN_OUT_AGENT_TIMEOUT_SECONDS", 60))
+
+
+class FanOutStrategy(ChatStrategy):
+    """
+    Invokes every agent involved concurrently, so that a request needing several agents
+    takes as long as the slowest agent instead of the sum of all of them.
+
+    In merge mode the answers of all agents that respond in time are combined into one
+    response. In first mode the first agent with a non-empty answer wins. The invocations of
+    the other agents that keep their history locally run on a copy of their thread and are
+    cancelled. Cancelling would only stop the local task of a Copilot Studio or Azure AI agent
+    while its turn goes on in the service, so those finish in the background within the agent
+    timeout and their answers are dropped. Their remote thread still records the turn.
+    """
+
+    # Invocations of losing remote agents, referenced until they finish
+    _background: Set[asyncio.Task] = set()
+
+    def __init__(self, conversation_store: AsyncConversationStateStore):
+        self.conversation_store = conversation_store
+
+    async def handle_request(self, request: AgentRequest) -> AgentResponse:
+        conversation_id = request.conversation_id
+        if not conversation_id or not request.message.id:
+            raise HTTPException(
+                status_code=400,
+                detail="Conversation ID and message ID are required."
+            )
+
+        agent_names = list(dict.fromkeys(request.strategy.agents_involved))
+        unknown_agents = [name for name in agent_names if name not in AvailableAgents.agents]
+        if not agent_names or unknown_agents:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Agents {unknown_agents} not found in agent registry."
+            )
+
+        mode = request.strategy.mode or DEFAULT_MODE
+        timeout = request.strategy.agent_timeout_seconds or DEFAULT_AGENT_TIMEOUT_SECONDS
+        conversation_state = await self.conversation_store.init_state(id=conversation_id)
+
+        if mode == FanOutMode.FIRST:
+            results = await self.invoke_first(request, agent_names, conversation_state, timeout)
+        else:
+            results = await self.invoke_all(request, agent_names, conversation_state, timeout)
+
+        if not results:
+            raise HTTPException(
+                status_code=504,
+                detail=f"None of the agents {agent_names} responded within {timeout} seconds."
+            )
+
+        # Only the threads of the agents that answered are kept
+        for agent_name, final_response in results:
+            conversation_state.update_thread(id=agent_name, thread=final_response.thread)
+        await self.conversation_store.save_state(state=conversation_state)
+
+        # The history of a merged response would mix the threads of several agents, so it is only returned for one agent
+        if len(results) == 1:
+            return await parse_agent_response(results[0][1], conversation_id, request.include_history, request.history_cursor)
+        return await self.merge_responses(results, conversation_id)
+
+    async def invoke_all(
+        self, request: AgentRequest, agent_names: List[str], conversation_state: ConversationState, timeout: float
+    ) -> List[Tuple[str, AgentResponseItem]]:
+        """
+        Invoke all agents concurrently and return the final responses of those that answered, in request order.
+        """
+        outcomes = await asyncio.gather(
+            *(self.invoke_agent(request, agent_name, conversation_state, timeout) for agent_name in agent_names),
+            return_exceptions=True,
+        )
+        results = []
+        for agent_name, outcome in zip(agent_names, outcomes):
+            if isinstance(outcome, BaseException):
+                self.record_failure(agent_name, outcome)
+            elif outcome is not None:
+                results.append((agent_name, outcome))
+        return results
+
+    async def invoke_first(
+        self, request: AgentRequest, agent_names: List[str], conversation_state: ConversationState, timeout: float
+    ) -> List[Tuple[str, AgentResponseItem]]:
+        """
+        Invoke all agents concurrently and return the first non-empty answer, the other invocations are
+        cancelled or left to finish in the background.
+        """
+        tasks: Dict[asyncio.Task, str] = {
+            asyncio.create_task(self.invoke_agent(request, agent_name, conversation_state, timeout)): agent_name
+            for agent_name in agent_names
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        self.record_failure(tasks[task], task.exception())
+                    elif task.result() is not None:
+                        return [(tasks[task], task.result())]
+            return []
+        finally:
+            for task in pending:
+                agent_name = tasks[task]
+                if self.is_cancellable(agent_name, conversation_state):
+                    task.cancel()
+                    agent_outcomes.add(1, {"agent": agent_name, "outcome": "cancelled"})
+                else:
+                    self._background.add(task)
+                    task.add_done_callback(lambda task, agent_name=agent_name: self.drop_result(agent_name, task))
+
+    @staticmethod
+    def is_cancellable(agent_name: str, conversation_state: ConversationState) -> bool:
+        """
+        Whether the invocation of the agent can be cancelled without leaving a turn running remotely:
+        the agent is a chat history agent and its thread, if any, is kept locally.
+        """
+        agent_class = AvailableAgents.get_agent_class(agent_name)
+        if agent_class is None or not issubclass(agent_class, ChatCompletionAgent):
+            return False
+        try:
+            fork_chat_history_thread(conversation_state.get_thread(id=agent_name))
+        except SpeculationNotSupported:
+            return False
+        return True
+
+    @classmethod
+    def drop_result(cls, agent_name: str, task: asyncio.Task) -> None:
+        """
+        Forget a losing invocation finished in the background, its answer is not used.
+        """
+        cls._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            cls.record_failure(agent_name, task.exception())
+
+    async def invoke_agent(
+        self, request: AgentRequest, agent_name: str, conversation_state: ConversationState, timeout: float
+    ) -> AgentResponseItem | None:
+        """
+        Invoke one agent within the timeout and return its final response, or None if it gave an empty answer.
+        """
+        # Local threads are copied, so that a cancelled invocation does not leave the message in the conversation
+        thread = conversation_state.get_thread(id=agent_name)
+        try:
+            thread = fork_chat_history_thread(thread)
+        except SpeculationNotSupported:
+            pass
+
+        kwargs = {}
+        if request.message.metadata is not None:
+            kwargs["message_data"] = request.message.metadata
+
+        async def collect_responses():
+            responses = []
+            async with AvailableAgents.lease_agent(agent_name) as agent_instance:
+                async for response in agent_instance.invoke(messages=request.message.content, thread=thread, **kwargs):
+                    if response:
+                        responses.append(response)
+            return responses
+
+        responses = await asyncio.wait_for(collect_responses(), timeout=timeout)
+        if not responses or not responses[-1].content.content:
+            agent_outcomes.add(1, {"agent": agent_name, "outcome": "empty"})
+            return None
+
+        agent_outcomes.add(1, {"agent": agent_name, "outcome": "ok"})
+        return responses[-1]
+
+    @staticmethod
+    def record_failure(agent_name: str, exception: BaseException) -> None:
+        if isinstance(exception, asyncio.TimeoutError):
+            logger.warning("Agent %s did not respond in time", agent_name)
+            agent_outcomes.add(1, {"agent": agent_name, "outcome": "timeout"})
+        else:
+            logger.warning("Agent %s failed: %s", agent_name, exception)
+            agent_outcomes.add(1, {"agent": agent_name, "outcome": "error"})
+
+    @staticmethod
+    async def merge_responses(results: List[Tuple[str, AgentResponseItem]], conversation_id: str) -> AgentResponse:
+        """
+        Combine the answers of several agents into one response, with a section per agent.
+        """
+        responses = [await parse_agent_response(final_response, conversation_id) for _, final_response in results]
+        sections = [f"### {agent_name}\n\n{response.message.content}" for (agent_name, _), response in zip(results, responses)]
+        return AgentResponse(
+            conversation_id=conversation_id,
+            message=Message(
+                content="\n\n".join(sections),
+                role="assistant",
+                agent_id=",".join(agent_name for agent_name, _ in results),
+                id=responses[-1].message.id,
+            ),
+        )
@@ -1,37 +1,73 @@
+from contextlib import aclosing
+from typing import AsyncIterable
 from fastapi import HTTPException
 from orchestrator.chat_strategy import ChatStrategy
 from models.agent_request import AgentRequest
 from models.agent_response import AgentResponse
-from models.conversation_state import ConversationStateStore
+from models.agent_stream_event import AgentStreamEvent
+from models.enumerations import StreamEventType
+from models.conversation_state import AsyncConversationStateStore
 from agents.intent_router_principal_agent import IntentRouterPrincipalAgent
-from utils.response_parser import parse_agent_response
+from utils.response_parser import parse_agent_response, parse_agent_stream
 
 
 class IntentRouterStrategy(ChatStrategy):
-    def __init__(self, conversation_store: ConversationStateStore):
+    def __init__(self, conversation_store: AsyncConversationStateStore):
         self.conversation_store = conversation_store
 
-    async def handle_request(self, request: AgentRequest) -> AgentResponse:
-        intent_router_agent = IntentRouterPrincipalAgent(
+    async def create_intent_router_agent(self, request: AgentRequest) -> IntentRouterPrincipalAgent:
+        conversation_state = await self.conversation_store.init_state(id=request.conversation_id)
+        return IntentRouterPrincipalAgent(
             name="intent_router_principal_agent",
             description="This agent evaluates the relevance of three responses to a given prompt.",
             agent_list=request.strategy.agents_involved,
             conversation_store=self.conversation_store,
-            conversation_id=request.conversation_id
+            conversation_state=conversation_state
         )
 
+    async def handle_request(self, request: AgentRequest) -> AgentResponse:
+        intent_router_agent = await self.create_intent_router_agent(request)
+
         responses = []
-        async for response in intent_router_agent.execute(message=request.message):
-            if response:
-                responses.append(response)
+        # Close the generator on errors too, so that a speculative agent invocation is cancelled
+        async with aclosing(intent_router_agent.execute(message=request.message)) as agent_responses:
+            async for response in agent_responses:
+                if response:
+                    responses.append(response)
 
         if responses:
             # Use the last response as the final one
             final_response = responses[-1]
-            return await parse_agent_response(final_response, request.conversation_id)
+            return await parse_agent_response(final_response, request.conversation_id, request.include_history, request.history_cursor)
 
         else:
             raise HTTPException(
                 status_code=501,
                 detail="Intent router agent did not return any response."
             )
+
+    async def handle_request_stream(self, request: AgentRequest) -> AsyncIterable[AgentStreamEvent]:
+        intent_router_agent = await self.create_intent_router_agent(request)
+
+        routing_announced = False
+        has_final_event = False
+        async with aclosing(intent_router_agent.execute(message=request.message, stream=True)) as agent_responses:
+            async with aclosing(parse_agent_stream(agent_responses, request.conversation_id, request.include_history, request.history_cursor)) as events:
+                async for event in events:
+                    # The routing decision is known once the first response arrives
+                    if not routing_announced:
+                        routing_announced = True
+                        routing_decision = intent_router_agent.routing_decision or {}
+                        yield AgentStreamEvent(
+                            event=StreamEventType.ROUTING,
+                            agent_id=routing_decision.get("agent_id"),
+                            confidence_score=routing_decision.get("confidence_score"),
+                        )
+                    has_final_event = has_final_event or event.event == StreamEventType.FINAL
+                    yield event
+
+        if not has_final_event:
+            raise HTTPException(
+                status_code=501,
+                detail="Intent router agent did not return any response."
+            )
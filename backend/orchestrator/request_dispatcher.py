@@ -1,29 +1,41 @@
-from typing import Dict, Type
+import asyncio
+import os
+from contextlib import aclosing
+from typing import AsyncIterable, Dict, List, Type
 from fastapi import HTTPException
 from orchestrator.chat_strategy import ChatStrategy
 from orchestrator.single_chat_strategy import SingleChatStrategy
 from orchestrator.intent_router_strategy import IntentRouterStrategy
+from orchestrator.fan_out_strategy import FanOutStrategy
 from models.agent_request import AgentRequest
-from models.agent_response import AgentResponse
+from models.agent_response import AgentResponse, BatchItemResult
+from models.agent_stream_event import AgentStreamEvent
 from models.enumerations import StrategyName
-from models.conversation_state import ConversationStateStore
+from models.conversation_state import AsyncConversationStateStore, ConversationStateConflict
+from utils.conversation_locks import ConversationLocks
+
+# Upper bound for the number of requests of a batch invoked at the same time
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 16))
 
 
 class RequestDispatcher:
-    def __init__(self, conversation_store: ConversationStateStore):
+    def __init__(self, conversation_store: AsyncConversationStateStore):
         self.conversation_store = conversation_store
+        # Turns of the same conversation run one at a time in this process
+        self.conversation_locks = ConversationLocks()
         # Dictionary to store available strategies
         self.strategies: Dict[StrategyName, Type[ChatStrategy]] = {
             StrategyName.INTENT_ROUTER: IntentRouterStrategy,
             StrategyName.SINGLE_CHAT: SingleChatStrategy,
+            StrategyName.FAN_OUT: FanOutStrategy,
         }
 
     def register_strategy(self, strategy_name: StrategyName, strategy: ChatStrategy) -> None:
         """Method to add new chat strategies dynamically"""
         self.strategies[strategy_name] = strategy
 
-    async def dispatch_request(self, request: AgentRequest) -> AgentResponse:
-        """Route the request to appropriate handler"""
+    def get_strategy(self, request: AgentRequest) -> ChatStrategy:
+        """Create the strategy handler for the request"""
         
         if request.strategy.name not in self.strategies:
             raise HTTPException(
@@ -31,6 +43,66 @@ class RequestDispatcher:
                 detail=f"No strategy registered for '{request.strategy.name}'"
             )
         
-        strategy = self.strategies[request.strategy.name](self.conversation_store)
-        response = await strategy.handle_request(request)
-        return response
\ No newline at end of file
+        return self.strategies[request.strategy.name](self.conversation_store)
+
+    async def dispatch_request(self, request: AgentRequest) -> AgentResponse:
+        """Route the request to appropriate handler"""
+        
+        strategy = self.get_strategy(request)
+        async with self.conversation_locks.hold(request.conversation_id):
+            try:
+                response = await strategy.handle_request(request)
+            except ConversationStateConflict as exc:
+                raise HTTPException(status_code=409, detail=str(exc))
+        return response
+
+    def dispatch_request_stream(self, request: AgentRequest) -> AsyncIterable[AgentStreamEvent]:
+        """Route the request to appropriate handler and stream its events"""
+        
+        # The strategy is resolved before streaming starts, so that an unknown strategy is still a 400 response
+        strategy = self.get_strategy(request)
+        return self.stream_request(strategy, request)
+
+    async def stream_request(self, strategy: ChatStrategy, request: AgentRequest) -> AsyncIterable[AgentStreamEvent]:
+        """Stream the events of the strategy, holding the conversation lock until the stream ends"""
+
+        async with self.conversation_locks.hold(request.conversation_id):
+            try:
+                async with aclosing(strategy.handle_request_stream(request)) as events:
+                    async for event in events:
+                        yield event
+            except ConversationStateConflict as exc:
+                raise HTTPException(status_code=409, detail=str(exc))
+
+    async def dispatch_batch(self, requests: List[AgentRequest], max_concurrency: int | None = None) -> AsyncIterable[BatchItemResult]:
+        """Route each request to its handler with bounded concurrency, yielding the results as they complete"""
+
+        concurrency = min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY, max(len(requests), 1))
+        pending = asyncio.Queue()
+        for index, request in enumerate(requests):
+            pending.put_nowait((index, request))
+        results = asyncio.Queue()
+
+        async def worker():
+            while not pending.empty():
+                index, request = pending.get_nowait()
+                await results.put(await self.dispatch_batch_item(index, request))
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for _ in range(len(requests)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def dispatch_batch_item(self, index: int, request: AgentRequest) -> BatchItemResult:
+        """Dispatch one request of a batch, turning errors into a failed result"""
+
+        try:
+            response = await self.dispatch_request(request)
+            return BatchItemResult(index=index, status_code=200, response=response)
+        except HTTPException as exc:
+            return BatchItemResult(index=index, status_code=exc.status_code, error=f"HTTP error occurred: {exc.detail}")
+        except Exception as exc:
+            return BatchItemResult(index=index, status_code=500, error=f"An unexpected error occurred: {exc}")
@@ -1,16 +1,38 @@
+from typing import AsyncIterable
 from fastapi import HTTPException
+from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
 from orchestrator.chat_strategy import ChatStrategy
 from models.agent_request import AgentRequest
 from models.agent_response import AgentResponse
+from models.agent_stream_event import AgentStreamEvent
 from models.available_agents import AvailableAgents
-from utils.response_parser import parse_agent_response
-from models.conversation_state import ConversationStateStore
+from utils.agent_invoker import invoke_agent
+from utils.response_parser import parse_agent_response, parse_agent_stream
+from models.conversation_state import AsyncConversationStateStore
 
 class SingleChatStrategy(ChatStrategy):
-    def __init__(self, conversation_store: ConversationStateStore):
+    def __init__(self, conversation_store: AsyncConversationStateStore):
         self.conversation_store = conversation_store
 
     async def handle_request(self, request: AgentRequest) -> AgentResponse:   
+        # Collect all responses from the stream
+        responses = []
+        async for response in self.invoke_agent(request, stream=False):
+            responses.append(response)
+
+        # Use the last response as the final one
+        final_response = responses[-1]
+        return await parse_agent_response(final_response, request.conversation_id, request.include_history, request.history_cursor)
+
+    async def handle_request_stream(self, request: AgentRequest) -> AsyncIterable[AgentStreamEvent]:
+        async for event in parse_agent_stream(self.invoke_agent(request, stream=True), request.conversation_id, request.include_history, request.history_cursor):
+            yield event
+
+    async def invoke_agent(self, request: AgentRequest, stream: bool) -> AsyncIterable[AgentResponseItem]:
+        """
+        Invoke the requested agent and save its thread in the conversation state once it has responded.
+        """
         conversation_id = request.conversation_id      
         message_id = request.message.id        
         if not conversation_id or not message_id:
@@ -27,15 +49,13 @@ class SingleChatStrategy(ChatStrategy):
                 detail=f"Agent {agent_name} not found in agent registry."
             )
         
-        # Create agent instance
-        agent_instance = await AvailableAgents.get_agent(agent_name)
-        if not agent_instance:
+        if agent_name not in AvailableAgents.agents:
             raise HTTPException(
                 status_code=404,
                 detail=f"Agent {agent_name} not found in agent registry."
             )
         # Get agent thread from conversation state
-        conversation_state = self.conversation_store.init_state(id=conversation_id)
+        conversation_state = await self.conversation_store.init_state(id=conversation_id)
         thread = conversation_state.get_thread(id=agent_name)
        
         # Pass the message as a string from request
@@ -43,28 +63,25 @@ class SingleChatStrategy(ChatStrategy):
         message = request.message.content
         message_data = request.message.metadata
         
-        # Collect all responses from the stream
-        responses = []
         # Pass any additional parameters to the agent's invoke method
         kwargs = {}
         if message_data is not None:
             kwargs["message_data"] = message_data
             
-        async for response in agent_instance.invoke(messages=message, thread=thread, **kwargs):
-            if response:
-                responses.append(response)            
+        final_response = None
+        # Lease agent instance from the pool for the duration of the invocation
+        async with AvailableAgents.lease_agent(agent_name) as agent_instance:
+            async for response in invoke_agent(agent_instance, message, thread, stream=stream, **kwargs):
+                if not isinstance(response.message, StreamingChatMessageContent):
+                    final_response = response
+                yield response
         
-        if responses:
-            # Use the last response as the final one
-            final_response = responses[-1]
-
-            # Update conversation store
-            conversation_state.update_thread(id=agent_name, thread=final_response.thread)
-            self.conversation_store.save_state(state=conversation_state)
-
-            return await parse_agent_response(final_response, conversation_id)
-        else:
-             raise HTTPException(
+        if final_response is None:
+            raise HTTPException(
                 status_code=500,
                 detail="Internal server error, Agent didn't return any response."
-            )
\ No newline at end of file
+            )
+
+        # Update conversation store
+        conversation_state.update_thread(id=agent_name, thread=final_response.thread)
+        await self.conversation_store.save_state(state=conversation_state)
@@ -0,0 +1,10 @@
+"""
+Application metrics.
+All instruments created from this meter share the "multi_agent" prefix so that the
+views configured in telemetry.set_up_metrics() export them.
+"""
+from opentelemetry import metrics
+
+METRIC_PREFIX = "multi_agent"
+
+meter = metrics.get_meter(__name__)
@@ -82,9 +82,10 @@ def set_up_metrics():
         metric_readers=[PeriodicExportingMetricReader(exporter, export_interval_millis=5000)],
         resource=resource,
         views=[
-            # Dropping all instrument names except for those starting with "semantic_kernel"
+            # Dropping all instrument names except for those starting with "semantic_kernel" or "multi_agent"
             View(instrument_name="*", aggregation=DropAggregation()),
             View(instrument_name="semantic_kernel*"),
+            View(instrument_name="multi_agent*"),
         ],
     )
     # Sets the global default meter provider
@@ -0,0 +1,21 @@
+import pytest
+
+from models.available_agents import AvailableAgents
+
+
+@pytest.fixture
+def azure_openai_env(monkeypatch):
+    """Settings for the Azure OpenAI connectors, which only need them to be constructed."""
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "test-deployment")
+
+
+@pytest.fixture
+def agent_registry():
+    """An empty AvailableAgents registry, restored after the test."""
+    agents = dict(AvailableAgents.agents)
+    AvailableAgents.agents.clear()
+    yield AvailableAgents
+    AvailableAgents.agents.clear()
+    AvailableAgents.agents.update(agents)
@@ -0,0 +1,85 @@
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF
+
+from agents.copilot_studio.base.activity_span_logger import ActivitySpanLogger
+
+ACTIVITIES = [
+    {"id": "1", "type": "message", "text": "hello", "from": {"id": "bot", "name": "Explorer"}, "channelData": {"secret": "x"}},
+    {"id": "2", "type": "event", "name": "DynamicPlanFinished", "from": {"id": "bot"}},
+]
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(trace, "get_tracer", provider.get_tracer)
+    monkeypatch.setattr(ActivitySpanLogger, "sample_rate", 1.0)
+    return exporter
+
+
+async def flush():
+    await ActivitySpanLogger.close()
+
+
+async def test_activities_are_events_of_one_child_span(exporter):
+    with trace.get_tracer("test").start_as_current_span("turn") as parent:
+        ActivitySpanLogger.record(ACTIVITIES)
+    await flush()
+
+    span = next(span for span in exporter.get_finished_spans() if span.name == "cps-activities")
+    assert span.parent.span_id == parent.get_span_context().span_id
+    assert [event.name for event in span.events] == ["cps-activity-1", "cps-activity-2"]
+    assert dict(span.events[0].attributes) == {"id": "1", "type": "message", "text": "hello", "from.id": "bot", "from.name": "Explorer"}
+
+
+async def test_without_a_current_span_the_activities_are_events_of_a_root_span(exporter):
+    ActivitySpanLogger.record(ACTIVITIES)
+    await flush()
+
+    spans = exporter.get_finished_spans()
+    assert [span.name for span in spans] == ["cps-activities"]
+    assert spans[0].parent is None
+    assert spans[0].events[1].attributes["name"] == "DynamicPlanFinished"
+
+
+async def test_nothing_is_logged_under_a_sampled_out_span(exporter):
+    with TracerProvider(sampler=ALWAYS_OFF).get_tracer("test").start_as_current_span("turn"):
+        ActivitySpanLogger.record(ACTIVITIES)
+    await flush()
+
+    assert exporter.get_finished_spans() == ()
+
+
+async def test_sampled_out_batches_are_not_logged(exporter, monkeypatch):
+    monkeypatch.setattr(ActivitySpanLogger, "sample_rate", 0.0)
+
+    with trace.get_tracer("test").start_as_current_span("turn"):
+        ActivitySpanLogger.record(ACTIVITIES)
+    ActivitySpanLogger.record(ACTIVITIES)
+    await flush()
+
+    assert [span.name for span in exporter.get_finished_spans()] == ["turn"]
+
+
+async def test_long_values_are_cut_and_star_keeps_every_attribute(exporter, monkeypatch):
+    monkeypatch.setattr(ActivitySpanLogger, "attributes", ["*"])
+    monkeypatch.setattr(ActivitySpanLogger, "max_attribute_size", 4)
+
+    ActivitySpanLogger.record(ACTIVITIES[:1])
+    await flush()
+
+    assert dict(exporter.get_finished_spans()[0].events[0].attributes) == {
+        "id": "1", "type": "mess...", "text": "hell...", "from.id": "bot", "from.name": "Expl...", "channelData.secret": "x",
+    }
+
+
+def test_outside_an_event_loop_spans_are_built_inline(exporter):
+    ActivitySpanLogger.record(ACTIVITIES[:1])
+
+    assert [span.name for span in exporter.get_finished_spans()] == ["cps-activities"]
@@ -0,0 +1,197 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
+
+from api.agent_api import AgentAPI
+from models.conversation_state import AsyncConversationStateStoreAdapter, InMemoryConversationStateStore
+
+CHUNKS = ["Bow ", "when ", "greeting."]
+
+
+class FakeStreamingAgent:
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+
+    async def invoke(self, messages, thread=None, **kwargs):
+        thread = thread or ChatHistoryAgentThread()
+        await thread.on_new_message(ChatMessageContent(role="user", content=messages))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        answer = ChatMessageContent(role="assistant", content="".join(CHUNKS), name=self.name)
+        await thread.on_new_message(answer)
+        yield AgentResponseItem(message=answer, thread=thread)
+
+    async def invoke_stream(self, messages, thread=None, **kwargs):
+        thread = thread or ChatHistoryAgentThread()
+        await thread.on_new_message(ChatMessageContent(role="user", content=messages))
+        if self.error is not None:
+            raise self.error
+        for chunk in CHUNKS:
+            yield AgentResponseItem(
+                message=StreamingChatMessageContent(role="assistant", content=chunk, choice_index=0, name=self.name),
+                thread=thread,
+            )
+        await thread.on_new_message(ChatMessageContent(role="assistant", content="".join(CHUNKS), name=self.name))
+
+
+@pytest.fixture
+def client(agent_registry):
+    agent_registry.add_agent("culture_guru", lambda: FakeStreamingAgent("culture_guru"), "cultural guide", "SK")
+    agent_registry.add_agent("failing", lambda: FakeStreamingAgent("failing", error=RuntimeError("boom")), "fails", "SK")
+    return TestClient(AgentAPI(AsyncConversationStateStoreAdapter(InMemoryConversationStateStore())).app)
+
+
+def make_request(agent="culture_guru", conversation_id="c1", message_id="m1", strategy="single_chat"):
+    return {
+        "conversation_id": conversation_id,
+        "message": {"content": "greetings?", "role": "user", "id": message_id},
+        "strategy": {"name": strategy, "agents_involved": [agent]},
+    }
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_deltas_then_the_message_and_the_final_response(client):
+    response = client.post("/plan/invoke/stream", json=make_request())
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["delta", "delta", "delta", "message", "final"]
+    assert "".join(data["delta"] for event, data in events if event == "delta") == "Bow when greeting."
+    assert events[-1][1]["response"] == {
+        "conversation_id": "c1",
+        "message": {"content": "Bow when greeting.", "role": "assistant", "agent_id": "culture_guru"},
+    }
+
+
+def test_invoke_returns_the_same_response_without_streaming(client):
+    response = client.post("/plan/invoke", json=make_request())
+
+    assert response.json()["message"]["content"] == "Bow when greeting."
+
+
+def test_stream_errors_after_the_start_are_sent_as_an_event(client):
+    events = parse_sse(client.post("/plan/invoke/stream", json=make_request(agent="failing")).text)
+
+    assert events[-1][0] == "error"
+    assert events[-1][1]["status_code"] == 500
+
+
+def test_unknown_agent_is_an_error_event(client):
+    events = parse_sse(client.post("/plan/invoke/stream", json=make_request(agent="missing")).text)
+
+    assert events == [("error", events[0][1])]
+    assert events[0][1]["status_code"] == 404
+
+
+def test_unknown_strategy_is_rejected_before_streaming(client):
+    assert client.post("/plan/invoke/stream", json=make_request(strategy="nope")).status_code == 422
+
+
+def receive_turn(websocket):
+    events = []
+    while not events or events[-1]["event"] not in ("final", "error"):
+        events.append(json.loads(websocket.receive_text()))
+    return events
+
+
+def test_websocket_answers_each_request_of_the_conversation(client):
+    with client.websocket_connect("/plan/ws") as websocket:
+        websocket.send_text(json.dumps(make_request(message_id="m1")))
+        first = receive_turn(websocket)
+        websocket.send_text(json.dumps(make_request(message_id="m2")))
+        second = receive_turn(websocket)
+
+    assert [event["event"] for event in first] == ["delta", "delta", "delta", "message", "final"]
+    assert second[-1]["response"]["message"]["content"] == "Bow when greeting."
+
+
+def test_websocket_keeps_the_connection_after_a_bad_frame(client):
+    with client.websocket_connect("/plan/ws") as websocket:
+        websocket.send_text("{not json")
+        invalid = receive_turn(websocket)
+        websocket.send_text(json.dumps(make_request(agent="missing")))
+        missing = receive_turn(websocket)
+        websocket.send_text(json.dumps(make_request()))
+        answered = receive_turn(websocket)
+
+    assert invalid == [{"event": "error", "error": invalid[0]["error"], "status_code": 422}]
+    assert missing[-1]["status_code"] == 404
+    assert answered[-1]["event"] == "final"
+
+
+def make_batch(*requests, **options):
+    return {"requests": list(requests), **options}
+
+
+def test_batch_returns_a_result_per_request_in_order(client):
+    response = client.post("/plan/invoke/batch", json=make_batch(
+        make_request(conversation_id="c1"),
+        make_request(agent="missing", conversation_id="c2"),
+        make_request(agent="failing", conversation_id="c3"),
+        make_request(conversation_id="c4"),
+    ))
+
+    results = response.json()["results"]
+    assert [(result["index"], result["status_code"]) for result in results] == [(0, 200), (1, 404), (2, 500), (3, 200)]
+    assert results[0]["response"]["message"]["content"] == "Bow when greeting."
+    assert "boom" in results[2]["error"]
+
+
+def test_empty_batch_has_no_results(client):
+    assert client.post("/plan/invoke/batch", json=make_batch()).json() == {"results": []}
+
+
+def test_batch_stream_sends_one_json_line_per_result(client):
+    response = client.post("/plan/invoke/batch", json=make_batch(
+        make_request(conversation_id="c1"), make_request(agent="missing", conversation_id="c2"), stream=True,
+    ))
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((result["index"], result["status_code"]) for result in results) == [(0, 200), (1, 404)]
+
+
+def test_batch_concurrency_must_be_positive(client):
+    assert client.post("/plan/invoke/batch", json=make_batch(make_request(), max_concurrency=0)).status_code == 422
+
+
+class CountingAgent(FakeStreamingAgent):
+    running = 0
+    peak = 0
+
+    async def invoke(self, messages, thread=None, **kwargs):
+        CountingAgent.running += 1
+        CountingAgent.peak = max(CountingAgent.peak, CountingAgent.running)
+        try:
+            async for response in super().invoke(messages, thread, **kwargs):
+                yield response
+        finally:
+            CountingAgent.running -= 1
+
+
+def test_batch_invokes_at_most_max_concurrency_requests_at_once(client, agent_registry, monkeypatch):
+    monkeypatch.setattr(CountingAgent, "peak", 0)
+    agent_registry.add_agent("counting", lambda: CountingAgent("counting", delay=0.02), "counts", "SK")
+
+    response = client.post("/plan/invoke/batch", json=make_batch(
+        *(make_request(agent="counting", conversation_id=f"c{index}") for index in range(6)), max_concurrency=2,
+    ))
+
+    assert [result["status_code"] for result in response.json()["results"]] == [200] * 6
+    assert CountingAgent.peak == 2
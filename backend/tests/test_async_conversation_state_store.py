@@ -0,0 +1,60 @@
+import threading
+
+from models.conversation_state import AsyncConversationStateStoreAdapter, ConversationState, ConversationStateStore, InMemoryConversationStateStore
+
+
+class RecordingStore(ConversationStateStore):
+    """Blocking store recording the thread each call runs on."""
+
+    blocking = True
+
+    def __init__(self):
+        self.states = {}
+        self.threads = []
+
+    def init_state(self, id):
+        self.threads.append(threading.get_ident())
+        return self.states.setdefault(id, ConversationState(id=id))
+
+    def save_state(self, state):
+        self.threads.append(threading.get_ident())
+        self.states[state.id] = state
+
+    def get_state(self, id):
+        self.threads.append(threading.get_ident())
+        return self.states.get(id)
+
+    def delete_state(self, id):
+        self.threads.append(threading.get_ident())
+        self.states.pop(id, None)
+
+    def close(self):
+        self.threads.append(threading.get_ident())
+
+
+async def test_blocking_stores_run_off_the_event_loop():
+    store = RecordingStore()
+    adapter = AsyncConversationStateStoreAdapter(store)
+
+    state = await adapter.init_state(id="c1")
+    await adapter.save_state(state)
+    assert await adapter.get_state(id="c1") is state
+    await adapter.delete_state(id="c1")
+    await adapter.close()
+
+    assert store.states == {}
+    assert len(store.threads) == 5
+    assert threading.get_ident() not in store.threads
+
+
+async def test_non_blocking_stores_run_inline(monkeypatch):
+    store = InMemoryConversationStateStore()
+    adapter = AsyncConversationStateStoreAdapter(store)
+    calls = []
+    original = store.get_state
+    monkeypatch.setattr(store, "get_state", lambda id: calls.append(threading.get_ident()) or original(id))
+
+    state = await adapter.init_state(id="c1")
+
+    assert await adapter.get_state(id="c1") is state
+    assert calls[-1] == threading.get_ident()
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from models.available_agents import AgentPool, AvailableAgents
+
+
+class FakeAgent:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    agents = dict(AvailableAgents.agents)
+    AvailableAgents.agents.clear()
+    yield
+    AvailableAgents.agents.clear()
+    AvailableAgents.agents.update(agents)
+
+
+async def test_shared_pool_constructs_once():
+    pool = AgentPool("shared", FakeAgent)
+
+    first = await pool.acquire()
+    second = await pool.acquire()
+
+    assert first is second
+    assert pool.misses == 1
+    assert pool.hits == 1
+
+
+async def test_bounded_pool_reuses_released_instances():
+    pool = AgentPool("bounded", FakeAgent, max_size=2)
+
+    first = await pool.acquire()
+    pool.release(first)
+    second = await pool.acquire()
+
+    assert first is second
+    assert pool.stats()["size"] == 1
+    assert pool.stats()["leased"] == 1
+
+
+async def test_bounded_pool_waits_for_a_release_when_exhausted():
+    pool = AgentPool("bounded", FakeAgent, max_size=1)
+    first = await pool.acquire()
+
+    waiting = asyncio.create_task(pool.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    pool.release(first)
+    assert await asyncio.wait_for(waiting, 1) is first
+
+
+async def test_failed_construction_frees_the_slot():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return FakeAgent()
+
+    pool = AgentPool("flaky", factory, max_size=1)
+    with pytest.raises(RuntimeError):
+        await pool.acquire()
+    assert isinstance(await asyncio.wait_for(pool.acquire(), 1), FakeAgent)
+
+
+async def test_close_covers_leased_instances():
+    pool = AgentPool("bounded", FakeAgent, max_size=2)
+    leased = await pool.acquire()
+    idle = await pool.acquire()
+    pool.release(idle)
+
+    await pool.close()
+
+    assert leased.closed and idle.closed
+    # An instance given back after close is not reused
+    pool.release(leased)
+    assert await pool.acquire() is not leased
+
+
+async def test_get_agent_leases_bounded_pools():
+    AvailableAgents.add_agent("bounded", FakeAgent, "", "SK", pool_size=1)
+
+    agent = await AvailableAgents.get_agent("bounded")
+    AvailableAgents.release_agent("bounded", agent)
+    async with AvailableAgents.lease_agent("bounded") as leased:
+        assert leased is agent
+
+    assert AvailableAgents.stats()[0]["misses"] == 1
+
+
+async def test_lease_agent_yields_none_for_unknown_agents():
+    async with AvailableAgents.lease_agent("missing") as agent:
+        assert agent is None
+    assert await AvailableAgents.get_agent("missing") is None
+
+
+def test_agent_class_is_known_without_constructing_an_agent():
+    AvailableAgents.add_agent("class", FakeAgent, "", "SK")
+    AvailableAgents.add_agent("factory", lambda: FakeAgent(), "", "SK", agent_class=FakeAgent)
+    AvailableAgents.add_agent("unknown", lambda: FakeAgent(), "", "SK")
+
+    assert AvailableAgents.get_agent_class("class") is FakeAgent
+    assert AvailableAgents.get_agent_class("factory") is FakeAgent
+    assert AvailableAgents.get_agent_class("unknown") is None
+    assert AvailableAgents.get_agent_class("missing") is None
+    assert AvailableAgents.stats()[0]["misses"] == 0
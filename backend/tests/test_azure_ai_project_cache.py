@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+from azure.ai.projects.models import Agent as AzureAIAgentModel
+from azure.core.exceptions import ResourceNotFoundError
+
+from agents.azure_ai_agents.azure_ai_project_cache import AzureAIProjectCache
+from models.azure_ai_agent import AzureAIAgentRequest
+
+
+class FakeAgents:
+    def __init__(self):
+        self.remote = {}
+
+    async def get_agent(self, agent_id):
+        if agent_id not in self.remote:
+            raise ResourceNotFoundError("not found")
+        return self.remote[agent_id]
+
+
+class FakeClient:
+    def __init__(self):
+        self.agents = FakeAgents()
+
+    async def close(self):
+        pass
+
+
+class Subscriber:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.definitions = []
+
+    def on_refresh(self, definition):
+        self.definitions.append(definition)
+        if self.fail:
+            raise RuntimeError("boom")
+
+
+def make_request(agent_id=None):
+    return AzureAIAgentRequest(
+        agent_id=agent_id, name="advisor", model="gpt", description="", instructions="", rag_agent=False
+    )
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("AZURE_AI_AGENT_CACHE_PATH", str(tmp_path / "agents.json"))
+    client = FakeClient()
+    AzureAIProjectCache._client = client
+    AzureAIProjectCache._definitions = {}
+    AzureAIProjectCache._subscribers = {}
+    AzureAIProjectCache._lock = None
+    yield client
+    if AzureAIProjectCache._refresh_task is not None:
+        AzureAIProjectCache._refresh_task.cancel()
+        AzureAIProjectCache._refresh_task = None
+    AzureAIProjectCache._client = None
+
+
+async def cache_definition(client, agent_id="asst_1", instructions="v1"):
+    definition = AzureAIAgentModel({"id": agent_id, "name": "advisor", "instructions": instructions})
+    client.agents.remote[agent_id] = definition
+
+    async def create_or_load(agent_creation_request, client):
+        return definition
+
+    return await AzureAIProjectCache.get_definition(make_request(), create_or_load)
+
+
+async def test_definition_is_created_once_and_shared_through_the_file(client, tmp_path):
+    calls = []
+
+    async def create_or_load(agent_creation_request, client):
+        calls.append(agent_creation_request.name)
+        return AzureAIAgentModel({"id": "asst_1", "name": "advisor"})
+
+    await AzureAIProjectCache.get_definition(make_request(), create_or_load)
+    await AzureAIProjectCache.get_definition(make_request(), create_or_load)
+    # Another process starts with an empty memory cache
+    AzureAIProjectCache._definitions = {}
+    definition = await AzureAIProjectCache.get_definition(make_request(), create_or_load)
+
+    assert calls == ["advisor"]
+    assert definition.id == "asst_1"
+
+
+async def test_explicit_agent_id_overrides_the_cached_definition(client):
+    await cache_definition(client)
+    calls = []
+
+    async def create_or_load(agent_creation_request, client):
+        calls.append(agent_creation_request.agent_id)
+        return AzureAIAgentModel({"id": "asst_2", "name": "advisor"})
+
+    definition = await AzureAIProjectCache.get_definition(make_request(agent_id="asst_2"), create_or_load)
+
+    assert calls == ["asst_2"]
+    assert definition.id == "asst_2"
+
+
+async def test_refresh_notifies_every_subscriber_even_when_one_fails(client):
+    await cache_definition(client)
+    failing, working = Subscriber(fail=True), Subscriber()
+    AzureAIProjectCache.subscribe("advisor", failing.on_refresh)
+    AzureAIProjectCache.subscribe("advisor", working.on_refresh)
+    client.agents.remote["asst_1"] = AzureAIAgentModel({"id": "asst_1", "name": "advisor", "instructions": "v2"})
+
+    await AzureAIProjectCache.refresh()
+
+    assert [definition.instructions for definition in working.definitions] == ["v2"]
+    assert AzureAIProjectCache._definitions["advisor"].instructions == "v2"
+
+
+async def test_refresh_evicts_deleted_agents(client, tmp_path):
+    await cache_definition(client)
+    del client.agents.remote["asst_1"]
+
+    await AzureAIProjectCache.refresh()
+
+    assert "advisor" not in AzureAIProjectCache._definitions
+    assert json.loads((tmp_path / "agents.json").read_text()) == {}
+
+
+async def test_periodic_refresh_survives_a_failed_round(client, monkeypatch):
+    monkeypatch.setenv("AZURE_AI_AGENT_REFRESH_SECONDS", "0")
+    rounds = []
+
+    async def refresh():
+        rounds.append(1)
+        if len(rounds) == 1:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(AzureAIProjectCache, "refresh", refresh)
+    task = asyncio.create_task(AzureAIProjectCache._refresh_periodically())
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert len(rounds) > 1
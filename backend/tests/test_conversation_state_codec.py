@@ -0,0 +1,75 @@
+from semantic_kernel.agents import AzureAIAgentThread, ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentThread
+
+from agents.copilot_studio.base.copilot_agent_thread import CopilotAgentThread
+from models.conversation_state import ConversationState
+from models.conversation_state_codec import ConversationStateCodec
+
+
+def chat_thread():
+    thread = ChatHistoryAgentThread(thread_id="t1")
+    thread._chat_history.add_user_message("Etiquette in Kyoto?")
+    thread._chat_history.add_assistant_message("Bow when greeting.")
+    return thread
+
+
+def test_state_round_trips_with_its_attributes_and_version():
+    state = ConversationState(id="c1", threads={"culture_guru": chat_thread()}, version=3)
+    state.destination_city = "Kyoto"
+
+    decoded = ConversationStateCodec.decode(ConversationStateCodec.encode(state))
+
+    assert decoded.id == "c1"
+    assert decoded.version == 3
+    assert decoded.destination_city == "Kyoto"
+    thread = decoded.get_thread("culture_guru")
+    assert thread.id == "t1"
+    assert [(message.role.value, message.content) for message in thread._chat_history.messages] == [
+        ("user", "Etiquette in Kyoto?"), ("assistant", "Bow when greeting."),
+    ]
+
+
+def test_copilot_threads_keep_their_conversation_and_watermark():
+    thread = CopilotAgentThread(directline_client=None, conversation_id="conv", watermark="7")
+    thread.stream_url = "wss://stream"
+
+    decoded = ConversationStateCodec.decode_thread(ConversationStateCodec.encode_thread(thread))
+
+    assert (decoded.id, decoded.watermark, decoded.stream_url) == ("conv", "7", None)
+
+
+def test_threads_without_a_codec_are_not_persisted():
+    class UnknownThread(AgentThread):
+        async def _create(self):
+            return "unknown"
+
+        async def _delete(self):
+            pass
+
+        async def _on_new_message(self, new_message):
+            pass
+
+    state = ConversationState(id="c1", threads={"unknown": UnknownThread(), "culture_guru": chat_thread()})
+
+    encoded = ConversationStateCodec.encode(state)
+
+    assert list(encoded["threads"]) == ["culture_guru"]
+
+
+def test_threads_of_an_unknown_kind_are_dropped():
+    decoded = ConversationStateCodec.decode({"id": "c1", "threads": {"gone": {"kind": "removed_agent", "id": "x"}}})
+
+    assert decoded.threads == {}
+
+
+def test_azure_ai_threads_keep_their_thread_id(monkeypatch):
+    from agents.azure_ai_agents.azure_ai_project_cache import AzureAIProjectCache
+
+    client = object()
+    monkeypatch.setattr(AzureAIProjectCache, "get_client", classmethod(lambda cls: client))
+    encoded = ConversationStateCodec.encode_thread(AzureAIAgentThread(client=client, thread_id="thread_1"))
+
+    decoded = ConversationStateCodec.decode_thread(encoded)
+
+    assert encoded == {"kind": "azure_ai", "id": "thread_1"}
+    assert (decoded.id, decoded._client) == ("thread_1", client)
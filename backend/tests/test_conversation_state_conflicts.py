@@ -0,0 +1,142 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from models.agent_request import AgentRequest
+from models.conversation_state import AsyncConversationStateStoreAdapter, ConversationStateConflict, InMemoryConversationStateStore
+from models.enumerations import StrategyName
+from models.redis_conversation_state_store import RedisConversationStateStore
+from models.sqlite_conversation_state_store import SQLiteConversationStateStore
+from orchestrator.request_dispatcher import RequestDispatcher
+from utils.conversation_locks import ConversationLocks
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def workers(request, tmp_path):
+    """Two store instances sharing the same storage, like two workers."""
+    if request.param == "memory":
+        store = InMemoryConversationStateStore()
+        yield store, store
+    elif request.param == "sqlite":
+        stores = [SQLiteConversationStateStore(path=str(tmp_path / "conversations.db")) for _ in range(2)]
+        yield stores
+        for store in stores:
+            store.close()
+    else:
+        client = fakeredis.FakeRedis()
+        yield RedisConversationStateStore(client=client), RedisConversationStateStore(client=client)
+
+
+def test_save_of_an_outdated_state_is_rejected(workers):
+    first, second = workers
+    first.init_state("c1")
+    state = first.get_state("c1")
+    other = second.get_state("c1")
+    if other is state:
+        # The in-memory store shares the object, the other turn read it at the same version
+        other = type(state)(id="c1", threads={}, version=state.version)
+
+    first.save_state(state)
+
+    with pytest.raises(ConversationStateConflict):
+        second.save_state(other)
+    # The rejected state keeps the version it was read at
+    assert other.version == 1
+    assert second.get_state("c1").version == 2
+
+
+def test_init_state_returns_the_state_created_by_another_worker(workers):
+    first, second = workers
+    created = first.init_state("c1")
+
+    assert second.init_state("c1").version == created.version == 1
+
+
+def test_sqlite_save_raced_by_another_worker_is_rejected(tmp_path, monkeypatch):
+    path = str(tmp_path / "conversations.db")
+    first, second = SQLiteConversationStateStore(path=path), SQLiteConversationStateStore(path=path)
+    first.init_state("c1")
+    state, other = first.get_state("c1"), second.get_state("c1")
+    # The second worker checked the stored version before the first one wrote
+    monkeypatch.setattr(second, "_read_version", lambda id: 1)
+
+    first.save_state(state)
+    with pytest.raises(ConversationStateConflict):
+        second.save_state(other)
+
+    assert second.get_state("c1") is not other
+    first.close()
+    second.close()
+
+
+def test_redis_save_raced_by_another_worker_is_rejected():
+    client = fakeredis.FakeRedis()
+    first, second = RedisConversationStateStore(client=client), RedisConversationStateStore(client=client)
+    first.init_state("c1")
+    state, other = first.get_state("c1"), second.get_state("c1")
+    serialize = second._serialize
+
+    def save_between_watch_and_write(saved_state):
+        # Runs after the key is watched and the version checked
+        first.save_state(state)
+        return serialize(saved_state)
+
+    second._serialize = save_between_watch_and_write
+
+    with pytest.raises(ConversationStateConflict):
+        second.save_state(other)
+    assert other.version == 1
+
+
+async def test_turns_of_a_conversation_run_one_at_a_time():
+    locks = ConversationLocks(timeout_seconds=1)
+    events = []
+
+    async def turn(conversation_id, name):
+        async with locks.hold(conversation_id):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.02)
+            events.append(f"{name} end")
+
+    await asyncio.gather(turn("c1", "a"), turn("c1", "b"), turn("c2", "c"))
+
+    assert events.index("a end") < events.index("b start")
+    assert events.index("c start") < events.index("a end")
+    assert locks._locks == {}
+
+
+async def test_waiting_past_the_timeout_is_a_conflict():
+    locks = ConversationLocks(timeout_seconds=0.01)
+
+    async with locks.hold("c1"):
+        with pytest.raises(HTTPException) as error:
+            async with locks.hold("c1"):
+                pass
+
+    assert error.value.status_code == 409
+    assert locks._locks == {}
+
+
+async def test_dispatcher_turns_store_conflicts_into_409(monkeypatch):
+    dispatcher = RequestDispatcher(AsyncConversationStateStoreAdapter(InMemoryConversationStateStore()))
+
+    class ConflictingStrategy:
+        def __init__(self, conversation_store):
+            pass
+
+        async def handle_request(self, request):
+            raise ConversationStateConflict("saved by another turn")
+
+    monkeypatch.setitem(dispatcher.strategies, StrategyName.SINGLE_CHAT, ConflictingStrategy)
+    request = AgentRequest.model_validate({
+        "conversation_id": "c1",
+        "message": {"content": "hi", "role": "user", "id": "m1"},
+        "strategy": {"name": "single_chat", "agents_involved": ["culture_guru"]},
+    })
+
+    with pytest.raises(HTTPException) as error:
+        await dispatcher.dispatch_request(request)
+
+    assert error.value.status_code == 409
@@ -0,0 +1,230 @@
+import asyncio
+
+import pytest
+from semantic_kernel.exceptions.agent_exceptions import AgentInvokeException
+
+from agents.copilot_studio.base.copilot_agent import CopilotAgent
+from agents.copilot_studio.base.copilot_agent_thread import CopilotAgentThread, release_copilot_streams
+from agents.copilot_studio.base.directline_client import DirectLineClient, DirectLineConversation
+from agents.copilot_studio.base.directline_conversation_pool import DirectLineConversationPool
+from agents.copilot_studio.base.directline_poller import DirectLinePoller
+from models.conversation_state import ConversationState, InMemoryConversationStateStore
+
+
+class FakeStream:
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    async def receive(self, timeout=None):
+        if self.closed:
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeDirectLineClient(DirectLineClient):
+    """DirectLine service with a bot answering each posted message on the open stream."""
+
+    def __init__(self):
+        super().__init__("https://directline.test", "secret", transport="websocket")
+        self.streams = []
+        self.reconnects = []
+        self.posted = 0
+        # Activity sets sent on the stream before the answer of the next turn
+        self.before_answer = []
+
+    async def create_conversation(self):
+        return DirectLineConversation(conversation_id="conv", stream_url="wss://stream/0")
+
+    async def reconnect(self, conversation_id, watermark=None):
+        self.reconnects.append(watermark)
+        return DirectLineConversation(conversation_id=conversation_id, stream_url=f"wss://stream/{len(self.reconnects)}")
+
+    async def open_stream(self, stream_url):
+        self.streams.append(FakeStream())
+        return self.streams[-1]
+
+    async def post_activity(self, conversation_id, payload):
+        self.posted += 1
+        activity_id = f"user-{self.posted}"
+        stream = self.streams[-1]
+        for data in self.before_answer:
+            stream.queue.put_nowait(data)
+        self.before_answer = []
+        stream.queue.put_nowait(bot_activities(activity_id, f"answer {self.posted}", watermark=str(self.posted * 2)))
+        return {"id": activity_id}
+
+
+def bot_activities(reply_to_id, text, watermark):
+    return {
+        "watermark": watermark,
+        "activities": [
+            {"id": f"{reply_to_id}-message", "type": "message", "text": text, "replyToId": reply_to_id, "from": {"id": "bot"}},
+            {"id": f"{reply_to_id}-finished", "type": "event", "name": "DynamicPlanFinished", "replyToId": reply_to_id, "from": {"id": "bot"}},
+        ],
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("DIRECTLINE_CONVERSATION_POOL_SIZE", "0")
+    monkeypatch.setattr(DirectLineConversationPool, "_pools", {})
+    monkeypatch.setattr(DirectLinePoller, "_pollers", {})
+    return FakeDirectLineClient()
+
+
+async def answers(agent, thread, message):
+    return [response.message.content async for response in agent.invoke(messages=message, thread=thread)]
+
+
+async def test_stream_is_closed_when_the_turn_ends(client):
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=client)
+    thread = CopilotAgentThread(directline_client=client)
+
+    assert await answers(agent, thread, "hello") == ["answer 1"]
+    assert client.streams[0].closed
+    assert thread.watermark == "2"
+
+    # The next turn reconnects after the watermark of the previous one
+    assert await answers(agent, thread, "again") == ["answer 2"]
+    assert client.reconnects == ["2"]
+    assert all(stream.closed for stream in client.streams)
+
+
+async def test_activities_of_an_earlier_turn_are_dropped(client):
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=client)
+    thread = CopilotAgentThread(directline_client=client)
+    await answers(agent, thread, "hello")
+
+    # A late end of the first turn is replayed on the new stream
+    client.before_answer = [{
+        "watermark": "3",
+        "activities": [
+            {"id": "late", "type": "message", "text": "late answer", "replyToId": "user-1", "from": {"id": "bot"}},
+            {"id": "late-finished", "type": "event", "name": "DynamicPlanFinished", "replyToId": "user-1", "from": {"id": "bot"}},
+        ],
+    }]
+
+    assert await answers(agent, thread, "again") == ["answer 2"]
+
+
+async def test_store_releases_the_streams_of_evicted_and_deleted_conversations(client):
+    store = InMemoryConversationStateStore(max_entries=1, on_evict=release_copilot_streams)
+    streams = []
+    for id in ("c1", "c2", "c3"):
+        thread = CopilotAgentThread(directline_client=client, conversation_id=id)
+        thread.stream_url = "wss://stream"
+        streams.append(await thread.get_stream())
+        store.save_state(ConversationState(id=id, threads={"explorer": thread}))
+
+    store.delete_state("c3")
+    await asyncio.sleep(0)
+
+    assert [stream.closed for stream in streams] == [True, True, True]
+
+
+class FakePollingClient(FakeDirectLineClient):
+    """DirectLine service polled for activities, the bot answers after a number of empty polls."""
+
+    def __init__(self, empty_polls=0, finish=True):
+        super().__init__()
+        self.transport = "polling"
+        self.empty_polls = empty_polls
+        self.finish = finish
+        self.polls = []
+
+    async def post_activity(self, conversation_id, payload):
+        self.posted += 1
+        return {"id": f"user-{self.posted}"}
+
+    async def get_activities(self, conversation_id, watermark=None):
+        self.polls.append(watermark)
+        if len(self.polls) <= self.empty_polls:
+            return {"watermark": watermark, "activities": []}
+        data = bot_activities(f"user-{self.posted}", f"answer {self.posted}", watermark=str(self.posted * 2))
+        if not self.finish:
+            data["activities"] = data["activities"][:1]
+        return data
+
+
+@pytest.fixture
+def fast_polls(monkeypatch, client):
+    monkeypatch.setenv("DIRECTLINE_POLL_INITIAL_SECONDS", "0.01")
+    monkeypatch.setenv("DIRECTLINE_POLL_MAX_SECONDS", "0.02")
+    monkeypatch.setenv("DIRECTLINE_TURN_SETTLE_SECONDS", "0.05")
+
+
+async def test_polls_back_off_until_the_bot_answers(fast_polls):
+    client = FakePollingClient(empty_polls=3)
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=client)
+    thread = CopilotAgentThread(directline_client=client)
+
+    assert await answers(agent, thread, "hello") == ["answer 1"]
+    assert len(client.polls) == 4
+    assert thread.watermark == "2"
+
+
+async def test_turn_without_an_end_event_settles(fast_polls):
+    client = FakePollingClient(finish=False)
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=client)
+
+    assert await answers(agent, CopilotAgentThread(directline_client=client), "hello") == ["answer 1"]
+
+
+async def test_silent_bot_fails_at_the_deadline(fast_polls, monkeypatch):
+    monkeypatch.setenv("DIRECTLINE_TURN_DEADLINE_SECONDS", "0.1")
+    client = FakePollingClient(empty_polls=1000)
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=client)
+
+    with pytest.raises(AgentInvokeException, match="did not finish its turn"):
+        await answers(agent, CopilotAgentThread(directline_client=client), "hello")
+
+
+class SteppedClient(FakeDirectLineClient):
+    """Sends the first message of the bot when the user message is posted, the rest when the test says so."""
+
+    async def post_activity(self, conversation_id, payload):
+        self.posted += 1
+        data = bot_activities("user-1", "first", watermark="1")
+        data["activities"] = data["activities"][:1]
+        self.streams[-1].queue.put_nowait(data)
+        return {"id": "user-1"}
+
+    def finish_turn(self):
+        data = bot_activities("user-1", "second", watermark="2")
+        data["activities"][0]["id"] = "user-1-second"
+        self.streams[-1].queue.put_nowait(data)
+
+
+async def test_messages_are_yielded_as_they_arrive(client, monkeypatch):
+    monkeypatch.setenv("DIRECTLINE_TURN_SETTLE_SECONDS", "5")
+    client = SteppedClient()
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=client)
+    responses = agent.invoke(messages="hello", thread=CopilotAgentThread(directline_client=client))
+
+    first = await asyncio.wait_for(anext(responses), 1)
+    client.finish_turn()
+    rest = [response.message.content async for response in responses]
+
+    assert first.message.content == "first"
+    assert rest == ["second"]
+
+
+async def test_closed_stream_falls_back_to_polling(client, monkeypatch):
+    monkeypatch.setenv("DIRECTLINE_POLL_INITIAL_SECONDS", "0.01")
+
+    class ClosingStreamClient(FakePollingClient):
+        async def open_stream(self, stream_url):
+            stream = await super().open_stream(stream_url)
+            stream.closed = True
+            return stream
+
+    polling_client = ClosingStreamClient()
+    polling_client.transport = "websocket"
+    agent = CopilotAgent(id="explorer", name="explorer", description="", directline_client=polling_client)
+
+    assert await answers(agent, CopilotAgentThread(directline_client=polling_client), "hello") == ["answer 1"]
+    assert polling_client.polls == [None]
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.copilot_studio.base.directline_client import DirectLineClient, DirectLineConversation
+from agents.copilot_studio.base import directline_conversation_pool
+from agents.copilot_studio.base.directline_conversation_pool import DirectLineConversationPool
+
+
+class CountingClient(DirectLineClient):
+    def __init__(self, expires_in=None):
+        super().__init__("https://directline.test", "secret")
+        self.created = 0
+        self.expires_in = expires_in
+
+    async def create_conversation(self):
+        self.created += 1
+        return DirectLineConversation(conversation_id=f"conv-{self.created}", stream_url="wss://stream", expires_in=self.expires_in)
+
+
+@pytest.fixture(autouse=True)
+async def pools(monkeypatch):
+    monkeypatch.setattr(DirectLineConversationPool, "_pools", {})
+    yield
+    await DirectLineConversationPool.close()
+
+
+async def filled(pool):
+    while len(pool._conversations) < pool.size:
+        await asyncio.sleep(0)
+
+
+async def test_claims_take_pre_started_conversations_and_the_pool_refills():
+    client = CountingClient()
+    pool = DirectLineConversationPool(client, size=2)
+    pool.refill()
+    await filled(pool)
+
+    conversation = await pool.claim()
+    await filled(pool)
+
+    assert conversation.conversation_id == "conv-1"
+    assert conversation.stream_url == "wss://stream"
+    assert pool.stats()["hits"] == 1
+    assert client.created == 3
+
+
+async def test_empty_pool_starts_a_conversation_inline():
+    client = CountingClient()
+    pool = DirectLineConversationPool(client, size=0)
+
+    conversation = await pool.claim()
+
+    assert conversation.conversation_id == "conv-1"
+    assert pool.stats()["misses"] == 1
+
+
+async def test_old_stream_urls_are_dropped():
+    pool = DirectLineConversationPool(CountingClient(), size=0)
+    created_at = time.monotonic() - directline_conversation_pool.STREAM_URL_TTL_SECONDS - 1
+    pool._conversations.append((created_at, DirectLineConversation(conversation_id="old", stream_url="wss://stream")))
+
+    conversation = await pool.claim()
+
+    assert conversation.conversation_id == "old"
+    assert conversation.stream_url is None
+
+
+@pytest.mark.parametrize("expires_in, max_age_seconds", [(None, 10), (3600, 10), (65, 300)])
+async def test_expired_conversations_are_discarded(expires_in, max_age_seconds):
+    client = CountingClient()
+    pool = DirectLineConversationPool(client, size=0, max_age_seconds=max_age_seconds)
+    pool._conversations.append((time.monotonic() - 11, DirectLineConversation(conversation_id="expired", expires_in=expires_in)))
+
+    conversation = await pool.claim()
+
+    assert conversation.conversation_id == "conv-1"
+
+
+async def test_get_shares_the_pool_of_an_endpoint_and_secret(monkeypatch):
+    monkeypatch.setenv("DIRECTLINE_CONVERSATION_POOL_SIZE", "0")
+
+    assert DirectLineConversationPool.get(CountingClient()) is DirectLineConversationPool.get(CountingClient())
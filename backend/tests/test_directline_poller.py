@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.copilot_studio.base.directline_client import DirectLineClient
+from agents.copilot_studio.base.directline_poller import DirectLinePoller
+from agents.copilot_studio.base.turn_scheduler import TurnScheduler
+
+
+class ScriptedClient(DirectLineClient):
+    """Returns an activity on every answer_every-th poll of a conversation."""
+
+    def __init__(self, delay=0.0, answer_every=1):
+        super().__init__("https://directline.test", "secret", transport="polling")
+        self.delay = delay
+        self.answer_every = answer_every
+        self.polls = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def get_activities(self, conversation_id, watermark=None):
+        self.polls.append((conversation_id, watermark, time.monotonic()))
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        count = sum(1 for polled, _, _ in self.polls if polled == conversation_id)
+        if count % self.answer_every:
+            return {"watermark": watermark, "activities": []}
+        return {"watermark": str(count), "activities": [{"id": f"{conversation_id}-{count}", "type": "message"}]}
+
+
+def scheduler():
+    return TurnScheduler(initial_delay=0.0, max_delay=0.0, jitter=0.0)
+
+
+@pytest.fixture(autouse=True)
+async def pollers(monkeypatch):
+    monkeypatch.setattr(DirectLinePoller, "_pollers", {})
+    yield
+    await DirectLinePoller.close()
+
+
+async def test_watch_delivers_activities_and_follows_the_watermark():
+    client = ScriptedClient(answer_every=2)
+    poller = DirectLinePoller(client, requests_per_second=1000)
+
+    async with poller.watch("c1", "0", scheduler()) as watch:
+        first = await asyncio.wait_for(watch.get(), 1)
+        second = await asyncio.wait_for(watch.get(), 1)
+
+    assert [first["watermark"], second["watermark"]] == ["2", "4"]
+    assert [watermark for _, watermark, _ in client.polls[:4]] == ["0", "0", "2", "2"]
+    assert watch.scheduler.polls >= 4
+
+
+async def test_requests_share_the_token_bucket():
+    client = ScriptedClient(answer_every=1000)
+    poller = DirectLinePoller(client, requests_per_second=20)
+
+    async with poller.watch("c1", None, scheduler()), poller.watch("c2", None, scheduler()):
+        await asyncio.sleep(1.5)
+
+    # One second of burst, then the refill rate
+    assert 25 <= len(client.polls) <= 52
+    assert {conversation_id for conversation_id, _, _ in client.polls} == {"c1", "c2"}
+
+
+async def test_in_flight_requests_are_limited():
+    client = ScriptedClient(delay=0.05, answer_every=1000)
+    poller = DirectLinePoller(client, requests_per_second=1000, max_concurrency=2)
+
+    async with poller.watch("c1", None, scheduler()), poller.watch("c2", None, scheduler()), poller.watch("c3", None, scheduler()):
+        await asyncio.sleep(0.3)
+
+    assert client.peak_in_flight == 2
+    assert poller.stats()["watched_conversations"] == 0
+
+
+async def test_poll_errors_are_raised_from_the_watch():
+    class FailingClient(ScriptedClient):
+        async def get_activities(self, conversation_id, watermark=None):
+            raise RuntimeError("502")
+
+    poller = DirectLinePoller(FailingClient(), requests_per_second=1000)
+
+    async with poller.watch("c1", None, scheduler()) as watch:
+        with pytest.raises(RuntimeError, match="502"):
+            await asyncio.wait_for(watch.get(), 1)
+
+
+async def test_poller_stops_once_no_conversation_is_watched():
+    poller = DirectLinePoller(ScriptedClient(answer_every=1000), requests_per_second=1000)
+
+    async with poller.watch("c1", None, scheduler()):
+        await asyncio.sleep(0.01)
+    await asyncio.wait_for(poller._task, 1)
+
+    assert poller._task.done()
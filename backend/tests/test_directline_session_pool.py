@@ -0,0 +1,48 @@
+import pytest
+
+from agents.copilot_studio.base.directline_client import DirectLineClient
+from agents.copilot_studio.base.directline_session_pool import DirectLineSessionPool
+
+
+@pytest.fixture
+async def pool(monkeypatch):
+    monkeypatch.setattr(DirectLineSessionPool, "_sessions", {})
+    monkeypatch.setenv("DIRECTLINE_POOL_LIMIT_PER_HOST", "4")
+    yield DirectLineSessionPool
+    await DirectLineSessionPool.close()
+
+
+async def test_clients_with_the_same_endpoint_and_secret_share_a_session(pool):
+    first = await DirectLineClient("https://directline.test", "secret").get_session()
+    second = await DirectLineClient("https://directline.test", "secret").get_session()
+    other = await DirectLineClient("https://directline.test", "other-secret").get_session()
+
+    assert first is second
+    assert other is not first
+    assert first.headers["Authorization"] == "Bearer secret"
+
+
+async def test_closing_a_client_keeps_the_shared_session(pool):
+    client = DirectLineClient("https://directline.test", "secret")
+    session = await client.get_session()
+
+    await client.close()
+
+    assert not session.closed
+    assert await DirectLineClient("https://directline.test", "secret").get_session() is session
+
+
+async def test_connector_uses_the_configured_limits(pool):
+    await DirectLineClient("https://directline.test", "secret").get_session()
+
+    assert pool.stats() == [{"endpoint": "https://directline.test", "in_use": 0, "idle": 0, "limit": 100, "limit_per_host": 4}]
+
+
+async def test_close_closes_the_sessions_and_a_new_one_is_created_after(pool):
+    session = await DirectLineClient("https://directline.test", "secret").get_session()
+
+    await pool.close()
+
+    assert session.closed
+    assert pool.stats() == []
+    assert await DirectLineClient("https://directline.test", "secret").get_session() is not session
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+from models.agent_request import AgentRequest
+from models.conversation_state import AsyncConversationStateStoreAdapter, InMemoryConversationStateStore
+from orchestrator.fan_out_strategy import FanOutStrategy
+
+
+class FakeChatAgent(ChatCompletionAgent):
+    delay: float = 0.0
+    answer: str | None = None
+    failure: str | None = None
+
+    async def invoke(self, messages=None, thread=None, **kwargs):
+        thread = thread or ChatHistoryAgentThread()
+        await thread.on_new_message(ChatMessageContent(role="user", content=messages))
+        await asyncio.sleep(self.delay)
+        if self.failure:
+            raise RuntimeError(self.failure)
+        answer = ChatMessageContent(role="assistant", content=self.answer if self.answer is not None else f"{self.name} says hi", name=self.name)
+        await thread.on_new_message(answer)
+        yield AgentResponseItem(message=answer, thread=thread)
+
+
+class FakeRemoteAgent:
+    """Agent that is not a chat history agent, like the Copilot Studio and Azure AI agents."""
+
+    name = "remote"
+    delay = 0.0
+    finished = []
+
+    async def invoke(self, messages=None, thread=None, **kwargs):
+        thread = thread or ChatHistoryAgentThread()
+        await asyncio.sleep(self.delay)
+        self.finished.append(self.name)
+        yield AgentResponseItem(message=ChatMessageContent(role="assistant", content="remote answer"), thread=thread)
+
+
+class SlowRemoteAgent(FakeRemoteAgent):
+    name = "slow_remote"
+    delay = 0.1
+
+
+def make_agent(name, **fields):
+    agent = FakeChatAgent(name=name)
+    for field, value in fields.items():
+        setattr(agent, field, value)
+    return agent
+
+
+@pytest.fixture
+def store(agent_registry):
+    agent_registry.add_agent("fast", lambda: make_agent("fast", delay=0.01), "", "SK", agent_class=FakeChatAgent)
+    agent_registry.add_agent("slow", lambda: make_agent("slow", delay=0.2), "", "SK", agent_class=FakeChatAgent)
+    agent_registry.add_agent("stuck", lambda: make_agent("stuck", delay=5), "", "SK", agent_class=FakeChatAgent)
+    agent_registry.add_agent("empty", lambda: make_agent("empty", answer=""), "", "SK", agent_class=FakeChatAgent)
+    agent_registry.add_agent("failing", lambda: make_agent("failing", failure="boom"), "", "SK", agent_class=FakeChatAgent)
+    agent_registry.add_agent("remote", FakeRemoteAgent, "", "MCS")
+    agent_registry.add_agent("slow_remote", SlowRemoteAgent, "", "MCS")
+    FakeRemoteAgent.finished = []
+    return AsyncConversationStateStoreAdapter(InMemoryConversationStateStore())
+
+
+def make_request(agents, mode=None, timeout=None):
+    strategy = {"name": "fan_out", "agents_involved": agents}
+    if mode:
+        strategy["mode"] = mode
+    if timeout:
+        strategy["agent_timeout_seconds"] = timeout
+    return AgentRequest.model_validate({
+        "conversation_id": "c1",
+        "message": {"content": "hi", "role": "user", "id": "m1"},
+        "strategy": strategy,
+    })
+
+
+async def thread_lengths(store):
+    state = await store.get_state(id="c1")
+    return {name: len(thread._chat_history.messages) for name, thread in state.threads.items()}
+
+
+async def test_merge_combines_the_answers_in_request_order(store):
+    response = await FanOutStrategy(store).handle_request(make_request(["slow", "fast"]))
+
+    assert response.message.content == "### slow\n\nslow says hi\n\n### fast\n\nfast says hi"
+    assert response.message.agent_id == "slow,fast"
+    assert await thread_lengths(store) == {"slow": 2, "fast": 2}
+
+
+async def test_merge_leaves_out_failed_empty_and_late_agents(store):
+    response = await FanOutStrategy(store).handle_request(make_request(["fast", "failing", "empty", "stuck"], timeout=0.1))
+
+    assert response.message.content == "fast says hi"
+    assert await thread_lengths(store) == {"fast": 2}
+
+
+async def test_no_answer_in_time_is_a_timeout(store):
+    with pytest.raises(HTTPException) as error:
+        await FanOutStrategy(store).handle_request(make_request(["stuck"], timeout=0.05))
+
+    assert error.value.status_code == 504
+
+
+async def test_unknown_agents_are_rejected(store):
+    with pytest.raises(HTTPException) as error:
+        await FanOutStrategy(store).handle_request(make_request(["fast", "missing"]))
+
+    assert error.value.status_code == 404
+
+
+async def test_first_mode_keeps_only_the_winner(store):
+    await FanOutStrategy(store).handle_request(make_request(["slow"]))
+
+    response = await FanOutStrategy(store).handle_request(make_request(["slow", "failing", "fast"], mode="first"))
+
+    assert response.message.content == "fast says hi"
+    # The cancelled agents ran on copies of their threads
+    assert await thread_lengths(store) == {"slow": 2, "fast": 2}
+
+
+async def test_first_mode_lets_losing_remote_agents_finish(store, agent_registry):
+    pool = agent_registry.agents["slow_remote"]["pool"]
+
+    response = await FanOutStrategy(store).handle_request(make_request(["slow_remote", "fast", "slow"], mode="first"))
+
+    assert response.message.content == "fast says hi"
+    # Eligibility is decided without leasing the agents
+    assert pool.misses == 1
+    await asyncio.sleep(0.3)
+    # The remote agent finished its turn, the local one was cancelled, only the winner is kept
+    assert FakeRemoteAgent.finished == ["slow_remote"]
+    assert not FanOutStrategy._background
+    assert await thread_lengths(store) == {"fast": 2}
+
+
+async def test_first_mode_can_be_won_by_a_remote_agent(store):
+    response = await FanOutStrategy(store).handle_request(make_request(["remote", "slow"], mode="first"))
+
+    assert response.message.content == "remote answer"
+
+
+async def test_merge_mode_accepts_agents_with_remote_threads(store):
+    response = await FanOutStrategy(store).handle_request(make_request(["fast", "remote"]))
+
+    assert "remote answer" in response.message.content
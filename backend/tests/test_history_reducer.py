@@ -0,0 +1,133 @@
+import pytest
+from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+from utils.history_reducer import TokenBudgetHistoryReducer, count_message_tokens
+
+
+class Settings:
+    max_tokens = None
+
+
+class FakeSummarizer:
+    """Chat completion service answering summary requests, recording the transcripts it was sent."""
+
+    def __init__(self, error=None):
+        self.transcripts = []
+        self.error = error
+
+    def get_prompt_execution_settings_class(self):
+        return Settings
+
+    async def get_chat_message_content(self, chat_history, settings):
+        if self.error is not None:
+            raise self.error
+        self.transcripts.append(chat_history.messages[-1].content)
+        return ChatMessageContent(role="assistant", content=f"summary {len(self.transcripts)}")
+
+
+class FakeKernel:
+    def __init__(self, service):
+        self.service = service
+
+    def get_service(self, type=None):
+        return self.service
+
+
+def history(turns, instructions="You are a travel guide."):
+    chat_history = ChatHistory()
+    chat_history.add_system_message(instructions)
+    for index in range(turns):
+        chat_history.add_user_message(f"question {index}")
+        chat_history.add_assistant_message(f"answer {index} " + "words " * 20)
+    return chat_history
+
+
+def contents(chat_history):
+    return [message.content for message in chat_history.messages]
+
+
+async def test_short_histories_are_kept():
+    chat_history = history(2)
+
+    reduced = await TokenBudgetHistoryReducer(max_turns=10, token_budget=4000, summarize=False).reduce(chat_history, None, "guide")
+
+    assert contents(reduced) == contents(chat_history)
+
+
+async def test_only_the_last_max_turns_are_kept():
+    reduced = await TokenBudgetHistoryReducer(max_turns=2, token_budget=4000, summarize=False).reduce(history(5), None, "guide")
+
+    assert contents(reduced)[0] == "You are a travel guide."
+    assert [content for content in contents(reduced) if content.startswith("question")] == ["question 3", "question 4"]
+
+
+async def test_turns_over_the_token_budget_are_left_out():
+    chat_history = history(5)
+    instructions_and_turn = count_message_tokens(chat_history.messages[0]) + sum(count_message_tokens(message) for message in chat_history.messages[1:3])
+
+    reduced = await TokenBudgetHistoryReducer(max_turns=10, token_budget=instructions_and_turn * 2, summarize=False).reduce(chat_history, None, "guide")
+
+    assert [content for content in contents(reduced) if content.startswith("question")] == ["question 3", "question 4"]
+
+
+async def test_the_last_turn_is_kept_over_the_budget():
+    reduced = await TokenBudgetHistoryReducer(max_turns=10, token_budget=1, summarize=False).reduce(history(3), None, "guide")
+
+    assert contents(reduced)[0] == "You are a travel guide."
+    assert contents(reduced)[1:] == ["question 2", "answer 2 " + "words " * 20]
+
+
+async def test_the_history_itself_is_not_changed():
+    chat_history = history(5)
+
+    await TokenBudgetHistoryReducer(max_turns=1, token_budget=4000, summarize=False).reduce(chat_history, None, "guide")
+
+    assert len(chat_history.messages) == 11
+
+
+async def test_left_out_turns_are_summarized():
+    summarizer = FakeSummarizer()
+
+    reduced = await TokenBudgetHistoryReducer(max_turns=1, token_budget=4000, summarize=True).reduce(history(3), FakeKernel(summarizer), "guide")
+
+    assert contents(reduced)[1] == "Summary of the earlier conversation:\nsummary 1"
+    assert "question 0" in summarizer.transcripts[0] and "question 1" in summarizer.transcripts[0]
+    assert "question 2" not in summarizer.transcripts[0]
+
+
+async def test_summaries_are_cached_and_extended_incrementally():
+    summarizer = FakeSummarizer()
+    reducer = TokenBudgetHistoryReducer(max_turns=1, token_budget=4000, summarize=True)
+    kernel = FakeKernel(summarizer)
+
+    await reducer.reduce(history(3), kernel, "guide")
+    await reducer.reduce(history(3), kernel, "guide")
+    assert len(summarizer.transcripts) == 1
+
+    reduced = await reducer.reduce(history(4), kernel, "guide")
+
+    # Only the turn left out since is sent, on top of the previous summary
+    transcript = summarizer.transcripts[1]
+    assert transcript.startswith("Summary of the conversation before:\nsummary 1")
+    assert "question 2" in transcript and "question 1" not in transcript
+    assert contents(reduced)[1] == "Summary of the earlier conversation:\nsummary 2"
+
+
+async def test_failed_summaries_fall_back_to_leaving_the_turns_out():
+    kernel = FakeKernel(FakeSummarizer(error=RuntimeError("rate limited")))
+
+    reduced = await TokenBudgetHistoryReducer(max_turns=1, token_budget=4000, summarize=True).reduce(history(3), kernel, "guide")
+
+    assert contents(reduced)[1] == "question 2"
+
+
+@pytest.mark.parametrize("prefix_value, expected", [(None, 10), ("3", 3)])
+def test_settings_are_read_per_agent(monkeypatch, prefix_value, expected):
+    monkeypatch.delenv("HISTORY_MAX_TURNS", raising=False)
+    if prefix_value is None:
+        monkeypatch.delenv("GUIDE_HISTORY_MAX_TURNS", raising=False)
+    else:
+        monkeypatch.setenv("GUIDE_HISTORY_MAX_TURNS", prefix_value)
+
+    assert TokenBudgetHistoryReducer.from_env("GUIDE").max_turns == expected
@@ -0,0 +1,89 @@
+import time
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+
+from models.conversation_state import ConversationState, InMemoryConversationStateStore, estimate_state_size
+
+
+def state_with_text(id, text):
+    thread = ChatHistoryAgentThread()
+    thread._chat_history.add_user_message(text)
+    return ConversationState(id=id, threads={"culture_guru": thread})
+
+
+def test_least_recently_used_states_are_evicted_over_max_entries():
+    evicted = []
+    store = InMemoryConversationStateStore(max_entries=2, on_evict=lambda state, reason: evicted.append((state.id, reason)))
+    store.init_state("c1")
+    store.init_state("c2")
+    store.get_state("c1")
+
+    store.init_state("c3")
+
+    assert evicted == [("c2", "capacity")]
+    assert store.get_state("c2") is None
+    assert store.get_state("c1") is not None
+
+
+def test_states_are_evicted_over_max_bytes():
+    size = estimate_state_size(state_with_text("c1", "x" * 1000))
+    store = InMemoryConversationStateStore(max_entries=0, max_bytes=size * 2)
+    for id in ("c1", "c2", "c3"):
+        store.save_state(state_with_text(id, "x" * 1000))
+
+    assert [id for id in ("c1", "c2", "c3") if store.get_state(id) is not None] == ["c2", "c3"]
+    assert store.estimated_bytes == size * 2
+
+
+def test_the_most_recent_state_is_kept_even_over_the_budget():
+    store = InMemoryConversationStateStore(max_bytes=10)
+
+    store.save_state(state_with_text("c1", "x" * 1000))
+
+    assert store.get_state("c1") is not None
+
+
+def test_idle_states_expire(monkeypatch):
+    evicted = []
+    store = InMemoryConversationStateStore(idle_ttl_seconds=60, on_evict=lambda state, reason: evicted.append((state.id, reason)))
+    store.init_state("c1")
+    now = time.monotonic()
+    store.init_state("c2")
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+
+    store.init_state("c3")
+
+    assert ("c1", "expired") in evicted and ("c2", "expired") in evicted
+    assert store.estimated_bytes == estimate_state_size(store.get_state("c3"))
+
+
+def test_saving_a_grown_state_updates_its_size():
+    store = InMemoryConversationStateStore()
+    state = store.init_state("c1")
+    empty = store.estimated_bytes
+
+    state.update_thread("culture_guru", state_with_text("c1", "x" * 1000).get_thread("culture_guru"))
+    store.save_state(state)
+
+    assert store.estimated_bytes == estimate_state_size(state) > empty
+
+
+def test_deleted_states_are_released():
+    released = []
+    store = InMemoryConversationStateStore(on_evict=lambda state, reason: released.append((state.id, reason)))
+    store.init_state("c1")
+
+    store.delete_state("c1")
+
+    assert released == [("c1", "deleted")]
+    assert store.estimated_bytes == 0
+
+
+def test_failing_eviction_hook_does_not_fail_the_save():
+    def fail(state, reason):
+        raise RuntimeError("boom")
+
+    store = InMemoryConversationStateStore(max_entries=1, on_evict=fail)
+    store.init_state("c1")
+
+    assert store.init_state("c2").id == "c2"
@@ -0,0 +1,113 @@
+import pytest
+
+from agents.azure_ai_agents.culinary_advisor_agent import CulinaryAdvisorAgent
+from agents.copilot_studio.explorer_guide_agent import ExplorerGuideAgent
+from agents.culture_guru_agent import CultureGuruAgent
+from utils.intent_classifier import DEFAULT_EXAMPLES_PATH, IntentClassifier
+
+AGENTS = {
+    "culture_guru": CultureGuruAgent,
+    "explorer_guide": ExplorerGuideAgent,
+    "culinary_advisor": CulinaryAdvisorAgent,
+}
+
+# Held-out questions, none of them is in the bundled examples
+IN_SCOPE = [
+    ("culture_guru", "Tell me about greetings and etiquette"),
+    ("culture_guru", "what is considered polite when meeting someone"),
+    ("culture_guru", "do I need to tip waiters"),
+    ("culture_guru", "what clothes are appropriate for visiting a shrine"),
+    ("culinary_advisor", "what should I eat"),
+    ("culinary_advisor", "good places for lunch"),
+    ("culinary_advisor", "recommend a restaurant for dinner"),
+    ("culinary_advisor", "where to find local food"),
+    ("explorer_guide", "what attractions should I visit"),
+    ("explorer_guide", "top sights to see"),
+    ("explorer_guide", "suggest an itinerary for two days"),
+    ("explorer_guide", "which museums to visit"),
+]
+OUT_OF_SCOPE = [
+    "what's the weather like",
+    "book me a flight",
+    "hello",
+    "how much does a hotel cost",
+    "tell me a joke",
+    "can you help me",
+    "what currency do they use",
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    classifier = IntentClassifier()
+    classifier.load_examples(DEFAULT_EXAMPLES_PATH)
+    for agent_id, agent in AGENTS.items():
+        classifier.add_description(agent_id, agent.what_can_i_do())
+    return classifier
+
+
+@pytest.mark.parametrize("expected, message", IN_SCOPE)
+def test_confident_predictions_pick_the_right_agent(classifier, expected, message):
+    prediction = classifier.classify(message, AGENTS)
+
+    assert prediction.agent_id == expected or not prediction.is_confident
+
+
+def test_most_clear_questions_are_routed_locally(classifier):
+    confident = [message for _, message in IN_SCOPE if classifier.classify(message, AGENTS).is_confident]
+
+    assert len(confident) >= len(IN_SCOPE) // 2
+
+
+@pytest.mark.parametrize("message", OUT_OF_SCOPE)
+def test_out_of_scope_questions_are_left_to_the_llm(classifier, message):
+    assert not classifier.classify(message, AGENTS).is_confident
+
+
+def test_only_candidate_agents_are_scored(classifier):
+    prediction = classifier.classify("recommend a restaurant for dinner", ["culture_guru", "explorer_guide"])
+
+    assert prediction.agent_id != "culinary_advisor"
+
+
+def test_descriptions_alone_do_not_clear_the_default_thresholds():
+    classifier = IntentClassifier()
+    for agent_id, agent in AGENTS.items():
+        classifier.add_description(agent_id, agent.what_can_i_do())
+
+    assert not classifier.classify("Tell me about greetings and etiquette in Kyoto", AGENTS).is_confident
+    assert not classifier.classify("what should I eat in Tokyo", AGENTS).is_confident
+
+
+def test_margin_of_one_disables_local_routing(classifier):
+    disabled = IntentClassifier(margin=1.0)
+    disabled.load_examples(DEFAULT_EXAMPLES_PATH)
+
+    assert not disabled.enabled
+    assert not disabled.classify("recommend a restaurant for dinner", AGENTS).is_confident
+
+
+@pytest.mark.parametrize("message, known_place, expected", [
+    ("Tell me about greetings and etiquette in Kyoto", None, True),
+    ("what should I eat in Tokyo", "Kyoto", True),
+    ("what should I eat in tokyo", "Kyoto", True),
+    ("I'm going to Paris. What should I see?", "Kyoto", True),
+    ("what should I eat in Kyoto", "Kyoto", False),
+    ("What should I see? I'm in New York", "New York", False),
+    ("Where can I find good restaurants?", "Kyoto", False),
+    ("Which museums are worth visiting in the old town?", "Paris", False),
+    ("any etiquette for visiting temples", "Rome", False),
+])
+def test_names_place(classifier, message, known_place, expected):
+    assert classifier.names_place(message, known_place) is expected
+
+
+def test_llm_agreement_is_tracked(classifier):
+    classifier = IntentClassifier()
+    classifier.load_examples(DEFAULT_EXAMPLES_PATH)
+    prediction = classifier.classify("what attractions should I visit", AGENTS)
+
+    classifier.record_llm_decision(prediction, "explorer_guide")
+    classifier.record_llm_decision(prediction, "culture_guru")
+
+    assert classifier.stats() == {"agreements": 1, "disagreements": 1, "agreement_rate": 0.5}
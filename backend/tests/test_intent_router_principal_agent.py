@@ -0,0 +1,202 @@
+import json
+
+import pytest
+from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
+
+import agents.intent_router_principal_agent as router_module
+from agents.culture_guru_agent import CultureGuruAgent
+from agents.azure_ai_agents.culinary_advisor_agent import CulinaryAdvisorAgent
+from models.agent_request import Message
+from models.conversation_state import AsyncConversationStateStoreAdapter, InMemoryConversationStateStore
+from utils.intent_classifier import DEFAULT_EXAMPLES_PATH, IntentClassifier
+from utils.routing_cache import RoutingCache
+
+ROUTER_NAME = "intent_router_principal_agent"
+
+
+class FakeSpecialist:
+    def __init__(self, name):
+        self.name = name
+
+    async def invoke(self, messages, thread=None, **kwargs):
+        thread = thread or ChatHistoryAgentThread()
+        await thread.on_new_message(messages)
+        answer = ChatMessageContent(role="assistant", content=f"{self.name} answer " * 50, name=self.name)
+        await thread.on_new_message(answer)
+        yield AgentResponseItem(message=answer, thread=thread)
+
+
+class FakeRouterLLM:
+    """Replaces the router's LLM call, replying with the queued outputs in order."""
+
+    def __init__(self):
+        self.outputs = []
+        self.calls = 0
+
+    def reply(self, agent_id, city=None, your_response=""):
+        self.outputs.append(json.dumps({
+            "agent_id": agent_id, "confidence_score": 0.9, "your_response": your_response, "destination_city": city,
+        }))
+
+    async def invoke(self, agent, messages=None, thread=None, **kwargs):
+        self.calls += 1
+        thread = thread or ChatHistoryAgentThread()
+        if messages is not None:
+            await thread.on_new_message(messages)
+        output = ChatMessageContent(role="assistant", content=self.outputs.pop(0), name=agent.name)
+        await thread.on_new_message(output)
+        yield AgentResponseItem(message=output, thread=thread)
+
+
+@pytest.fixture
+def llm(monkeypatch, azure_openai_env, agent_registry):
+    agent_registry.add_agent("culture_guru", lambda: FakeSpecialist("culture_guru"), CultureGuruAgent.what_can_i_do(), "SK")
+    agent_registry.add_agent("culinary_advisor", lambda: FakeSpecialist("culinary_advisor"), CulinaryAdvisorAgent.what_can_i_do(), "AZ")
+
+    classifier = IntentClassifier()
+    classifier.load_examples(DEFAULT_EXAMPLES_PATH)
+    monkeypatch.setattr(router_module, "intent_classifier", classifier)
+    monkeypatch.setattr(router_module, "routing_cache", RoutingCache())
+    monkeypatch.setattr(router_module, "SPECULATIVE_DISPATCH", False)
+
+    llm = FakeRouterLLM()
+
+    async def invoke(agent, *, messages=None, thread=None, **kwargs):
+        async for response in llm.invoke(agent, messages=messages, thread=thread, **kwargs):
+            yield response
+
+    monkeypatch.setattr(router_module.IntentRouterPrincipalAgent, "invoke", invoke)
+    return llm
+
+
+@pytest.fixture
+def store():
+    return AsyncConversationStateStoreAdapter(InMemoryConversationStateStore())
+
+
+async def turn(store, content, conversation_id="c1"):
+    router = router_module.IntentRouterPrincipalAgent(
+        name=ROUTER_NAME,
+        description="router",
+        agent_list=["culture_guru", "culinary_advisor"],
+        conversation_store=store,
+        conversation_state=await store.init_state(id=conversation_id),
+    )
+    responses = [response async for response in router.execute(Message(content=content, role="user", id=content))]
+    return router, responses[-1]
+
+
+async def test_first_turn_naming_a_city_goes_to_the_llm(llm, store):
+    llm.reply("culture_guru", city="Kyoto")
+
+    router, response = await turn(store, "Tell me about greetings and etiquette in Kyoto")
+
+    assert llm.calls == 1
+    assert router.state.destination_city == "Kyoto"
+    assert response.name == "culture_guru"
+
+
+async def test_clear_question_with_a_known_city_is_routed_locally(llm, store):
+    llm.reply("culture_guru", city="Kyoto")
+    await turn(store, "Tell me about greetings and etiquette in Kyoto")
+
+    router, response = await turn(store, "recommend a restaurant for dinner")
+
+    assert llm.calls == 1
+    assert response.name == "culinary_advisor"
+    assert router.routing_decision["destination_city"] == "Kyoto"
+
+
+async def test_question_naming_another_city_goes_to_the_llm(llm, store):
+    llm.reply("culture_guru", city="Kyoto")
+    await turn(store, "Tell me about greetings and etiquette in Kyoto")
+    llm.reply("culinary_advisor", city="Tokyo")
+
+    router, _ = await turn(store, "what should I eat in Tokyo")
+
+    assert llm.calls == 2
+    assert router.state.destination_city == "Tokyo"
+
+
+async def test_clarifying_question_is_returned_without_a_city(llm, store):
+    llm.reply(None, your_response="Which city are you visiting?")
+
+    router, response = await turn(store, "recommend a restaurant for dinner")
+
+    assert llm.calls == 1
+    assert response.content.content == "Which city are you visiting?"
+    assert router.state.destination_city is None
+
+
+class FakeChatSpecialist(ChatCompletionAgent):
+    """Chat history based specialist, so that it can be invoked speculatively."""
+
+    async def invoke(self, messages=None, thread=None, **kwargs):
+        thread = thread or ChatHistoryAgentThread()
+        await thread.on_new_message(messages)
+        answer = ChatMessageContent(role="assistant", content=f"{self.name} answer", name=self.name)
+        await thread.on_new_message(answer)
+        yield AgentResponseItem(message=answer, thread=thread)
+
+
+@pytest.fixture
+def streaming_llm(llm, monkeypatch, agent_registry):
+    agent_registry.add_agent("culture_guru", lambda: FakeChatSpecialist(name="culture_guru"), CultureGuruAgent.what_can_i_do(), "SK")
+    agent_registry.add_agent("culinary_advisor", lambda: FakeChatSpecialist(name="culinary_advisor"), CulinaryAdvisorAgent.what_can_i_do(), "AZ")
+    monkeypatch.setattr(router_module, "SPECULATIVE_DISPATCH", True)
+
+    async def invoke_stream(agent, *, messages=None, thread=None, **kwargs):
+        llm.calls += 1
+        thread = thread or ChatHistoryAgentThread()
+        await thread.on_new_message(messages)
+        output = llm.outputs.pop(0)
+        for start in range(0, len(output), 8):
+            chunk = StreamingChatMessageContent(role="assistant", content=output[start:start + 8], name=agent.name, choice_index=0)
+            yield AgentResponseItem(message=chunk, thread=thread)
+
+    monkeypatch.setattr(router_module.IntentRouterPrincipalAgent, "invoke_stream", invoke_stream)
+    return llm
+
+
+async def test_confirmed_speculation_answers_once(streaming_llm, store):
+    streaming_llm.reply("culture_guru", city=None)
+
+    router, response = await turn(store, "hi, any etiquette tips?")
+
+    assert response.content.content == "culture_guru answer"
+    state = await store.get_state(id="c1")
+    assert [message.content for message in state.get_thread(id="culture_guru")._chat_history.messages] == [
+        "hi, any etiquette tips?", "culture_guru answer",
+    ]
+
+
+async def test_speculation_for_another_city_is_discarded(streaming_llm, store):
+    streaming_llm.reply("culture_guru", city="Kyoto")
+
+    router, response = await turn(store, "etiquette tips for Kyoto")
+
+    # The speculative invocation did not know the city, the agent is invoked again with it
+    state = await store.get_state(id="c1")
+    assert [message.content for message in state.get_thread(id="culture_guru")._chat_history.messages] == [
+        "etiquette tips for Kyoto", "culture_guru answer",
+    ]
+    assert router.state.destination_city == "Kyoto"
+
+
+async def test_router_thread_keeps_digests_without_the_agent_answers(llm, store):
+    llm.reply("culture_guru", city="Kyoto")
+    await turn(store, "Tell me about greetings and etiquette in Kyoto")
+    await turn(store, "recommend a restaurant for dinner")
+
+    state = await store.get_state(id="c1")
+    router_messages = state.get_thread(id=ROUTER_NAME)._chat_history.messages
+    assert [message.content for message in router_messages if message.role.value == "user"] == [
+        "Tell me about greetings and etiquette in Kyoto", "recommend a restaurant for dinner",
+    ]
+    assert [json.loads(message.content)["agent_id"] for message in router_messages if message.role.value == "assistant"] == [
+        "culture_guru", "culinary_advisor",
+    ]
+    assert not any("answer" in message.content for message in router_messages)
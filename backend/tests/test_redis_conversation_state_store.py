@@ -0,0 +1,92 @@
+import fakeredis
+import pytest
+from semantic_kernel.agents import ChatHistoryAgentThread
+
+from models.redis_conversation_state_store import COMPRESSED_MARKER, PLAIN_MARKER, RedisConversationStateStore
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def store(client):
+    return RedisConversationStateStore(client=client, key_prefix="test", ttl_seconds=60, compress_threshold=1000)
+
+
+def add_turn(state, agent, question, answer):
+    thread = state.get_thread(agent) or ChatHistoryAgentThread()
+    thread._chat_history.add_user_message(question)
+    thread._chat_history.add_assistant_message(answer)
+    state.update_thread(agent, thread)
+
+
+def test_states_round_trip(store):
+    state = store.init_state("c1")
+    add_turn(state, "culture_guru", "Etiquette?", "Bow.")
+    state.destination_city = "Kyoto"
+    store.save_state(state)
+
+    restored = RedisConversationStateStore(client=store.client, key_prefix="test").get_state("c1")
+
+    assert restored.version == 2
+    assert restored.destination_city == "Kyoto"
+    assert [message.content for message in restored.get_thread("culture_guru")._chat_history.messages] == ["Etiquette?", "Bow."]
+
+
+def test_each_thread_is_a_field_and_large_ones_are_compressed(store, client):
+    state = store.init_state("c1")
+    add_turn(state, "culture_guru", "Etiquette?", "Bow.")
+    add_turn(state, "culinary_advisor", "Dinner?", "Kaiseki. " * 200)
+    store.save_state(state)
+
+    fields = client.hgetall("test:c1")
+    assert set(fields) == {b"version", b"attributes", b"thread:culture_guru", b"thread:culinary_advisor"}
+    assert fields[b"thread:culture_guru"][:1] == PLAIN_MARKER
+    assert fields[b"thread:culinary_advisor"][:1] == COMPRESSED_MARKER
+
+
+def test_only_changed_fields_are_written(store, client):
+    state = store.init_state("c1")
+    add_turn(state, "culture_guru", "Etiquette?", "Bow.")
+    add_turn(state, "culinary_advisor", "Dinner?", "Kaiseki.")
+    store.save_state(state)
+    # Marks the field, a rewrite would replace the marker
+    marker = PLAIN_MARKER + b'{"kind":"chat_history","id":"untouched","chat_history":{"messages":[]}}'
+    client.hset("test:c1", "thread:culinary_advisor", marker)
+
+    add_turn(state, "culture_guru", "Gifts?", "Wrap them.")
+    store.save_state(state)
+
+    assert client.hget("test:c1", "thread:culinary_advisor") == marker
+    assert len(store.get_state("c1").get_thread("culture_guru")._chat_history.messages) == 4
+
+
+def test_removed_threads_are_deleted(store, client):
+    state = store.init_state("c1")
+    add_turn(state, "culture_guru", "Etiquette?", "Bow.")
+    store.save_state(state)
+
+    del state.threads["culture_guru"]
+    store.save_state(state)
+
+    assert not client.hexists("test:c1", "thread:culture_guru")
+
+
+def test_reads_and_writes_refresh_the_expiry(store, client):
+    store.init_state("c1")
+    client.expire("test:c1", 5)
+
+    store.get_state("c1")
+
+    assert 55 <= client.ttl("test:c1") <= 60
+
+
+def test_delete_removes_the_key(store, client):
+    store.init_state("c1")
+
+    store.delete_state("c1")
+
+    assert store.get_state("c1") is None
+    assert not client.exists("test:c1")
@@ -0,0 +1,128 @@
+from azure.ai.projects.models import MessageTextContent, MessageTextDetails, OpenAIPageableListOfThreadMessage, ThreadMessage
+from semantic_kernel.agents import AzureAIAgentThread, ChatHistoryAgentThread
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+from utils.response_parser import extract_history
+
+
+def chat_thread(count):
+    thread = ChatHistoryAgentThread()
+    for index in range(count):
+        role = "user" if index % 2 == 0 else "assistant"
+        thread._chat_history.add_message(ChatMessageContent(role=role, content=f"message {index}", metadata={"id": f"m{index}"}))
+    return thread
+
+
+def contents(history):
+    return [message.content for message in history]
+
+
+async def test_chat_history_without_a_cursor_is_returned_whole():
+    history, cursor = await extract_history(chat_thread(3))
+
+    assert contents(history) == ["message 0", "message 1", "message 2"]
+    assert cursor == "m2"
+
+
+async def test_chat_history_after_the_cursor():
+    thread = chat_thread(2)
+    _, cursor = await extract_history(thread)
+    thread._chat_history.add_message(ChatMessageContent(role="user", content="message 2", metadata={"id": "m2"}))
+    thread._chat_history.add_message(ChatMessageContent(role="assistant", content="message 3", name="culture_guru"))
+
+    history, next_cursor = await extract_history(thread, history_cursor=cursor)
+
+    assert contents(history) == ["message 2", "message 3"]
+    assert history[1].agent_id == "culture_guru"
+    # The last message has no id, the cursor is the last message that has one
+    assert next_cursor == "m2"
+
+
+async def test_unknown_cursor_returns_the_whole_history():
+    history, _ = await extract_history(chat_thread(2), history_cursor="gone")
+
+    assert contents(history) == ["message 0", "message 1"]
+
+
+async def test_other_threads_have_no_history():
+    assert await extract_history(None, history_cursor="m1") == ([], "m1")
+
+
+def thread_message(id, role, text=None, agent_id=""):
+    content = [MessageTextContent(text=MessageTextDetails(value=text, annotations=[]))] if text is not None else []
+    return ThreadMessage(
+        id=id, thread_id="t1", role=role, content=content, agent_id=agent_id, created_at=0, status="completed",
+        incomplete_details=None, completed_at=None, incomplete_at=None, run_id=None, attachments=[], metadata={},
+    )
+
+
+class FakeAgentsClient:
+    """Azure AI Agent service listing the messages of a thread two per page."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.agent_lookups = []
+        self.listed_after = []
+
+    async def list_messages(self, thread_id, run_id=None, limit=None, order="desc", after=None, before=None):
+        self.listed_after.append(after)
+        messages = self.messages if order == "asc" else list(reversed(self.messages))
+        start = next((index + 1 for index, message in enumerate(messages) if message.id == after), 0)
+        page = messages[start:start + 2]
+        return OpenAIPageableListOfThreadMessage(
+            data=page, first_id=page[0].id if page else None, last_id=page[-1].id if page else None, has_more=start + 2 < len(messages),
+        )
+
+    async def get_agent(self, agent_id):
+        self.agent_lookups.append(agent_id)
+
+        class Agent:
+            id = agent_id
+            name = "culinary_advisor"
+
+        return Agent()
+
+
+class FakeProjectClient:
+    def __init__(self, messages):
+        self.agents = FakeAgentsClient(messages)
+
+
+async def test_azure_ai_history_resolves_names_and_skips_empty_messages():
+    client = FakeProjectClient([
+        thread_message("msg1", "user", "Where to eat in Kyoto?"),
+        thread_message("msg2", "assistant", None, agent_id="asst_1"),
+        thread_message("msg3", "assistant", "Try kaiseki.", agent_id="asst_1"),
+    ])
+    thread = AzureAIAgentThread(client=client, thread_id="t1")
+
+    history, cursor = await extract_history(thread)
+
+    assert contents(history) == ["Where to eat in Kyoto?", "Try kaiseki."]
+    assert history[1].agent_id == "culinary_advisor"
+    assert client.agents.agent_lookups == ["asst_1"]
+    assert cursor == "msg3"
+
+
+async def test_azure_ai_history_after_the_cursor():
+    client = FakeProjectClient([thread_message("msg1", "user", "Where to eat?"), thread_message("msg2", "assistant", "Kaiseki.", agent_id="asst_1")])
+    thread = AzureAIAgentThread(client=client, thread_id="t1")
+    _, cursor = await extract_history(thread)
+    client.agents.messages += [thread_message("msg3", "user", "And lunch?"), thread_message("msg4", "assistant", "Ramen.", agent_id="asst_1")]
+    client.agents.listed_after = []
+
+    history, next_cursor = await extract_history(thread, history_cursor=cursor)
+
+    assert contents(history) == ["And lunch?", "Ramen."]
+    assert history[1].agent_id == "culinary_advisor"
+    assert next_cursor == "msg4"
+    # Only the messages after the cursor are fetched, the agent name is resolved once per thread
+    assert client.agents.listed_after == ["msg2"]
+    assert client.agents.agent_lookups == ["asst_1"]
+
+
+async def test_azure_ai_history_without_new_messages_keeps_the_cursor():
+    client = FakeProjectClient([thread_message("msg1", "user", "Where to eat?")])
+    thread = AzureAIAgentThread(client=client, thread_id="t1")
+
+    assert await extract_history(thread, history_cursor="msg1") == ([], "msg1")
@@ -0,0 +1,56 @@
+import json
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+from utils.router_context import RouterContextBuilder
+
+DECISION = {"agent_id": "culture_guru", "confidence_score": 0.9, "your_response": "Sure!", "destination_city": "Kyoto"}
+
+
+def message(content):
+    return ChatMessageContent(role="user", content=content)
+
+
+def test_digest_keeps_the_intent_and_the_decision():
+    intent, decision = RouterContextBuilder(max_intent_chars=20).digest(
+        message("  Tell me about\n greetings   and bowing etiquette in Kyoto"), DECISION, "router",
+    )
+
+    assert intent.content == "Tell me about greeti..."
+    assert json.loads(decision.content) == {**DECISION, "your_response": ""}
+    assert decision.name == "router"
+
+
+def test_router_response_is_kept_when_no_agent_was_picked():
+    _, decision = RouterContextBuilder(max_response_chars=10).digest(
+        message("dinner?"), {"agent_id": None, "confidence_score": 0.2, "your_response": "Which city are you visiting?"}, "router",
+    )
+
+    assert json.loads(decision.content)["your_response"] == "Which city"
+
+
+def test_record_turn_replaces_the_messages_of_the_turn():
+    builder = RouterContextBuilder()
+    thread = builder.record_turn(None, 0, message("etiquette in Kyoto?"), DECISION, "router")
+    start = builder.turn_start(thread)
+    # Raw router output and a retry prompt added during the turn
+    thread._chat_history.add_user_message("dinner?")
+    thread._chat_history.add_assistant_message("not json")
+    thread._chat_history.add_user_message("Reply with the JSON format.")
+    thread._chat_history.add_assistant_message(json.dumps(DECISION))
+
+    builder.record_turn(thread, start, message("dinner?"), {**DECISION, "agent_id": "culinary_advisor"}, "router")
+
+    messages = thread._chat_history.messages
+    assert [item.content for item in messages if item.role.value == "user"] == ["etiquette in Kyoto?", "dinner?"]
+    assert len(messages) == 4
+
+
+def test_only_the_last_max_turns_are_kept():
+    builder = RouterContextBuilder(max_turns=2)
+    thread = ChatHistoryAgentThread()
+    for index in range(4):
+        builder.record_turn(thread, builder.turn_start(thread), message(f"question {index}"), DECISION, "router")
+
+    assert [item.content for item in thread._chat_history.messages if item.role.value == "user"] == ["question 2", "question 3"]
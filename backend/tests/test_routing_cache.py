@@ -0,0 +1,84 @@
+import pytest
+
+from utils import routing_cache as routing_cache_module
+from utils.routing_cache import RoutingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(routing_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def decision(agent_id="culture_guru", confidence=0.95, city="Kyoto"):
+    return {"agent_id": agent_id, "confidence_score": confidence, "destination_city": city, "your_response": ""}
+
+
+def test_key_normalizes_message_and_agent_order():
+    assert RoutingCache.make_key("Tips for  Kyoto?!", ["b", "a", "a"], " Kyoto ") == RoutingCache.make_key(
+        "tips for kyoto", ["a", "b"], "kyoto"
+    )
+
+
+def test_key_depends_on_the_known_destination():
+    assert RoutingCache.make_key("what to eat", ["a"], "Kyoto") != RoutingCache.make_key("what to eat", ["a"], None)
+
+
+def test_get_returns_a_copy_of_the_stored_decision(clock):
+    cache = RoutingCache(max_entries=10, ttl_seconds=60, min_confidence=0.85)
+    key = RoutingCache.make_key("tips", ["culture_guru"], None)
+
+    assert cache.put(key, decision())
+    cached = cache.get(key)
+    cached["agent_id"] = "changed"
+
+    assert cache.get(key) == {"agent_id": "culture_guru", "confidence_score": 0.95, "destination_city": "Kyoto"}
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 0}
+
+
+@pytest.mark.parametrize("agent_info", [
+    decision(confidence=0.5),
+    decision(confidence="not a number"),
+    decision(agent_id=None),
+])
+def test_put_skips_unconfident_or_agentless_decisions(agent_info):
+    cache = RoutingCache(max_entries=10, ttl_seconds=60, min_confidence=0.85)
+    key = RoutingCache.make_key("tips", ["culture_guru"], None)
+
+    assert not cache.put(key, agent_info)
+    assert cache.get(key) is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = RoutingCache(max_entries=10, ttl_seconds=60, min_confidence=0.85)
+    key = RoutingCache.make_key("tips", ["culture_guru"], None)
+    cache.put(key, decision())
+
+    clock[0] += 59
+    assert cache.get(key) is not None
+    clock[0] += 2
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = RoutingCache(max_entries=2, ttl_seconds=60, min_confidence=0.85)
+    first, second, third = (RoutingCache.make_key(message, ["a"], None) for message in ("one", "two", "three"))
+    cache.put(first, decision())
+    cache.put(second, decision())
+    cache.get(first)
+
+    cache.put(third, decision())
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RoutingCache(max_entries=0, ttl_seconds=60, min_confidence=0.85)
+    key = RoutingCache.make_key("tips", ["a"], None)
+
+    assert not cache.put(key, decision())
+    assert cache.get(key) is None
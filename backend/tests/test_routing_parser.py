@@ -0,0 +1,70 @@
+import pytest
+
+from models.routing_decision import RoutingDecision
+from utils.routing_parser import extract_json_object, parse_partial_routing_decision, parse_routing_decision
+
+AGENTS = ["culture_guru", "culinary_advisor"]
+DECISION = {"agent_id": "culture_guru", "confidence_score": 0.9, "your_response": "Etiquette in Kyoto?", "destination_city": "Kyoto"}
+
+
+@pytest.mark.parametrize("text", [
+    '{"agent_id": "culture_guru", "confidence_score": 0.9, "your_response": "Etiquette in Kyoto?", "destination_city": "Kyoto"}',
+    '```json\n{"agent_id": "culture_guru", "confidence_score": 0.9, "your_response": "Etiquette in Kyoto?", "destination_city": "Kyoto"}\n```',
+    'Here is the routing decision: {"agent_id": "culture_guru", "confidence_score": 0.9, "your_response": "Etiquette in Kyoto?", "destination_city": "Kyoto"} Thanks!',
+    '{"agent_id": "culture_guru", "confidence_score": 0.9, "your_response": "Etiquette in Kyoto?", "destination_city": "Kyoto",}',
+    "{'agent_id': 'culture_guru', 'confidence_score': 0.9, 'your_response': 'Etiquette in Kyoto?', 'destination_city': 'Kyoto'}",
+])
+def test_formats_are_repaired(text):
+    assert parse_routing_decision(text, AGENTS) == DECISION
+
+
+def test_python_and_json_literals_are_mixed():
+    text = "{'agent_id': null, 'confidence_score': 0.0, 'your_response': 'Which city?', 'destination_city': None}"
+
+    assert parse_routing_decision(text, AGENTS) == {
+        "agent_id": None, "confidence_score": 0.0, "your_response": "Which city?", "destination_city": None,
+    }
+
+
+@pytest.mark.parametrize("agent_id", ["", "null", "None", "Unknown"])
+def test_placeholder_agent_ids_mean_no_agent(agent_id):
+    decision = parse_routing_decision(f'{{"agent_id": "{agent_id}", "confidence_score": 0.3}}', AGENTS)
+
+    assert decision["agent_id"] is None
+    assert decision["your_response"] == ""
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "I think the culture guru should answer this.",
+    '{"confidence_score": 0.9}',
+    '{"agent_id": "weather_bot", "confidence_score": 0.9}',
+    '{"agent_id": "culture_guru", "confidence_score": "high"}',
+    '{"agent_id": "culture_guru", "confidence_score": 0.9',
+])
+def test_unusable_outputs_are_rejected(text):
+    assert parse_routing_decision(text, AGENTS) is None
+
+
+def test_braces_inside_strings_do_not_end_the_object():
+    text = 'prefix {"your_response": "use {curly} braces", "agent_id": "culture_guru"} suffix {"other": 1}'
+
+    assert extract_json_object(text) == '{"your_response": "use {curly} braces", "agent_id": "culture_guru"}'
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"agent_id": "culture_guru", "confidence_score": 0.9', None),
+    ('{"agent_id": "culture_guru", "confidence_score": 0.95,', {"agent_id": "culture_guru", "confidence_score": 0.95}),
+    ('{"confidence_score": 0.8,\n "agent_id": "cul', None),
+    ('{"agent_id": null, "confidence_score": 0.2,', {"agent_id": None, "confidence_score": 0.2}),
+    ("{'agent_id': 'culinary_advisor', 'confidence_score': 1}", {"agent_id": "culinary_advisor", "confidence_score": 1.0}),
+])
+def test_partial_decisions_need_both_fields_complete(text, expected):
+    assert parse_partial_routing_decision(text) == expected
+
+
+def test_response_format_constrains_the_agent_ids():
+    schema = RoutingDecision.response_format(AGENTS)["json_schema"]["schema"]
+
+    assert schema["properties"]["agent_id"]["anyOf"][0]["enum"] == AGENTS
+    assert set(schema["required"]) == set(RoutingDecision.model_fields)
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentThread
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+from utils.speculative_dispatch import SpeculationNotSupported, SpeculativeDispatch, fork_chat_history_thread
+
+
+async def responses(*items, delay=0.0, error=None):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+    if error is not None:
+        raise error
+
+
+@pytest.mark.parametrize("agent_id, city, expected", [
+    ("culture_guru", "Kyoto", True),
+    ("culinary_advisor", "Kyoto", False),
+    ("culture_guru", "Tokyo", False),
+    ("culture_guru", None, False),
+])
+async def test_matches_needs_the_same_agent_and_city(agent_id, city, expected):
+    speculation = SpeculativeDispatch("culture_guru", "Kyoto", responses())
+
+    assert speculation.matches(agent_id, city) is expected
+    speculation.cancel()
+
+
+async def test_results_replay_buffered_responses_in_order():
+    speculation = SpeculativeDispatch("culture_guru", None, responses(1, 2, 3))
+    await asyncio.sleep(0.01)
+
+    assert [item async for item in speculation.results()] == [1, 2, 3]
+    assert speculation.done
+
+
+async def test_errors_are_raised_from_results():
+    speculation = SpeculativeDispatch("culture_guru", None, responses(1, error=SpeculationNotSupported()))
+
+    received = []
+    with pytest.raises(SpeculationNotSupported):
+        async for item in speculation.results():
+            received.append(item)
+    assert received == [1]
+
+
+async def test_cancel_stops_the_invocation():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+            yield "late"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    speculation = SpeculativeDispatch("culture_guru", None, slow())
+    await started.wait()
+    speculation.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+def test_fork_copies_the_messages():
+    thread = ChatHistoryAgentThread(thread_id="t1")
+    thread._chat_history.add_user_message("hello")
+
+    fork = fork_chat_history_thread(thread)
+    fork._chat_history.add_assistant_message("discarded")
+
+    assert fork.id == "t1"
+    assert len(thread._chat_history.messages) == 1
+    assert fork_chat_history_thread(None) is None
+
+
+def test_remote_threads_can_not_be_forked():
+    class RemoteThread(AgentThread):
+        async def _create(self):
+            return "remote"
+
+        async def _delete(self):
+            pass
+
+        async def _on_new_message(self, new_message: ChatMessageContent):
+            pass
+
+    with pytest.raises(SpeculationNotSupported):
+        fork_chat_history_thread(RemoteThread())
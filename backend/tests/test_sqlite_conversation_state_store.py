@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+from semantic_kernel.agents import ChatHistoryAgentThread
+
+from models.sqlite_conversation_state_store import SQLiteConversationStateStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "conversations.db")
+
+
+@pytest.fixture
+def store(path):
+    store = SQLiteConversationStateStore(path=path, flush_interval_seconds=0.01)
+    yield store
+    store.close()
+
+
+def add_turn(state, agent, question, answer):
+    thread = state.get_thread(agent) or ChatHistoryAgentThread()
+    thread._chat_history.add_user_message(question)
+    thread._chat_history.add_assistant_message(answer)
+    state.update_thread(agent, thread)
+
+
+def stored_versions(path):
+    with sqlite3.connect(path) as connection:
+        return dict(connection.execute("SELECT id, version FROM conversations").fetchall())
+
+
+def test_states_are_persisted_across_instances(path):
+    store = SQLiteConversationStateStore(path=path)
+    state = store.init_state("c1")
+    add_turn(state, "culture_guru", "Etiquette?", "Bow.")
+    state.destination_city = "Kyoto"
+    store.save_state(state)
+    store.close()
+
+    reopened = SQLiteConversationStateStore(path=path)
+    restored = reopened.get_state("c1")
+    reopened.close()
+
+    assert restored.destination_city == "Kyoto"
+    assert [message.content for message in restored.get_thread("culture_guru")._chat_history.messages] == ["Etiquette?", "Bow."]
+
+
+def test_saves_are_written_together(path, store):
+    for id in ("c1", "c2", "c3"):
+        store.init_state(id)
+    store.close()
+
+    assert stored_versions(path) == {"c1": 1, "c2": 1, "c3": 1}
+
+
+def test_pending_states_are_read_from_memory(store):
+    state = store.init_state("c1")
+
+    assert store.get_state("c1") is state
+
+
+def test_cached_state_is_reloaded_when_another_worker_wrote_it(path, store):
+    state = store.init_state("c1")
+    store.close()
+    other = SQLiteConversationStateStore(path=path)
+    other_state = other.get_state("c1")
+    add_turn(other_state, "culture_guru", "Etiquette?", "Bow.")
+    other.save_state(other_state)
+    other.close()
+
+    reader = SQLiteConversationStateStore(path=path)
+    reader._cache(state)
+    reloaded = reader.get_state("c1")
+    reader.close()
+
+    assert reloaded is not state
+    assert reloaded.version == 2
+    assert reloaded.get_thread("culture_guru") is not None
+
+
+def test_deleted_states_are_removed(path, store):
+    store.init_state("c1")
+    store.delete_state("c1")
+
+    assert store.get_state("c1") is None
+    store.close()
+    assert stored_versions(path) == {}
+
+
+def test_cache_keeps_the_most_recent_states(path):
+    store = SQLiteConversationStateStore(path=path, cache_size=2)
+    states = [store.init_state(id) for id in ("c1", "c2", "c3")]
+
+    assert list(store._states) == ["c2", "c3"]
+    assert store.get_state("c3") is states[2]
+    assert store.get_state("c1").id == "c1"
+    store.close()
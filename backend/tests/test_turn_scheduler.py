@@ -0,0 +1,67 @@
+import pytest
+
+from agents.copilot_studio.base.turn_scheduler import TurnScheduler
+
+
+def make_scheduler(**options):
+    settings = {"initial_delay": 0.25, "max_delay": 2.0, "multiplier": 2.0, "jitter": 0.0, "deadline_seconds": 120, "settle_seconds": 2.0}
+    settings.update(options)
+    return TurnScheduler(**settings)
+
+
+def test_delays_back_off_up_to_the_maximum():
+    scheduler = make_scheduler()
+
+    assert [scheduler.next_delay() for _ in range(6)] == [0.25, 0.5, 1.0, 2.0, 2.0, 2.0]
+
+
+def test_jitter_stays_within_its_share_of_the_delay():
+    scheduler = make_scheduler(initial_delay=1.0, multiplier=1.0, jitter=0.2)
+
+    assert all(0.8 <= scheduler.next_delay() <= 1.2 for _ in range(100))
+
+
+def test_no_delay_goes_past_the_deadline():
+    scheduler = make_scheduler(initial_delay=5.0, deadline_seconds=1.0)
+
+    assert scheduler.next_delay() <= 1.0
+    assert not scheduler.expired
+
+
+def test_deadline_expires():
+    scheduler = make_scheduler(deadline_seconds=0)
+
+    assert scheduler.expired
+    assert scheduler.remaining == 0.0
+
+
+def test_settling_starts_with_the_first_bot_message():
+    scheduler = make_scheduler()
+    scheduler.record_activities([{"id": "1", "type": "message", "from": {"id": "user"}}])
+    assert scheduler.settle_remaining is None
+
+    scheduler.record_activities([{"id": "2", "type": "typing", "from": {"id": "bot"}}])
+    assert scheduler.settle_remaining is None
+    assert scheduler.first_activity_at is not None
+
+    scheduler.record_activities([{"id": "3", "type": "message", "from": {"id": "bot"}}])
+    assert 0 < scheduler.settle_remaining <= 2.0
+    assert scheduler.messages_received == 1
+
+
+def test_activities_already_received_are_skipped():
+    scheduler = make_scheduler()
+    first = [{"id": "1", "type": "message", "from": {"id": "bot"}}]
+
+    assert scheduler.record_activities(first) == first
+    assert scheduler.record_activities(first + [{"id": "2", "type": "message", "from": {"id": "bot"}}]) == [{"id": "2", "type": "message", "from": {"id": "bot"}}]
+    assert scheduler.messages_received == 2
+
+
+@pytest.mark.parametrize("reply_to_id, kept", [("user-2", True), (None, True), ("user-1", False)])
+def test_replies_to_an_earlier_turn_are_dropped(reply_to_id, kept):
+    scheduler = make_scheduler()
+    scheduler.reply_to_id = "user-2"
+    activity = {"id": "a", "type": "message", "replyToId": reply_to_id, "from": {"id": "bot"}}
+
+    assert scheduler.record_activities([activity]) == ([activity] if kept else [])
@@ -0,0 +1,43 @@
+from typing import AsyncIterable
+
+from semantic_kernel.agents import Agent
+from semantic_kernel.agents.agent import AgentResponseItem, AgentThread
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+
+async def invoke_agent(
+    agent: Agent,
+    messages: str | ChatMessageContent | None,
+    thread: AgentThread | None,
+    stream: bool = False,
+    **kwargs,
+) -> AsyncIterable[AgentResponseItem]:
+    """
+    Invoke the agent, streaming the response if requested and supported by the agent.
+
+    When streaming, the chunks are yielded as they arrive and followed by the complete
+    response, so that the last item is always a complete message with the updated thread.
+    """
+    if not stream or not getattr(agent, "supports_streaming", True):
+        async for response in agent.invoke(messages=messages, thread=thread, **kwargs):
+            if response:
+                yield response
+        return
+
+    message = None
+    last_chunk = None
+    async for chunk in agent.invoke_stream(messages=messages, thread=thread, **kwargs):
+        if not chunk:
+            continue
+        yield chunk
+        message = chunk.message if message is None else message + chunk.message
+        last_chunk = chunk
+
+    if last_chunk is not None:
+        complete_message = ChatMessageContent(
+            role=message.role,
+            items=message.items,
+            name=message.name or agent.name,
+            metadata=message.metadata,
+        )
+        yield AgentResponseItem(message=complete_message, thread=last_chunk.thread)
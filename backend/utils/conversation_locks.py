@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+lock_wait = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.conversation.lock_wait",
+    unit="ms",
+    description="Time a turn waited for the previous turn of the same conversation",
+)
+
+DEFAULT_LOCK_TIMEOUT_SECONDS = float(os.getenv("CONVERSATION_LOCK_TIMEOUT_SECONDS", 120))
+
+
+class ConversationLocks:
+    """
+    One asyncio lock per conversation, so that concurrent turns of the same conversation,
+    like a double click or a client retry, run one after the other while turns of
+    different conversations stay parallel.
+
+    A lock only exists while a turn holds it or waits for it. A turn that cannot take
+    the lock within timeout_seconds is rejected with a 409.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.timeout_seconds = timeout_seconds if timeout_seconds is not None else DEFAULT_LOCK_TIMEOUT_SECONDS
+        # Lock and number of turns holding or waiting for it, per conversation
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, conversation_id: Optional[str]) -> AsyncIterator[None]:
+        """
+        Hold the lock of the conversation until the context exits. Requests without a conversation are not locked.
+        """
+        if not conversation_id:
+            yield
+            return
+
+        lock, users = self._locks.get(conversation_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[conversation_id] = (lock, users + 1)
+        try:
+            started_at = time.monotonic()
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout=self.timeout_seconds)
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Another turn of conversation {conversation_id} is still in progress."
+                )
+            lock_wait.record((time.monotonic() - started_at) * 1000)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            lock, users = self._locks[conversation_id]
+            if users == 1:
+                del self._locks[conversation_id]
+            else:
+                self._locks[conversation_id] = (lock, users - 1)
@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+prompt_tokens = meter.create_histogram(
+    name=f"{METRIC_PREFIX}.history.prompt_tokens",
+    description="Estimated prompt tokens of an agent turn, before and after history reduction",
+)
+summaries_created = meter.create_counter(
+    name=f"{METRIC_PREFIX}.history.summaries",
+    description="Number of running summaries of older turns created with the LLM",
+)
+
+# Tokens added by the chat format for each message, on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+# Characters per token when no tokenizer is available
+CHARACTERS_PER_TOKEN = 4
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below between a traveler and a travel assistant. Keep the destination, "
+    "the preferences and the facts already given that later answers may rely on. Reply with the summary only."
+)
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of the text locally, with tiktoken if it is installed or an estimate otherwise."""
+    global _encoding, tiktoken
+    if not text:
+        return 0
+    if tiktoken is not None and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding(os.getenv("HISTORY_TOKEN_ENCODING", "o200k_base"))
+        except Exception:
+            logger.warning("Could not load the tiktoken encoding, estimating token counts instead")
+            tiktoken = None
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARACTERS_PER_TOKEN - 1) // CHARACTERS_PER_TOKEN
+
+
+def count_message_tokens(message: ChatMessageContent) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(message.content or "") + sum(
+        count_tokens(str(getattr(item, "arguments", None) or getattr(item, "result", None) or ""))
+        for item in message.items
+    )
+
+
+class TokenBudgetHistoryReducer:
+    """
+    Reduces the chat history sent to the LLM to the last max_turns turns that fit in
+    token_budget tokens. A turn starts with a user message, the instructions are always
+    kept and the latest turn is kept even when it is over the budget on its own.
+
+    With summarize enabled, the turns that are left out are folded into a running summary,
+    created with the chat completion service of the agent and sent as a system message. The
+    summaries are cached by the content of the turns they cover, so that the next turn only
+    summarizes the turns left out since, on top of the previous summary.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        summarize: Optional[bool] = None,
+        summary_max_tokens: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.max_turns = max_turns if max_turns is not None else int(os.getenv("HISTORY_MAX_TURNS", 10))
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("HISTORY_TOKEN_BUDGET", 4000))
+        self.summarize = summarize if summarize is not None else os.getenv("HISTORY_SUMMARIZE", "false").lower() == "true"
+        self.summary_max_tokens = summary_max_tokens if summary_max_tokens is not None else int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", 300))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", 1024))
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "TokenBudgetHistoryReducer":
+        """
+        Create the reducer of an agent, configured by the variables starting with the prefix,
+        like CULTURE_GURU_HISTORY_MAX_TURNS, or by the shared HISTORY_ variables.
+        """
+        def setting(name: str) -> Optional[str]:
+            return os.getenv(f"{prefix}_{name}")
+
+        return cls(
+            max_turns=int(setting("HISTORY_MAX_TURNS")) if setting("HISTORY_MAX_TURNS") else None,
+            token_budget=int(setting("HISTORY_TOKEN_BUDGET")) if setting("HISTORY_TOKEN_BUDGET") else None,
+            summarize=setting("HISTORY_SUMMARIZE").lower() == "true" if setting("HISTORY_SUMMARIZE") else None,
+        )
+
+    async def reduce(self, history: ChatHistory, kernel: Kernel, agent_name: str) -> ChatHistory:
+        """
+        Return the messages of the history to send to the LLM. The history itself is not changed.
+        """
+        instructions = [message for message in history.messages if message.role in (AuthorRole.SYSTEM, AuthorRole.DEVELOPER)]
+        conversation = [message for message in history.messages if message.role not in (AuthorRole.SYSTEM, AuthorRole.DEVELOPER)]
+        turns = self._split_turns(conversation)
+
+        instruction_tokens = sum(count_message_tokens(message) for message in instructions)
+        turn_tokens = [sum(count_message_tokens(message) for message in turn) for turn in turns]
+        tokens_before = instruction_tokens + sum(turn_tokens)
+
+        # Keep the latest turns that fit, always keeping the last one
+        budget = self.token_budget - instruction_tokens
+        kept = 0
+        kept_tokens = 0
+        while kept < len(turns) and (kept == 0 or (kept < self.max_turns and kept_tokens + turn_tokens[-kept - 1] <= budget)):
+            kept_tokens += turn_tokens[-kept - 1]
+            kept += 1
+
+        folded = [message for turn in turns[:len(turns) - kept] for message in turn]
+        messages = list(instructions)
+        if folded and self.summarize:
+            summary = await self._summary(folded, kernel)
+            if summary:
+                messages.append(ChatMessageContent(
+                    role=AuthorRole.SYSTEM,
+                    content=f"Summary of the earlier conversation:\n{summary}",
+                    name=agent_name,
+                ))
+        for turn in turns[len(turns) - kept:]:
+            messages.extend(turn)
+
+        reduced = ChatHistory(messages=messages)
+        tokens_after = sum(count_message_tokens(message) for message in messages)
+        prompt_tokens.record(tokens_before, {"agent": agent_name, "stage": "before"})
+        prompt_tokens.record(tokens_after, {"agent": agent_name, "stage": "after"})
+        if folded:
+            logger.debug("Reduced the history of %s from %s to %s tokens, leaving out %s messages", agent_name, tokens_before, tokens_after, len(folded))
+        return reduced
+
+    @staticmethod
+    def _split_turns(messages: List[ChatMessageContent]) -> List[List[ChatMessageContent]]:
+        turns: List[List[ChatMessageContent]] = []
+        for message in messages:
+            if message.role == AuthorRole.USER or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    async def _summary(self, folded: List[ChatMessageContent], kernel: Kernel) -> Optional[str]:
+        # Chain the hashes of the messages, so that the key of every prefix of the folded turns is known
+        keys = []
+        digest = hashlib.sha256()
+        for message in folded:
+            digest.update(f"{message.role}:{message.name}:{message.content}\n".encode())
+            keys.append(digest.copy().hexdigest())
+
+        if keys[-1] in self._summaries:
+            self._summaries.move_to_end(keys[-1])
+            return self._summaries[keys[-1]]
+
+        # Start from the summary of the longest prefix already summarized
+        start = 0
+        previous_summary = None
+        for index in range(len(keys) - 1, -1, -1):
+            if keys[index] in self._summaries:
+                start = index + 1
+                previous_summary = self._summaries[keys[index]]
+                break
+
+        transcript = "\n".join(f"{message.name or message.role.value}: {message.content}" for message in folded[start:] if message.content)
+        if previous_summary:
+            transcript = f"Summary of the conversation before:\n{previous_summary}\n\nConversation since:\n{transcript}"
+
+        try:
+            service = kernel.get_service(type=ChatCompletionClientBase)
+            settings = service.get_prompt_execution_settings_class()()
+            if hasattr(settings, "max_tokens"):
+                settings.max_tokens = self.summary_max_tokens
+            response = await service.get_chat_message_content(
+                ChatHistory(messages=[
+                    ChatMessageContent(role=AuthorRole.SYSTEM, content=SUMMARY_INSTRUCTIONS),
+                    ChatMessageContent(role=AuthorRole.USER, content=transcript),
+                ]),
+                settings,
+            )
+        except Exception:
+            logger.exception("Failed to summarize the earlier turns, they are left out instead")
+            return previous_summary
+
+        summary = response.content if response is not None else None
+        if summary:
+            summaries_created.add(1)
+            self._summaries[keys[-1]] = summary
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        return summary or previous_summary
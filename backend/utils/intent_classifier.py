@@ -0,0 +1,216 @@
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+local_decisions = meter.create_counter(
+    name=f"{METRIC_PREFIX}.intent_classifier.local_decisions",
+    description="Number of intent router turns routed by the local classifier without calling the LLM",
+)
+deferred_decisions = meter.create_counter(
+    name=f"{METRIC_PREFIX}.intent_classifier.deferred_decisions",
+    description="Number of intent router turns the local classifier handed to the LLM",
+)
+llm_agreements = meter.create_counter(
+    name=f"{METRIC_PREFIX}.intent_classifier.llm_agreement",
+    description="Number of deferred turns, by whether the LLM picked the classifier's best guess",
+)
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by can do for from have how i i'll i'm if in is it its me my
+    of on or our so that the their them then there these they this to up us was we what
+    when where which who why will with would you your
+""".split())
+
+SUFFIXES = ("ing", "ies", "es", "ed", "s")
+
+# Words after which a word the classifier does not know is likely a place name
+PLACE_PREPOSITIONS = frozenset("in to at for from around near visit visiting".split())
+
+# Labeled example messages of the bundled agents, used to calibrate the thresholds
+DEFAULT_EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "intent_examples.json")
+
+
+@dataclass
+class IntentPrediction:
+    """Best agent for a message together with how clearly it beat the runner-up."""
+
+    agent_id: Optional[str]
+    score: float
+    margin: float
+    is_confident: bool
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid intent classifier over hashed n-gram TF-IDF vectors.
+
+    Each agent is represented by the centroid of its capability description and any
+    labeled example messages. A message is routed locally only when the best agent
+    scores at least min_score and beats the runner-up by at least margin, everything
+    else is left to the LLM router. The default thresholds were calibrated on the
+    bundled examples and held-out travel questions, so that out-of-scope and ambiguous
+    messages are left to the LLM.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        margin: Optional[float] = None,
+        min_score: Optional[float] = None,
+    ):
+        self.n_features = n_features
+        self.margin = margin if margin is not None else float(os.getenv("INTENT_CLASSIFIER_MARGIN", 0.12))
+        self.min_score = min_score if min_score is not None else float(os.getenv("INTENT_CLASSIFIER_MIN_SCORE", 0.2))
+        self._documents: Dict[str, List[str]] = {}
+        self._described: set = set()
+        self._centroids: Dict[str, Dict[int, float]] = {}
+        self._idf: Dict[int, float] = {}
+        self.agreements = 0
+        self.disagreements = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.margin < 1.0
+
+    def add_documents(self, agent_id: str, documents: Iterable[str]) -> None:
+        """Add capability descriptions or labeled example messages for an agent."""
+        self._documents.setdefault(agent_id, []).extend(document for document in documents if document)
+        self._centroids.clear()
+
+    def load_examples(self, path: str) -> None:
+        """Load labeled examples from a JSON file mapping agent ids to lists of messages."""
+        with open(path) as examples_file:
+            examples = json.load(examples_file)
+        for agent_id, messages in examples.items():
+            self.add_documents(agent_id, messages)
+
+    def add_description(self, agent_id: str, description: str) -> None:
+        """Add the capability description of an agent, once."""
+        if agent_id not in self._described:
+            self._described.add(agent_id)
+            self.add_documents(agent_id, [description])
+
+    def classify(self, message: str, candidates: Iterable[str]) -> IntentPrediction:
+        """Score the message against the centroids of the candidate agents."""
+        if not self._centroids:
+            self._fit()
+
+        vector = self._tfidf(self._features(message))
+        scores = sorted(
+            ((self._dot(vector, self._centroids[agent_id]), agent_id)
+             for agent_id in set(candidates) if agent_id in self._centroids),
+            reverse=True,
+        )
+        if not scores or scores[0][0] <= 0.0:
+            deferred_decisions.add(1)
+            return IntentPrediction(agent_id=None, score=0.0, margin=0.0, is_confident=False)
+
+        best_score, best_agent = scores[0]
+        margin = best_score - scores[1][0] if len(scores) > 1 else best_score
+        is_confident = self.enabled and best_score >= self.min_score and margin >= self.margin
+
+        if is_confident:
+            local_decisions.add(1, {"agent": best_agent})
+        else:
+            deferred_decisions.add(1)
+        return IntentPrediction(agent_id=best_agent, score=best_score, margin=margin, is_confident=is_confident)
+
+    def names_place(self, message: str, known_place: Optional[str] = None) -> bool:
+        """
+        Whether the message seems to name a place other than known_place: a capitalized word
+        that does not start a sentence, or a word unknown to the classifier after a preposition like "in".
+        """
+        if not self._centroids:
+            self._fit()
+
+        known_words = set(re.findall(r"[a-z0-9']+", (known_place or "").lower()))
+        previous = None
+        for match in re.finditer(r"[A-Za-z][A-Za-z0-9'-]*", message):
+            word = match.group(0)
+            lowered = word.lower()
+            starts_sentence = not message[:match.start()].strip() or message[:match.start()].rstrip()[-1] in ".!?"
+            if lowered not in known_words and lowered not in STOP_WORDS:
+                if word[0].isupper() and not starts_sentence:
+                    return True
+                if previous in PLACE_PREPOSITIONS and not any(index in self._idf for index in self._features(lowered)):
+                    return True
+            previous = lowered
+        return False
+
+    def record_llm_decision(self, prediction: IntentPrediction, agent_id: Optional[str]) -> None:
+        """Track whether the LLM router agreed with the classifier's best guess."""
+        if prediction.agent_id is None:
+            return
+        agreed = prediction.agent_id == agent_id
+        if agreed:
+            self.agreements += 1
+        else:
+            self.disagreements += 1
+        llm_agreements.add(1, {"agreed": agreed})
+
+    def stats(self) -> Dict[str, float]:
+        compared = self.agreements + self.disagreements
+        return {
+            "agreements": self.agreements,
+            "disagreements": self.disagreements,
+            "agreement_rate": self.agreements / compared if compared else 0.0,
+        }
+
+    def _fit(self) -> None:
+        documents = {
+            agent_id: [self._features(text) for text in texts]
+            for agent_id, texts in self._documents.items()
+        }
+        document_count = sum(len(features) for features in documents.values())
+        document_frequency: Counter = Counter()
+        for features in documents.values():
+            for feature_counts in features:
+                document_frequency.update(feature_counts.keys())
+        self._idf = {
+            index: math.log((1 + document_count) / (1 + frequency)) + 1
+            for index, frequency in document_frequency.items()
+        }
+
+        for agent_id, features in documents.items():
+            centroid: Dict[int, float] = {}
+            for feature_counts in features:
+                for index, weight in self._tfidf(feature_counts).items():
+                    centroid[index] = centroid.get(index, 0.0) + weight
+            self._centroids[agent_id] = self._normalize(centroid)
+
+    def _features(self, text: str) -> Counter:
+        words = [self._stem(word) for word in re.findall(r"[a-z0-9']+", text.lower()) if word not in STOP_WORDS]
+        grams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+        return Counter(zlib.crc32(gram.encode()) % self.n_features for gram in grams)
+
+    def _tfidf(self, feature_counts: Counter) -> Dict[int, float]:
+        # Features that never occur in a description or example carry no signal
+        return self._normalize({
+            index: (1 + math.log(count)) * self._idf[index]
+            for index, count in feature_counts.items() if index in self._idf
+        })
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        for suffix in SUFFIXES:
+            if len(word) > len(suffix) + 3 and word.endswith(suffix):
+                return word[:-len(suffix)]
+        return word
+
+    @staticmethod
+    def _normalize(vector: Dict[int, float]) -> Dict[int, float]:
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {index: weight / norm for index, weight in vector.items()} if norm else {}
+
+    @staticmethod
+    def _dot(first: Dict[int, float], second: Dict[int, float]) -> float:
+        if len(first) > len(second):
+            first, second = second, first
+        return sum(weight * second.get(index, 0.0) for index, weight in first.items())
@@ -1,13 +1,27 @@
-from typing import List
+import weakref
+from typing import AsyncIterable, Dict, List, Optional, Tuple
 
-from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.agents.agent import AgentResponseItem, AgentThread
+from semantic_kernel.agents.azure_ai.agent_content_generation import generate_message_content
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
 from models.agent_response import AgentResponse, Message
+from models.agent_stream_event import AgentStreamEvent
+from models.enumerations import StreamEventType
 from semantic_kernel.agents import  ChatHistoryAgentThread, AzureAIAgentThread
 # from agents.copilot_studio.base.copilot_message_content import CopilotMessageContent, CopilotContentType
 
-async def parse_agent_response(agent_response: AgentResponseItem, conversation_id: str) -> AgentResponse:
+# Position and id of the last message returned for each thread, Azure AI threads have no position
+_last_seen: "weakref.WeakKeyDictionary[AgentThread, Tuple[Optional[int], str]]" = weakref.WeakKeyDictionary()
+# Names of the agents that wrote in each Azure AI thread, by agent id
+_agent_names: "weakref.WeakKeyDictionary[AzureAIAgentThread, Dict[str, str]]" = weakref.WeakKeyDictionary()
+
+async def parse_agent_response(
+    agent_response: AgentResponseItem, conversation_id: str, include_history: bool = False, cursor: Optional[str] = None
+) -> AgentResponse:
     """
     Parse the agent response into a structured format.
+    The thread history is only extracted when include_history is set, from the message after the cursor.
     """
     # If the response contains a CopilotMessageContent, extract rich content
     rich_content = None
@@ -33,34 +47,132 @@ async def parse_agent_response(agent_response: AgentResponseItem, conversation_i
         rich_content=rich_content,
     )
 
-    # Extract the history from the agent thread
-    thread = agent_response.thread
-    history: List[Message] = []
-    if isinstance(thread, ChatHistoryAgentThread):
-        for history_message in thread._chat_history:
-             history.append(
-                Message(
-                    content=history_message.content,
-                    role=history_message.role,
-                    agent_id= history_message.name if history_message.name else history_message.metadata.get("agent_id"),
-                    id=history_message.metadata.get("id"),
-                    private_message=False,                    
-                )
-            )
-    elif isinstance(thread, AzureAIAgentThread):
-        async for history_message in thread.get_messages():
-             history.append(
-                Message(
-                    content=history_message.content,
-                    role=history_message.role,
-                    agent_id= history_message.name if history_message.name else history_message.metadata.get("agent_id"),
-                    id=history_message.metadata.get("id"),
-                    private_message=False,                    
-                )
-            )
+    history = None
+    history_cursor = None
+    if include_history:
+        history, history_cursor = await extract_history(agent_response.thread, history_cursor=cursor)
 
     return AgentResponse(
         conversation_id=conversation_id,
         message=message,
         history=history,
-    )
\ No newline at end of file
+        history_cursor=history_cursor,
+    )
+
+
+async def extract_history(thread: AgentThread | None, history_cursor: Optional[str] = None) -> Tuple[List[Message], Optional[str]]:
+    """
+    Extract the messages of the thread after the message with the history_cursor id, or all of them without a cursor.
+
+    Returns:
+        The messages and the id of the last message of the thread, to send as the cursor of the next request.
+    """
+    if isinstance(thread, ChatHistoryAgentThread):
+        messages = thread._chat_history.messages
+        start = _find_after(thread, messages, history_cursor)
+        history = [_to_message(history_message, history_message.metadata.get("id")) for history_message in messages[start:]]
+
+        # Remember the position of the last message with an id, so that the next turn finds its cursor right away
+        for index in range(len(messages) - 1, -1, -1):
+            message_id = messages[index].metadata.get("id")
+            if message_id:
+                _last_seen[thread] = (index, message_id)
+                return history, message_id
+        return history, history_cursor
+
+    if isinstance(thread, AzureAIAgentThread):
+        return await _extract_azure_ai_history(thread, history_cursor)
+
+    return [], history_cursor
+
+
+async def _extract_azure_ai_history(thread: AzureAIAgentThread, history_cursor: Optional[str]) -> Tuple[List[Message], Optional[str]]:
+    """
+    Page through the messages of the thread after the cursor only, so that a turn costs O(new messages).
+    Agent names are resolved once per thread and messages without content are skipped, as AzureAIAgentThread.get_messages does.
+    """
+    if thread.id is None:
+        return [], history_cursor
+
+    agent_names = _agent_names.setdefault(thread, {})
+    history = []
+    after = history_cursor
+    while True:
+        page = await thread._client.agents.list_messages(thread_id=thread.id, order="asc", after=after)
+        for thread_message in page.data:
+            after = thread_message.id
+            agent_id = thread_message.agent_id
+            if agent_id and agent_id.strip() and agent_id not in agent_names:
+                agent = await thread._client.agents.get_agent(agent_id)
+                agent_names[agent_id] = agent.name if agent.name and agent.name.strip() else agent_id
+            history_message = generate_message_content(agent_names.get(agent_id) or agent_id, thread_message)
+            if history_message.items:
+                history.append(_to_message(history_message, thread_message.id))
+        if not page.has_more or not page.data:
+            break
+
+    if after:
+        _last_seen[thread] = (None, after)
+    return history, after
+
+
+def _find_after(thread: ChatHistoryAgentThread, messages: List[ChatMessageContent], history_cursor: Optional[str]) -> int:
+    """Position of the first message after the cursor, 0 without a cursor or when the cursor is not in the thread."""
+    if not history_cursor:
+        return 0
+    index, message_id = _last_seen.get(thread, (None, None))
+    if message_id == history_cursor and index < len(messages) and messages[index].metadata.get("id") == history_cursor:
+        return index + 1
+    # Cursors are usually recent, search from the end
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].metadata.get("id") == history_cursor:
+            return index + 1
+    return 0
+
+
+def _to_message(history_message: ChatMessageContent, message_id: Optional[str]) -> Message:
+    return Message(
+        content=history_message.content,
+        role=history_message.role,
+        agent_id=history_message.name if history_message.name else history_message.metadata.get("agent_id"),
+        id=message_id,
+        private_message=False,
+    )
+
+
+async def parse_agent_stream(
+    agent_responses: AsyncIterable[AgentResponseItem], conversation_id: str, include_history: bool = False, cursor: Optional[str] = None
+) -> AsyncIterable[AgentStreamEvent]:
+    """
+    Parse streamed agent responses into delta and message events, followed by a final event
+    carrying the last complete message as an AgentResponse.
+    """
+    final_response = None
+    async for agent_response in agent_responses:
+        if isinstance(agent_response.message, StreamingChatMessageContent):
+            if agent_response.message.content:
+                yield AgentStreamEvent(
+                    event=StreamEventType.DELTA,
+                    agent_id=agent_response.name,
+                    delta=agent_response.message.content,
+                )
+            continue
+
+        final_response = agent_response
+        yield AgentStreamEvent(
+            event=StreamEventType.MESSAGE,
+            agent_id=agent_response.name,
+            message=Message(
+                content=agent_response.message.content,
+                role=agent_response.message.role,
+                agent_id=agent_response.name,
+                id=agent_response.metadata.get("id"),
+            ),
+        )
+
+    if final_response is not None:
+        yield AgentStreamEvent(
+            event=StreamEventType.FINAL,
+            agent_id=final_response.name,
+            response=await parse_agent_response(final_response, conversation_id, include_history, cursor),
+        )
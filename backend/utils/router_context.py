@@ -0,0 +1,76 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
+
+
+class RouterContextBuilder:
+    """
+    Keeps the intent router thread to a compact digest per turn, since the router only needs
+    the intent signals of the previous turns and not the answers of the agents it routed to.
+
+    Each turn is recorded as the user message, cut to max_intent_chars, and the routing
+    decision (agent picked, confidence and destination city) in the format the router replies
+    with. The raw router output, the retry prompts asking for the correct format and the
+    agent answers are not kept. Only the last max_turns turns are kept in the thread.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        max_intent_chars: Optional[int] = None,
+        max_response_chars: Optional[int] = None,
+    ):
+        self.max_turns = max_turns if max_turns is not None else int(os.getenv("ROUTER_CONTEXT_MAX_TURNS", 8))
+        self.max_intent_chars = max_intent_chars if max_intent_chars is not None else int(os.getenv("ROUTER_CONTEXT_MAX_INTENT_CHARS", 200))
+        self.max_response_chars = max_response_chars if max_response_chars is not None else int(os.getenv("ROUTER_CONTEXT_MAX_RESPONSE_CHARS", 200))
+
+    @staticmethod
+    def turn_start(thread: Optional[ChatHistoryAgentThread]) -> int:
+        """The position in the thread where the messages of the next turn will start."""
+        return len(thread._chat_history.messages) if thread is not None else 0
+
+    def digest(self, chat_message: ChatMessageContent, agent_info: Dict[str, Any], router_name: str) -> List[ChatMessageContent]:
+        """The messages recorded for a turn: the short user intent and the routing decision."""
+        intent = " ".join((chat_message.content or "").split())
+        if len(intent) > self.max_intent_chars:
+            intent = f"{intent[:self.max_intent_chars].rstrip()}..."
+
+        # The router's own answer is only kept when it did not pick an agent, cut like the intent
+        your_response = "" if agent_info.get("agent_id") else (agent_info.get("your_response") or "")[:self.max_response_chars]
+        decision = {
+            "agent_id": agent_info.get("agent_id"),
+            "confidence_score": agent_info.get("confidence_score"),
+            "your_response": your_response,
+            "destination_city": agent_info.get("destination_city"),
+        }
+        return [
+            ChatMessageContent(role=AuthorRole.USER, content=intent, metadata=chat_message.metadata),
+            ChatMessageContent(role=AuthorRole.ASSISTANT, content=json.dumps(decision), name=router_name),
+        ]
+
+    def record_turn(
+        self,
+        thread: Optional[ChatHistoryAgentThread],
+        turn_start: int,
+        chat_message: ChatMessageContent,
+        agent_info: Dict[str, Any],
+        router_name: str,
+    ) -> ChatHistoryAgentThread:
+        """
+        Replace the messages added to the thread since turn_start with the digest of the turn,
+        and drop the oldest turns above max_turns.
+        """
+        # An empty thread is falsy
+        if thread is None:
+            thread = ChatHistoryAgentThread()
+        messages = thread._chat_history.messages
+        messages[turn_start:] = self.digest(chat_message, agent_info, router_name)
+
+        turn_starts = [index for index, message in enumerate(messages) if message.role == AuthorRole.USER]
+        if len(turn_starts) > self.max_turns:
+            del messages[:turn_starts[-self.max_turns]]
+        return thread
@@ -0,0 +1,106 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+cache_hits = meter.create_counter(
+    name=f"{METRIC_PREFIX}.routing_cache.hits",
+    description="Number of intent router turns served from the routing cache",
+)
+cache_misses = meter.create_counter(
+    name=f"{METRIC_PREFIX}.routing_cache.misses",
+    description="Number of intent router turns that needed a routing decision from the LLM",
+)
+
+RoutingKey = Tuple[str, Tuple[str, ...], str]
+
+
+class RoutingCache:
+    """
+    LRU cache of confident intent routing decisions.
+
+    Decisions are keyed on the normalized user message, the agents involved and the
+    destination city known before the turn. Entries expire after ttl_seconds and only
+    decisions that picked an agent with at least min_confidence are stored.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("ROUTING_CACHE_MAX_ENTRIES", 1024))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("ROUTING_CACHE_TTL_SECONDS", 3600))
+        self.min_confidence = min_confidence if min_confidence is not None else float(os.getenv("ROUTING_CACHE_MIN_CONFIDENCE", 0.85))
+        self._entries: "OrderedDict[RoutingKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase the message and strip punctuation and repeated whitespace."""
+        return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
+    @classmethod
+    def make_key(cls, message: str, agents_involved: Iterable[str], destination_city: Optional[str]) -> RoutingKey:
+        return (
+            cls.normalize(message),
+            tuple(sorted(set(agents_involved))),
+            (destination_city or "").strip().lower(),
+        )
+
+    def get(self, key: RoutingKey) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached decision, or None on a miss or expired entry."""
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            cache_misses.add(1)
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        cache_hits.add(1)
+        return dict(entry[1])
+
+    def put(self, key: RoutingKey, agent_info: Dict[str, Any]) -> bool:
+        """Store the decision if it picked an agent confidently. Returns True if it was stored."""
+        if not self.enabled or not agent_info.get("agent_id"):
+            return False
+        try:
+            confidence = float(agent_info.get("confidence_score") or 0.0)
+        except (TypeError, ValueError):
+            return False
+        if confidence < self.min_confidence:
+            return False
+
+        self._entries[key] = (time.monotonic(), {
+            "agent_id": agent_info["agent_id"],
+            "confidence_score": confidence,
+            "destination_city": agent_info.get("destination_city"),
+        })
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,125 @@
+import ast
+import json
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from pydantic import ValidationError
+
+from models.routing_decision import RoutingDecision
+
+FENCE_PATTERN = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+NULL_AGENT_IDS = {"", "null", "none", "unknown"}
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} block of the text, ignoring braces inside strings.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    depth = 0
+    quote = None
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in ("\"", "'"):
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return None
+
+
+def _loads(candidate: str) -> Optional[Any]:
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+
+    repaired = TRAILING_COMMA_PATTERN.sub(r"\1", candidate)
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        pass
+
+    # Python dictionary literals: single quotes, None, True and False
+    try:
+        return ast.literal_eval(repaired)
+    except (ValueError, SyntaxError):
+        pass
+
+    repaired = re.sub(r"\bnull\b", "None", re.sub(r"\btrue\b", "True", re.sub(r"\bfalse\b", "False", repaired)))
+    try:
+        return ast.literal_eval(repaired)
+    except (ValueError, SyntaxError):
+        return None
+
+
+def parse_routing_decision(text: str, agent_ids: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse the intent router output into a routing decision dictionary.
+
+    Fenced, prefixed or Python formatted JSON is repaired locally. Returns None if the
+    output has no usable routing decision or names an agent outside agent_ids, so that
+    the caller can ask the router again.
+    """
+    if not text:
+        return None
+
+    candidate = FENCE_PATTERN.sub("", text.strip())
+    parsed = _loads(candidate)
+    if not isinstance(parsed, dict):
+        block = extract_json_object(candidate)
+        parsed = _loads(block) if block else None
+    if not isinstance(parsed, dict) or "agent_id" not in parsed:
+        return None
+
+    agent_id = parsed.get("agent_id")
+    if isinstance(agent_id, str) and agent_id.strip().lower() in NULL_AGENT_IDS:
+        parsed["agent_id"] = None
+    if parsed.get("confidence_score") is None:
+        parsed["confidence_score"] = 0.0
+    if parsed.get("your_response") is None:
+        parsed["your_response"] = ""
+
+    try:
+        decision = RoutingDecision.model_validate(parsed)
+    except ValidationError:
+        return None
+
+    if decision.agent_id is not None and agent_ids is not None and decision.agent_id not in set(agent_ids):
+        return None
+    return decision.model_dump()
+
+
+PARTIAL_AGENT_ID_PATTERN = re.compile(r"[\"']agent_id[\"']\s*:\s*(?:(null|None)|\"((?:[^\"\\]|\\.)*)\"|'([^']*)')")
+PARTIAL_CONFIDENCE_PATTERN = re.compile(r"[\"']confidence_score[\"']\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\n]")
+
+
+def parse_partial_routing_decision(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse agent_id and confidence_score from a routing decision that is still being streamed.
+    Returns None until both fields are complete.
+    """
+    agent_match = PARTIAL_AGENT_ID_PATTERN.search(text)
+    confidence_match = PARTIAL_CONFIDENCE_PATTERN.search(text)
+    if agent_match is None or confidence_match is None:
+        return None
+
+    agent_id = agent_match.group(2) if agent_match.group(2) is not None else agent_match.group(3)
+    if agent_id is not None and agent_id.strip().lower() in NULL_AGENT_IDS:
+        agent_id = None
+    return {"agent_id": agent_id, "confidence_score": float(confidence_match.group(1))}
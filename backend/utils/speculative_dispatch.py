@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, AsyncIterable, Optional
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.agents.agent import AgentThread
+from semantic_kernel.contents.chat_history import ChatHistory
+
+from telemetry.metrics import meter, METRIC_PREFIX
+
+speculative_dispatches = meter.create_counter(
+    name=f"{METRIC_PREFIX}.speculative_dispatch.outcomes",
+    description="Number of speculative agent invocations, by whether the final routing decision confirmed them",
+)
+
+
+class SpeculationNotSupported(Exception):
+    """Raised by a speculative invocation for agents that can not be invoked ahead of the decision."""
+
+
+def fork_chat_history_thread(thread: Optional[AgentThread]) -> Optional[ChatHistoryAgentThread]:
+    """
+    Copy a chat history thread, so that an invocation that may be discarded does not touch the original.
+    Returns None for a missing thread and raises SpeculationNotSupported for threads that are kept remotely.
+    """
+    if thread is None:
+        return None
+    if not isinstance(thread, ChatHistoryAgentThread):
+        raise SpeculationNotSupported()
+    return ChatHistoryAgentThread(chat_history=ChatHistory(messages=list(thread._chat_history.messages)), thread_id=thread.id)
+
+
+class SpeculativeDispatch:
+    """
+    Runs an agent invocation in the background, before the routing decision is final,
+    and buffers its responses until the decision either confirms or cancels it.
+    """
+
+    _DONE = object()
+
+    def __init__(self, agent_id: str, destination_city: Optional[str], responses: AsyncIterable[Any]):
+        self.agent_id = agent_id
+        self.destination_city = destination_city
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(responses))
+
+    @property
+    def done(self) -> bool:
+        return self._task.done() and self._queue.empty()
+
+    def matches(self, agent_id: Optional[str], destination_city: Optional[str]) -> bool:
+        """Check whether the final routing decision would have started the same invocation."""
+        return agent_id == self.agent_id and destination_city == self.destination_city
+
+    async def results(self) -> AsyncIterable[Any]:
+        """Yield the buffered and remaining responses of the invocation."""
+        while True:
+            item = await self._queue.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, Exception):
+                if isinstance(item, SpeculationNotSupported):
+                    speculative_dispatches.add(1, {"agent": self.agent_id, "outcome": "unsupported"})
+                raise item
+            yield item
+
+    def confirm(self) -> None:
+        speculative_dispatches.add(1, {"agent": self.agent_id, "outcome": "confirmed"})
+
+    def cancel(self) -> None:
+        """Discard the invocation, cancelling it if it is still running."""
+        self._task.cancel()
+        speculative_dispatches.add(1, {"agent": self.agent_id, "outcome": "cancelled"})
+
+    async def _run(self, responses: AsyncIterable[Any]) -> None:
+        try:
+            async for response in responses:
+                await self._queue.put(response)
+        except Exception as ex:
+            await self._queue.put(ex)
+        finally:
+            self._queue.put_nowait(self._DONE)